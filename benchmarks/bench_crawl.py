@@ -0,0 +1,147 @@
+"""End-to-end `Crawler.run` benchmark on a synthetic site, with JSON results to track regressions.
+
+The site (see `synthetic_site.py`) is served by an in-process visitor, by a
+local HTTP server, or both. Every mode runs in its own process, so peak RSS
+and CPU time are its own.
+
+    uv run benchmarks/bench_crawl.py --pages 2000 --concurrency 16 --output results.json
+    uv run benchmarks/bench_crawl.py --mode http --error_rate 0.05 --latency_sigma 1.5
+"""
+
+import asyncio
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from dataclasses import asdict
+from importlib.metadata import PackageNotFoundError, version
+
+import fire
+from loguru import logger
+from smolcrawler import Crawler
+from smolcrawler.hooks import CrawlHooks
+from synthetic_site import HttpxVisitor, InProcessVisitor, SiteServer, SiteSpec, SyntheticSite
+
+MODES = ("inprocess", "http")
+
+
+class FetchLatencies(CrawlHooks):
+    def __init__(self):
+        self.latencies: list[float] = []
+
+    def on_fetch_end(self, url, depth, start, end, ok):
+        self.latencies.append(end - start)
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def crawl(mode: str, spec: SiteSpec, concurrency: int) -> dict:
+    site = SyntheticSite(spec)
+    server = visitor = None
+    if mode == "http":
+        server = SiteServer(site)
+        await server.start()
+        visitor = HttpxVisitor(site, concurrency)
+    else:
+        visitor = InProcessVisitor(site)
+
+    hooks = FetchLatencies()
+    crawler = Crawler(
+        depth=1_000, concurrency=concurrency, limit=-1, url_prefix=site.base, visitor=visitor, hooks=hooks
+    )
+    cpu_start, start = time.process_time(), time.perf_counter()
+    try:
+        pages = sum([1 async for _ in crawler.run(site.url(0))])
+    finally:
+        if server is not None:
+            await visitor.close()
+            await server.stop()
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+
+    stats = crawler.stats
+    return {
+        "mode": mode,
+        "pages": pages,
+        "queued": stats.queued,
+        "failed": stats.failed,
+        "duplicates": stats.duplicates,
+        "elapsed": elapsed,
+        "pages_per_second": pages / elapsed,
+        "fetch_latency_p50": percentile(hooks.latencies, 0.5),
+        "fetch_latency_p99": percentile(hooks.latencies, 0.99),
+        "cpu_seconds": cpu,
+        "cpu_per_page_ms": cpu / max(1, pages) * 1000,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def package_version() -> str:
+    try:
+        return version("smolcrawler")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def main(
+    mode: str = "both",  # "inprocess", "http" or "both"
+    pages: int = 1000,
+    fanout: int = 8,
+    html_bytes: int = 20_000,
+    duplicate_ratio: float = 0.05,
+    latency_median: float = 0.01,
+    latency_sigma: float = 0.8,
+    error_rate: float = 0.01,
+    seed: int = 0,
+    concurrency: int = 8,
+    output: str | None = None,  # write the results to this JSON file as well
+    child: bool = False,
+):
+    spec = SiteSpec(pages, fanout, html_bytes, duplicate_ratio, latency_median, latency_sigma, error_rate, seed)
+    logger.remove()
+
+    if child:
+        print(json.dumps(asyncio.run(crawl(mode, spec, concurrency))))
+        return
+
+    results = []
+    for run_mode in MODES if mode == "both" else (mode,):
+        args = [f"--{name}={value}" for name, value in asdict(spec).items()]
+        out = subprocess.run(
+            [sys.executable, __file__, f"--mode={run_mode}", f"--concurrency={concurrency}", "--child", *args],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        results.append(result)
+        print(
+            f"{run_mode:>10}: {result['pages']} pages in {result['elapsed']:.2f}s "
+            f"({result['pages_per_second']:.1f} pages/s), fetch p50 {result['fetch_latency_p50'] * 1000:.1f} ms "
+            f"p99 {result['fetch_latency_p99'] * 1000:.1f} ms, CPU {result['cpu_seconds']:.2f}s, "
+            f"peak RSS {result['peak_rss_bytes'] / 2**20:.0f} MiB"
+        )
+
+    report = {
+        "smolcrawler": package_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "spec": asdict(spec),
+        "concurrency": concurrency,
+        "results": results,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
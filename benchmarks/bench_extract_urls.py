@@ -0,0 +1,102 @@
+"""Micro-benchmark of `extract_urls` on large, real-world-shaped HTML, against the previous regex version.
+
+    uv run benchmarks/bench_extract_urls.py --repeat 5
+"""
+
+import random
+import re
+import time
+from urllib.parse import urlparse
+
+import fire
+from smolcrawler.utils import extract_urls
+
+
+def extract_urls_regex(html: str, base_url: str) -> set[str]:
+    """The previous implementation, kept as the baseline."""
+    urls = set()
+    url_pattern = re.compile(r'<a[^>]+href=["\'](.*?)["\']', re.IGNORECASE)
+    base_parsed = urlparse(base_url)
+    base_path = base_parsed.path.rstrip("/")
+    for match in url_pattern.finditer(html):
+        url = match.group(1)
+        if not url or url.startswith(("#", "javascript:", "mailto:", "tel:")):
+            continue
+        if url.startswith(("http://", "https://")):
+            urls.add(url)
+            continue
+        if url.startswith("/"):
+            absolute_url = f"{base_parsed.scheme}://{base_parsed.netloc}{url}"
+        elif url.startswith("../"):
+            parent_count = url.count("../")
+            url = url[3 * parent_count :]
+            path_parts = base_path.split("/")
+            parent_path = "/".join(path_parts[:-parent_count]) if len(path_parts) > parent_count else ""
+            absolute_url = f"{base_parsed.scheme}://{base_parsed.netloc}/{parent_path}/{url}"
+        else:
+            if url.startswith("./"):
+                url = url[2:]
+            absolute_url = f"{base_parsed.scheme}://{base_parsed.netloc}/{base_path}/{url}"
+        absolute_url = re.sub(r"(?<!:)//+", "/", absolute_url)
+        urls.add(absolute_url)
+    return urls
+
+
+def sec_filing(rng: random.Random) -> str:
+    """~4 MB of styled tables with a handful of links, like an EDGAR filing."""
+    rows = []
+    for i in range(25_000):
+        cells = "".join(
+            f'<td style="padding:0 4pt;text-align:right;font-size:10pt">{rng.randrange(10**6):,}</td>' for _ in range(2)
+        )
+        rows.append(f'<tr style="background-color:#cceeff">{cells}</tr>')
+        if i % 500 == 0:
+            rows.append(f'<tr><td><a href="#sec{i}">Section {i}</a> <a href="/Archives/edgar/data/{i}.htm">Exhibit</a></td></tr>')
+    return f"<html><body><table>{''.join(rows)}</table></body></html>"
+
+
+def docs_page(rng: random.Random) -> str:
+    """~1 MB documentation page with a big relative-link navigation tree."""
+    nav = []
+    for i in range(5_000):
+        href = rng.choice([f"../topic{i}", f"./sub/page{i}", f"/documentation/api/symbol{i}", f"page{i}#anchor"])
+        nav.append(f'<li class="nav-item"><a class="nav-link" href="{href}" title="Symbol {i}">Symbol {i}</a></li>')
+    body = "<p>" + "Lorem ipsum dolor sit amet. " * 20_000 + "</p>"
+    return f"<html><head><title>Docs</title></head><body><nav><ul>{''.join(nav)}</ul></nav>{body}</body></html>"
+
+
+def link_index(rng: random.Random) -> str:
+    """~2 MB index page made almost only of links."""
+    links = []
+    for i in range(30_000):
+        if i % 3:
+            links.append(f'<a href="https://example.com/archive/{rng.randrange(10**9)}/item">item {i}</a><br>')
+        else:
+            links.append(f'<a href="/archive/{rng.randrange(10**9)}">item {i}</a><br>')
+    return f"<html><body>{''.join(links)}</body></html>"
+
+
+def main(repeat: int = 5, seed: int = 0):
+    rng = random.Random(seed)
+    fixtures = {
+        "sec_filing": sec_filing(rng),
+        "docs_page": docs_page(rng),
+        "link_index": link_index(rng),
+    }
+    base_url = "https://example.com/documentation/api/overview/"
+
+    for name, html in fixtures.items():
+        timings = {}
+        for label, fn in (("regex (old)", extract_urls_regex), ("single-pass", extract_urls)):
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                urls = fn(html, base_url)
+                best = min(best, time.perf_counter() - start)
+            timings[label] = best
+            print(f"{name:>11} {len(html) / 1e6:5.1f} MB {label:>12}: {best * 1000:7.1f} ms, {len(urls):,} URLs")
+        print(f"{name:>11} speedup: {timings['regex (old)'] / timings['single-pass']:.2f}x")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
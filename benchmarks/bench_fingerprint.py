@@ -0,0 +1,75 @@
+"""Hashing throughput and memory per entry of the exact-duplicate detectors.
+
+Throughput: each detector sees `pages` synthetic markdown pages the way the
+crawler uses it, one `is_duplicate` and one `add_content` per page. Memory:
+the traced allocation growth of a detector holding `entries` pages.
+
+    uv run benchmarks/bench_fingerprint.py --pages 20000 --entries 1000000
+"""
+
+import random
+import string
+import time
+import tracemalloc
+
+import fire
+from smolcrawler.content_detector import ContentNormalizer, FastHashDetector, HashBasedDetector, xxhash
+
+LETTERS = str.maketrans("01234567", "abcdefgh")
+
+DETECTORS = {
+    "md5 (HashBasedDetector)": HashBasedDetector,
+    "fast 64-bit": FastHashDetector,
+    "fast 128-bit": lambda: FastHashDetector(bits=128),
+    "fast 64-bit, normalized": lambda: FastHashDetector(ContentNormalizer()),
+    "fast 64-bit, boilerplate": lambda: FastHashDetector(ContentNormalizer(boilerplate_pages=50)),
+}
+
+
+def make_pages(pages: int, words: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choices(string.ascii_lowercase, k=rng.randrange(2, 10))) for _ in range(5000)]
+    vocab += ["naïve", "café", "straße"]
+    nav = "[Home](/) | [Docs](/docs) | [Blog](/blog) | [About](/about)"
+    result = []
+    for i in range(pages):
+        paragraphs = [" ".join(rng.choices(vocab, k=100)) for _ in range(words // 100)]
+        result.append(f"{nav}\n\n# Page {i}\n\n" + "\n\n".join(paragraphs) + f"\n\nLast updated 2024-0{i % 9 + 1}-01")
+    return result
+
+
+def throughput(make, pages: list[str]) -> float:
+    detector = make()
+    start = time.perf_counter()
+    for content in pages:
+        if not detector.is_duplicate(content):
+            detector.add_content(content)
+    return time.perf_counter() - start
+
+
+def memory_per_entry(make, entries: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    detector = make()
+    for i in range(entries):
+        # no digits, they would be dropped by the normalizer
+        detector.add_content(f"page {i:o}".translate(LETTERS))
+    detector._last = None  # the cache of the last page is not an entry
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del detector
+    return memory / entries
+
+
+def main(pages: int = 20_000, words: int = 1_500, entries: int = 1_000_000, seed: int = 0):
+    corpus = make_pages(pages, words, seed)
+    megabytes = sum(len(page) for page in corpus) / 1e6
+    print(f"{pages:,} pages, {megabytes:.0f} MB of markdown, xxhash {'installed' if xxhash else 'not installed'}")
+    for name, make in DETECTORS.items():
+        elapsed = throughput(make, corpus)
+        per_entry = memory_per_entry(make, entries)
+        print(f"{name:>26}: {megabytes / elapsed:7.0f} MB/s, {pages / elapsed:9,.0f} pages/s, {per_entry:6.1f} B/entry")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,78 @@
+"""Pages/sec of `Crawler.run` with page post-processing inline vs offloaded to a worker pool.
+
+The stand-in visitor answers instantly with large pages, so the crawl is bound
+by link extraction and hashing on the event loop.
+
+    uv run benchmarks/bench_offload.py --pages 400 --links 3000
+"""
+
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass
+
+import fire
+from loguru import logger
+from smolcrawler import Crawler
+
+BASE = "https://bench.local"
+
+
+@dataclass
+class Page:
+    url: str
+    html: str
+    content: str
+    title: str = ""
+
+
+class LargePageVisitor:
+    def __init__(self, pages: int, links: int, seed: int = 0):
+        rng = random.Random(seed)
+        self.pages = pages
+        filler = "<p>" + "lorem ipsum dolor sit amet " * 2_000 + "</p>"
+        self.html = [
+            "".join(f'<a href="/p{rng.randrange(pages)}?ref={j}">link</a>' for j in range(links)) + filler
+            for _ in range(64)
+        ]
+
+    async def visit_many(self, urls):
+        pages = []
+        for url in urls:
+            i = int(url.rsplit("/p", 1)[1].split("?")[0]) if "/p" in url else 0
+            await asyncio.sleep(0)
+            pages.append(Page(url=url, html=self.html[i % 64], content=f"page {i} " + self.html[i % 64][-20_000:]))
+        return pages
+
+
+async def crawl(pages: int, links: int, concurrency: int, offload: str | None, workers: int | None) -> float:
+    visitor = LargePageVisitor(pages, links)
+    crawler = Crawler(
+        depth=1_000,
+        concurrency=concurrency,
+        limit=pages,
+        url_prefix=BASE,
+        visitor=visitor,
+        offload=offload,
+        offload_workers=workers,
+    )
+    start = time.perf_counter()
+    count = sum([1 async for _ in crawler.run(f"{BASE}/p0")])
+    return count / (time.perf_counter() - start)
+
+
+async def main(pages: int = 400, links: int = 3_000, concurrency: int = 16):
+    logger.remove()
+    cores = os.cpu_count() or 1
+    print(f"{cores} cores")
+    print(f"{'inline':>14}: {await crawl(pages, links, concurrency, None, None):7.1f} pages/s")
+    workers = 1
+    while workers <= cores:
+        rate = await crawl(pages, links, concurrency, "process", workers)
+        print(f"{f'process x{workers}':>14}: {rate:7.1f} pages/s")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
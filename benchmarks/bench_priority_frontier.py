@@ -0,0 +1,48 @@
+"""Cost per push and pop of `PriorityFrontier` as the queue grows to 1M URLs, against the FIFO `Frontier`.
+
+With a heap the cost per operation grows with log n, so going from 10k to 1M
+queued URLs should add well under 2x, not 100x.
+
+    uv run benchmarks/bench_priority_frontier.py --sizes 10000,100000,1000000
+"""
+
+import random
+import time
+
+import fire
+from smolcrawler.frontier import Frontier, PriorityFrontier
+from smolcrawler.scoring import default_scorer
+
+
+def measure(frontier: Frontier, urls: list[tuple[str, int]]) -> tuple[float, float]:
+    start = time.perf_counter()
+    for url, depth in urls:
+        frontier.push(url, depth, "")
+    push = time.perf_counter() - start
+    start = time.perf_counter()
+    while frontier:
+        frontier.pop()
+    pop = time.perf_counter() - start
+    return push / len(urls), pop / len(urls)
+
+
+def main(sizes: str = "10000,100000,1000000", seed: int = 0):
+    rng = random.Random(seed)
+    for size in (int(size) for size in str(sizes).split(",")):
+        urls = [
+            (f"https://example.com/{rng.choice(['docs', 'blog', 'api'])}/{rng.randrange(10**6)}/page{i}", rng.randrange(6))
+            for i in range(size)
+        ]
+        for name, make in (
+            ("fifo", lambda: Frontier(key=str)),
+            ("priority", lambda: PriorityFrontier(default_scorer(), key=str)),
+        ):
+            frontier = make()
+            if isinstance(frontier, PriorityFrontier):
+                frontier.scorer.start("https://example.com/docs/", "https://example.com")
+            push, pop = measure(frontier, urls)
+            print(f"{size:>10,} URLs {name:>9}: push {push * 1e6:6.2f} us, pop {pop * 1e6:6.2f} us")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
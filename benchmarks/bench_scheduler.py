@@ -0,0 +1,94 @@
+"""Compare the worker-pool scheduler in `Crawler.run` with the old batch-barrier loop.
+
+Pages are served by an in-process visitor whose latencies follow a heavy-tailed
+distribution, so a few slow pages dominate every batch of the barrier loop.
+
+    uv run benchmarks/bench_scheduler.py --pages 300 --concurrency 8
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+
+import fire
+from loguru import logger
+from smolcrawler import Crawler
+
+BASE = "https://bench.local"
+
+
+@dataclass
+class Page:
+    url: str
+    html: str
+    content: str
+    title: str = ""
+
+
+class SkewedVisitor:
+    """A stand-in for `localwebpy.Visitor` serving a tree-shaped synthetic site."""
+
+    def __init__(self, pages: int, fanout: int, median: float, tail: float, seed: int = 0):
+        rng = random.Random(seed)
+        self.pages = pages
+        self.fanout = fanout
+        # lognormal latencies: most pages are fast, a few are much slower
+        self.latencies = [median * rng.lognormvariate(0, tail) for _ in range(pages)]
+
+    def _links(self, i: int) -> list[str]:
+        first = i * self.fanout + 1
+        return [f"{BASE}/p{j}" for j in range(first, min(first + self.fanout, self.pages))]
+
+    async def visit_many(self, urls: list[str]) -> list[Page]:
+        async def visit(url: str) -> Page:
+            i = int(url.rsplit("/p", 1)[1]) if "/p" in url else 0
+            await asyncio.sleep(self.latencies[i])
+            html = "".join(f'<a href="{link}">{link}</a>' for link in self._links(i))
+            return Page(url=url, html=html, content=f"page {i}")
+
+        return await asyncio.gather(*(visit(url) for url in urls))
+
+
+async def run_batch_barrier(visitor: SkewedVisitor, concurrency: int) -> int:
+    """The scheduling loop `Crawler.run` used before: fetch a batch, wait for all of it, refill."""
+    queue, seen, count = [f"{BASE}/p0"], set(), 0
+    while queue:
+        batch = [queue.pop(0) for _ in range(min(concurrency, len(queue)))]
+        batch = [url for url in batch if url not in seen]
+        seen.update(batch)
+        for page in await visitor.visit_many(batch):
+            count += 1
+            queue.extend(link for link in visitor._links(int(page.url.rsplit("/p", 1)[1])))
+    return count
+
+
+async def run_crawler(visitor: SkewedVisitor, concurrency: int) -> int:
+    crawler = Crawler(depth=1_000, concurrency=concurrency, limit=-1, url_prefix=BASE, visitor=visitor)
+    return sum([1 async for _ in crawler.run(f"{BASE}/p0")])
+
+
+async def main(
+    pages: int = 300,
+    fanout: int = 5,
+    concurrency: int = 8,
+    median: float = 0.01,
+    tail: float = 1.0,
+    seed: int = 0,
+):
+    logger.remove()
+
+    results = {}
+    for name, runner in (("batch-barrier", run_batch_barrier), ("worker-pool", run_crawler)):
+        visitor = SkewedVisitor(pages, fanout, median, tail, seed)
+        start = time.perf_counter()
+        count = await runner(visitor, concurrency)
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed
+        print(f"{name:>14}: {count} pages in {elapsed:.2f}s ({count / elapsed:.1f} pages/s)")
+
+    print(f"speedup: {results['batch-barrier'] / results['worker-pool']:.2f}x")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
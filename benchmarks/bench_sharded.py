@@ -0,0 +1,90 @@
+"""Pages/sec of a sharded crawl per worker process count, against a plain `Crawler.run`.
+
+The synthetic site (see `synthetic_site.py`) is spread over `hosts` hosts,
+which are split between the workers. Latencies are short and the pages large,
+so every worker is bound by its own CPU: with enough cores, pages/sec should
+grow about linearly with the number of workers.
+
+    uv run benchmarks/bench_sharded.py --pages 4000 --workers 1,2,4,8
+"""
+
+import asyncio
+import os
+import re
+import tempfile
+import time
+
+import fire
+from loguru import logger
+from smolcrawler import Crawler
+from smolcrawler.crawler import crawl_sharded
+from smolcrawler.distributed import SQLiteBackend
+from synthetic_site import InProcessVisitor, SiteSpec, SyntheticSite
+
+
+class MultiHostSite(SyntheticSite):
+    """Page i lives on host i % hosts, links are absolute."""
+
+    def __init__(self, spec: SiteSpec, hosts: int):
+        super().__init__(spec)
+        self.hosts = hosts
+
+    def url(self, i: int) -> str:
+        return f"https://h{i % self.hosts}.bench.local/p{i}"
+
+    def html(self, i: int) -> str:
+        return re.sub(r'href="/p(\d+)"', lambda m: f'href="{self.url(int(m[1]))}"', super().html(i))
+
+
+def crawler_kwargs(site: MultiHostSite, concurrency: int) -> dict:
+    return dict(
+        depth=1_000, concurrency=concurrency, limit=-1, url_prefix="https://", visitor=InProcessVisitor(site)
+    )
+
+
+def run_plain(site: MultiHostSite, concurrency: int) -> tuple[int, float]:
+    async def crawl() -> int:
+        crawler = Crawler(**crawler_kwargs(site, concurrency))
+        return sum([1 async for _ in crawler.run(site.url(0))])
+
+    start = time.perf_counter()
+    pages = asyncio.run(crawl())
+    return pages, time.perf_counter() - start
+
+
+def run_sharded(site: MultiHostSite, concurrency: int, workers: int) -> tuple[int, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteBackend(os.path.join(tmp, "crawl.db"), workers)
+        start = time.perf_counter()
+        stats = crawl_sharded(site.url(0), backend, **crawler_kwargs(site, concurrency))
+        elapsed = time.perf_counter() - start
+        backend.close()
+    return sum(worker["fetched"] for worker in stats), elapsed
+
+
+def main(
+    pages: int = 4_000,
+    hosts: int = 64,
+    workers: tuple[int, ...] = (1, 2, 4),  # fire parses --workers 1,2,4 into a tuple
+    concurrency: int = 16,
+    html_bytes: int = 50_000,
+    latency_median: float = 0.001,
+):
+    logger.remove()
+    site = MultiHostSite(SiteSpec(pages, html_bytes=html_bytes, latency_median=latency_median, error_rate=0), hosts)
+    print(f"{pages:,} pages on {hosts} hosts, {os.cpu_count()} CPUs")
+
+    fetched, elapsed = run_plain(site, concurrency)
+    baseline = fetched / elapsed
+    print(f"{'plain run':>12}: {fetched} pages in {elapsed:.2f}s, {baseline:7.1f} pages/s")
+    for count in workers if isinstance(workers, (tuple, list)) else (workers,):
+        fetched, elapsed = run_sharded(site, concurrency, count)
+        rate = fetched / elapsed
+        print(
+            f"{count:>4} workers: {fetched} pages in {elapsed:.2f}s, {rate:7.1f} pages/s, "
+            f"{rate / baseline:.2f}x plain, {rate / baseline / count:.0%} per worker"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,75 @@
+"""Precision/recall and lookup throughput of `SimilarityBasedDetector` on a synthetic near-duplicate corpus.
+
+The corpus has `docs` base pages plus, for each, a near-duplicate with
+`edit_ratio` of its words replaced and an unrelated page. The index is padded
+with `index_size` random signatures first, to measure lookups at scale.
+
+    uv run benchmarks/bench_similarity.py --docs 2000 --index-size 1000000
+"""
+
+import random
+import time
+from array import array
+
+import fire
+from smolcrawler.content_detector import HashBasedDetector, SimilarityBasedDetector
+
+
+def make_corpus(docs: int, words: int, edit_ratio: float, seed: int):
+    rng = random.Random(seed)
+    vocab = [f"word{i}" for i in range(20_000)]
+    base, near, unrelated = [], [], []
+    for _ in range(docs):
+        page = rng.choices(vocab, k=words)
+        edited = list(page)
+        for i in rng.sample(range(words), int(words * edit_ratio)):
+            edited[i] = rng.choice(vocab)
+        base.append(" ".join(page))
+        near.append(" ".join(edited))
+        unrelated.append(" ".join(rng.choices(vocab, k=words)))
+    return base, near, unrelated
+
+
+def main(
+    docs: int = 2_000,
+    words: int = 500,
+    edit_ratio: float = 0.02,
+    index_size: int = 100_000,
+    threshold: float = 0.8,
+    num_perm: int = 64,
+    seed: int = 0,
+):
+    base, near, unrelated = make_corpus(docs, words, edit_ratio, seed)
+    detector = SimilarityBasedDetector(threshold=threshold, num_perm=num_perm)
+    print(f"bands={detector.bands} rows={detector.rows}")
+
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(index_size):
+        detector._add_signature(array("I", (rng.getrandbits(32) for _ in range(num_perm))))
+    print(f"padded index with {index_size:,} signatures in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    for page in base:
+        detector.add_content(page)
+    elapsed = time.perf_counter() - start
+    print(f"add: {docs / elapsed:,.0f} pages/s")
+
+    start = time.perf_counter()
+    true_positives = sum(detector.is_duplicate(page) for page in near)
+    false_positives = sum(detector.is_duplicate(page) for page in unrelated)
+    elapsed = time.perf_counter() - start
+
+    precision = true_positives / max(1, true_positives + false_positives)
+    recall = true_positives / docs
+    print(f"index size: {len(detector):,} pages, {len(detector.signatures) * 4 / len(detector):.0f} bytes/signature")
+    print(f"precision: {precision:.3f} recall: {recall:.3f}")
+    print(f"lookups: {2 * docs / elapsed:,.0f}/s")
+    exact = HashBasedDetector()
+    for page in base:
+        exact.add_content(page)
+    print(f"exact md5 recall for comparison: {sum(exact.is_duplicate(page) for page in near) / docs:.3f}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,99 @@
+"""Links/s through URL filtering and normalization: `UrlFilter` against the previous per-link functions.
+
+Every discovered link is checked against the prefix and rules, then normalized
+twice (the frontier's "seen" check and the visited check), as the crawler does;
+the new path normalizes with the cached `UrlCanonicalizer.canonicalize`.
+
+    uv run benchmarks/bench_url_filter.py --links 1000000 --unique 50000
+"""
+
+import random
+import re
+import time
+from urllib.parse import urlparse
+
+import fire
+from loguru import logger
+from smolcrawler.url_filter import UrlFilter
+from smolcrawler.url_utils import UrlCanonicalizer, normalize_url
+
+
+def is_valid_url_old(url: str, url_prefix: str | None = None, filter_regex: re.Pattern | None = None) -> bool:
+    """The previous implementation, kept as the baseline."""
+    try:
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https"):
+            logger.debug(f"Skipping URL with invalid scheme: {url}")
+            return False
+        if url_prefix and not url.startswith(url_prefix):
+            return False
+        path = parsed.path.split("?")[0]
+        if path and "." in path:
+            ext = path.split(".")[-1].lower()
+            if ext.isalpha() and (ext not in ["", "html", "htm", "php", "asp", "aspx", "jsp", "md", "markdown", "txt"]):
+                logger.debug(f"Skipping URL with invalid extension: {url}, extension: {ext}")
+                return False
+        if filter_regex and not filter_regex.search(url):
+            logger.debug(f"Skipping URL with regex not matching: {url}, regex: {filter_regex}")
+            return False
+        return True
+    except Exception as e:
+        logger.error(f"Error validating URL {url}: {e}")
+        return False
+
+
+def make_links(count: int, unique: int, rng: random.Random) -> list[str]:
+    """Site-shaped links: navigation and assets repeat on every page, so a few URLs make up most links."""
+    pool = []
+    for i in range(unique):
+        kind = rng.random()
+        if kind < 0.6:
+            pool.append(f"https://example.com/docs/section{i % 50}/page{i}")
+        elif kind < 0.75:
+            pool.append(f"https://example.com/docs/page{i}.html#part{i % 7}")
+        elif kind < 0.9:
+            pool.append(f"https://example.com/static/asset{i}.{rng.choice(['css', 'js', 'png', 'svg'])}")
+        else:
+            pool.append(f"https://other.org/blog/{i}/")
+    # zipf-like: low indexes (site navigation) show up far more often
+    weights = [1 / (i + 1) for i in range(unique)]
+    return rng.choices(pool, weights=weights, k=count)
+
+
+def main(links: int = 1_000_000, unique: int = 50_000, seed: int = 0):
+    logger.remove()
+    logger.add(lambda _: None, level="INFO")  # a handler is installed, but debug logging is off
+
+    links_list = make_links(links, unique, random.Random(seed))
+    prefix = "https://example.com"
+    regex = re.compile(r"/docs/")
+
+    start = time.perf_counter()
+    old_kept = 0
+    for link in links_list:
+        if is_valid_url_old(link, prefix, regex):
+            normalize_url(link)
+            normalize_url(link)
+            old_kept += 1
+    old = time.perf_counter() - start
+
+    url_filter = UrlFilter(regex)
+    canonicalizer = UrlCanonicalizer()
+    start = time.perf_counter()
+    new_kept = 0
+    for link in links_list:
+        if url_filter.accepts(link, prefix):
+            canonicalizer.canonicalize(link)
+            canonicalizer.canonicalize(link)
+            new_kept += 1
+    new = time.perf_counter() - start
+
+    assert old_kept == new_kept, (old_kept, new_kept)
+    print(f"{links:,} links ({unique:,} unique), {new_kept:,} kept")
+    print(f"old functions: {links / old:12,.0f} links/s")
+    print(f"UrlFilter:     {links / new:12,.0f} links/s")
+    print(f"speedup: {old / new:.2f}x, cache: {url_filter.cache_info()}, {canonicalizer.canonicalize.cache_info()}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,66 @@
+"""Resident memory of the visited URL stores: plain sets against `FingerprintSet` and `ScalableBloomFilter`.
+
+Like the crawler, every URL goes into two stores, one for the URL and one for
+its normalized form. Each store kind runs in its own process so that its RSS
+growth is measured on its own.
+
+    uv run benchmarks/bench_visited.py --sizes 1000000,10000000
+"""
+
+import subprocess
+import sys
+import time
+
+import fire
+from smolcrawler.visited import FingerprintSet, ScalableBloomFilter
+
+STORES = {
+    "set": set,
+    "fingerprint": FingerprintSet,
+    "bloom (1e-4)": lambda: ScalableBloomFilter(error_rate=1e-4),
+}
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("VmRSS not found")
+
+
+def child(store: str, urls: int) -> None:
+    visited_urls, visited_variations = STORES[store](), STORES[store]()
+    before = rss_bytes()
+    start = time.perf_counter()
+    for i in range(urls):
+        url = f"https://example.com/docs/section{i % 1000}/page{i}/"
+        visited_urls.add(url)
+        visited_variations.add(url[:-1])
+    elapsed = time.perf_counter() - start
+    misses = sum(f"https://example.com/missing{i}" in visited_urls for i in range(100_000))
+    print(f"{rss_bytes() - before} {elapsed} {misses}")
+
+
+def main(sizes: str = "1000000", child_store: str | None = None, child_urls: int = 0):
+    if child_store is not None:
+        child(child_store, child_urls)
+        return
+
+    for urls in (int(size) for size in str(sizes).split(",")):
+        for store in STORES:
+            out = subprocess.run(
+                [sys.executable, __file__, "--child_store", store, "--child_urls", str(urls)],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.split()
+            rss, elapsed, misses = int(out[0]), float(out[1]), int(out[2])
+            print(
+                f"{urls:>11,} URLs {store:>13}: {rss / 2**20:8.1f} MiB RSS, {rss / urls / 2:6.1f} B/entry, "
+                f"{2 * urls / elapsed:10,.0f} adds/s, {misses / 1000:.3f}% false positives"
+            )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,161 @@
+"""Configurable synthetic sites for benchmarks, served in-process or over local HTTP.
+
+A site is fully determined by its `SiteSpec`, seed included, so runs are
+reproducible: the same pages, links, duplicates, errors and latencies.
+"""
+
+import asyncio
+import random
+import re
+from dataclasses import dataclass
+from typing import List
+
+import httpx
+
+WORDS = "crawler page link frontier visitor content markdown latency fetch queue host depth table index".split()
+
+
+@dataclass
+class SiteSpec:
+    pages: int = 1000
+    fanout: int = 8  # links per page
+    html_bytes: int = 20_000  # approximate HTML size of a page
+    duplicate_ratio: float = 0.05  # share of pages with the content of another page
+    latency_median: float = 0.01  # seconds
+    latency_sigma: float = 0.8  # lognormal sigma: 0 is constant, 1+ is heavy-tailed
+    error_rate: float = 0.01  # share of pages failing with a 500
+    seed: int = 0
+
+
+class SyntheticSite:
+    """Pages p0..p{n-1} reachable from p0: every page links to its children in a tree, then to random pages."""
+
+    def __init__(self, spec: SiteSpec, base: str = "https://bench.local"):
+        self.spec = spec
+        self.base = base
+        rng = random.Random(spec.seed)
+        n = spec.pages
+        self.latencies = [spec.latency_median * rng.lognormvariate(0, spec.latency_sigma) for _ in range(n)]
+        # p0 never fails, or there would be no crawl at all
+        self.errors = [i > 0 and rng.random() < spec.error_rate for i in range(n)]
+        self.content_of = [rng.randrange(i) if i > 0 and rng.random() < spec.duplicate_ratio else i for i in range(n)]
+        self.links: List[List[int]] = []
+        for i in range(n):
+            children = [j for j in range(i * spec.fanout + 1, (i + 1) * spec.fanout + 1) if j < n]
+            extra = [rng.randrange(n) for _ in range(spec.fanout - len(children))]
+            self.links.append(children + extra)
+        self._filler = " ".join(rng.choice(WORDS) for _ in range(max(1, spec.html_bytes // 7)))
+
+    def url(self, i: int) -> str:
+        return f"{self.base}/p{i}"
+
+    def index(self, url: str) -> int:
+        return int(url.rsplit("/p", 1)[1])
+
+    def html(self, i: int) -> str:
+        links = "".join(f'<li><a href="/p{j}">page {j}</a></li>' for j in self.links[i])
+        source = self.content_of[i]
+        # every page's text differs by its own prefix, except duplicates which share their source's
+        text = f"Page {source}. " + self._filler[: max(0, self.spec.html_bytes - len(links) - 200)]
+        return (
+            f"<html><head><title>Page {i}</title></head><body>"
+            f"<nav><ul>{links}</ul></nav><main><p>{text}</p></main></body></html>"
+        )
+
+    def content(self, html: str) -> str:
+        """A stand-in for the markdown conversion: the text of the main element."""
+        main = html[html.find("<main>") :]
+        return re.sub(r"<[^>]+>", "", main)
+
+
+@dataclass
+class Page:
+    url: str
+    html: str
+    content: str
+    title: str = ""
+
+
+class InProcessVisitor:
+    """A stand-in for `localwebpy.Visitor` serving the site without any I/O besides the simulated latency."""
+
+    def __init__(self, site: SyntheticSite):
+        self.site = site
+
+    async def visit_many(self, urls: List[str]) -> List[Page | None]:
+        async def visit(url: str) -> Page | None:
+            i = self.site.index(url)
+            await asyncio.sleep(self.site.latencies[i])
+            if self.site.errors[i]:
+                return None
+            html = self.site.html(i)
+            return Page(url=url, html=html, content=self.site.content(html), title=f"Page {i}")
+
+        return await asyncio.gather(*(visit(url) for url in urls))
+
+
+class SiteServer:
+    """Serves the site over HTTP/1.1 on 127.0.0.1, with its latencies and 500 errors."""
+
+    def __init__(self, site: SyntheticSite):
+        self.site = site
+        self.server: asyncio.Server | None = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        base = f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        self.site.base = base
+        return base
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await reader.readuntil(b"\r\n\r\n")
+                path = request.split(b" ", 2)[1].decode()
+                try:
+                    i = self.site.index(path)
+                except ValueError:
+                    i = -1
+                if 0 <= i < self.site.spec.pages:
+                    await asyncio.sleep(self.site.latencies[i])
+                if i < 0 or i >= self.site.spec.pages:
+                    status, body = b"404 Not Found", b""
+                elif self.site.errors[i]:
+                    status, body = b"500 Internal Server Error", b""
+                else:
+                    status, body = b"200 OK", self.site.html(i).encode()
+                writer.write(
+                    b"HTTP/1.1 %s\r\nContent-Type: text/html; charset=utf-8\r\nContent-Length: %d\r\n\r\n"
+                    % (status, len(body))
+                    + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class HttpxVisitor:
+    """A minimal HTTP visitor: fetches with httpx and converts with `SyntheticSite.content`."""
+
+    def __init__(self, site: SyntheticSite, concurrency: int, timeout: float = 30):
+        self.site = site
+        self.client = httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(max_connections=concurrency * 2))
+
+    async def visit_many(self, urls: List[str]) -> List[Page | None]:
+        async def visit(url: str) -> Page | None:
+            response = await self.client.get(url)
+            if response.status_code != 200:
+                return None
+            html = response.text
+            return Page(url=str(response.url), html=html, content=self.site.content(html))
+
+        return await asyncio.gather(*(visit(url) for url in urls))
+
+    async def close(self) -> None:
+        await self.client.aclose()
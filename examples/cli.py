@@ -1,5 +1,9 @@
 import fire
 from smolcrawler import Crawler
+from smolcrawler.gate import ContentGate
+from smolcrawler.hooks import TraceRecorder
+from smolcrawler.retry import CircuitBreaker, RetryQueue
+from smolcrawler.sinks import open_sink
 
 
 async def main(
@@ -12,7 +16,17 @@ async def main(
     truncate: int = 200,
     skip_url: bool = False,
     limit: int = -1,
+    output: str = None,  # pages.jsonl, pages.jsonl.zst, pages.parquet, or a directory for a markdown tree
+    include_html: bool = False,  # also write the html of pages to `output`
+    drop_html: bool = False,  # release the html of pages as soon as their links are extracted
+    tiered: bool = False,  # fetch over plain HTTP, use a browser only for pages that need it
+    max_page_bytes: int = None,  # skip non-HTML pages, and pages larger than this, by their response headers
+    deadline: float = None,  # seconds the crawl may take, fetches in flight then are cancelled
+    retries: int = 0,  # retry failed pages this many times, and stop fetching from hosts that keep failing
+    profile: bool = False,  # write a per-page timeline and print where the time went
+    profile_output: str = "crawl-trace.json",  # Chrome trace, open in chrome://tracing or ui.perfetto.dev
 ):
+    recorder = TraceRecorder() if profile else None
     crawler = Crawler(
         depth=depth,
         concurrency=concurrency,
@@ -20,11 +34,34 @@ async def main(
         url_prefix=url_prefix,
         filter_regex=filter_regex,
         limit=limit,
+        hooks=recorder,
+        tiered=tiered,
+        drop_html=drop_html and not include_html,
+        content_gate=ContentGate(max_bytes=max_page_bytes, timeout=timeout) if max_page_bytes else None,
+        deadline=deadline,
+        retries=RetryQueue(max_attempts=retries + 1) if retries else None,
+        circuit_breaker=CircuitBreaker() if retries else None,
     )
-    async for webpage in crawler.run(url):
-        content_length = len(webpage.content) if webpage.content else 0
-        html_length = len(webpage.html) if webpage.html else 0
-        print(f"+++ {content_length}/{html_length} {webpage.title}: {webpage.url}")
+    if output:
+        stats = await crawler.run_to(url, open_sink(output, include_html=include_html))
+        print(f"{stats.fetched} pages written to {output}")
+    else:
+        async for webpage in crawler.run(url):
+            content_length = len(webpage.content) if webpage.content else 0
+            html_length = len(webpage.html) if webpage.html else 0
+            print(f"+++ {content_length}/{html_length} {webpage.title}: {webpage.url}")
+
+    if crawler.tiered_visitor is not None:
+        print(f"Pages per fetch tier: {crawler.tiered_visitor.stats()}")
+
+    if crawler.content_gate is not None:
+        print(f"Content gate: {crawler.content_gate.stats()}")
+
+    if recorder is not None:
+        recorder.finish()
+        recorder.write_chrome_trace(profile_output)
+        print(recorder.summary())
+        print(f"Trace written to {profile_output}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,203 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import List
+
+import httpx
+from localwebpy import Visitor, Webpage
+from loguru import logger
+
+
+@dataclass
+class CachedPage:
+    url: str
+    etag: str | None
+    last_modified: str | None
+    title: str | None
+    html: str | None
+    content: str | None
+
+    def to_webpage(self) -> Webpage:
+        return Webpage(url=self.url, title=self.title, html=self.html, content=self.content)
+
+
+class ResponseCache:
+    """On-disk cache of converted pages with their ETag / Last-Modified validators.
+
+    Entries are evicted least recently used first once their total size
+    (html + content) exceeds `max_bytes`. The methods block on sqlite and
+    may be called from any thread; `CachingVisitor` calls them through
+    `asyncio.to_thread`, off the event loop.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1 << 30):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0  # revalidated with a 304, served from the cache
+        self.misses = 0  # not cached
+        self.stale = 0  # cached, but the page changed
+        self.evictions = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()  # one statement at a time on the shared connection
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                title TEXT,
+                html TEXT,
+                content TEXT,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+            """
+        )
+        self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, url: str) -> CachedPage | None:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT url, etag, last_modified, title, html, content FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        return CachedPage(*row) if row else None
+
+    def touch(self, url: str) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), url))
+
+    def put(self, page: CachedPage) -> None:
+        size = len(page.html or "") + len(page.content or "")
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._put(page, size)
+
+    def _put(self, page: CachedPage, size: int) -> None:
+        with self.conn:
+            old = self.conn.execute("SELECT size FROM responses WHERE url = ?", (page.url,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (page.url, page.etag, page.last_modified, page.title, page.html, page.content, size, time.time()),
+            )
+        self.size += size - (old[0] if old else 0)
+        if self.size > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        # drop down to 90% of the budget, so that eviction does not run on every put
+        target = self.max_bytes * 0.9
+        with self.conn:
+            for url, size in self.conn.execute("SELECT url, size FROM responses ORDER BY last_used").fetchall():
+                if self.size <= target:
+                    break
+                self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self.size -= size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "size": self.size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+class CachingVisitor:
+    """Wraps a `Visitor`, revisiting cached pages with conditional requests.
+
+    For every cached URL a GET is sent with If-None-Match / If-Modified-Since
+    from the cached entry and only its headers are read. On a 304 the cached
+    page is returned as is, without fetching or converting it again; otherwise
+    the response is dropped and the URL goes through the wrapped visitor, and
+    the result is cached with the validators of the response. URLs not in the
+    cache go to the wrapped visitor right away; their validators come from
+    the page's `headers` when the visitor sets them, from a HEAD request
+    otherwise, so a miss costs one GET and one bodiless HEAD.
+    """
+
+    def __init__(
+        self,
+        visitor: Visitor,
+        cache: ResponseCache,
+        timeout: int = 60,
+        client: httpx.AsyncClient | None = None,
+    ):
+        self.visitor = visitor
+        self.cache = cache
+        self.client = client or httpx.AsyncClient(timeout=timeout, follow_redirects=True)
+
+    async def _revalidate(self, url: str, cached: CachedPage | None) -> tuple[int | None, httpx.Headers | None]:
+        if cached is None or not (cached.etag or cached.last_modified):
+            return None, None
+        headers = {}
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        try:
+            async with self.client.stream("GET", url, headers=headers) as response:
+                # leaving the block without reading the body closes the connection
+                return response.status_code, response.headers
+        except httpx.HTTPError as e:
+            logger.debug(f"Revalidating {url} failed: {e}")
+            return None, None
+
+    async def _validators(
+        self, url: str, webpage: Webpage, probed: httpx.Headers | None
+    ) -> tuple[str | None, str | None]:
+        """(ETag, Last-Modified) of a page the wrapped visitor fetched."""
+        headers = probed if probed is not None else getattr(webpage, "headers", None)
+        if headers is None:
+            try:
+                headers = (await self.client.head(url)).headers
+            except httpx.HTTPError as e:
+                logger.debug(f"Getting the validators of {url} failed: {e}")
+                return None, None
+        return headers.get("etag"), headers.get("last-modified")
+
+    async def _store(self, url: str, webpage: Webpage | None, probed: httpx.Headers | None) -> None:
+        if webpage is None or not webpage.content:
+            return
+        etag, last_modified = await self._validators(url, webpage, probed)
+        if etag or last_modified:
+            page = CachedPage(url, etag, last_modified, webpage.title, webpage.html, webpage.content)
+            await asyncio.to_thread(self.cache.put, page)
+
+    async def visit_many(self, url_or_webpages: List[str | Webpage]) -> List[Webpage]:
+        urls = [item if isinstance(item, str) else item.url for item in url_or_webpages]
+        cached_pages = await asyncio.gather(*(asyncio.to_thread(self.cache.get, url) for url in urls))
+        probes = await asyncio.gather(*(self._revalidate(url, cached) for url, cached in zip(urls, cached_pages)))
+
+        results: dict[int, Webpage] = {}
+        to_visit: list[int] = []
+        for i, (cached, (status_code, _)) in enumerate(zip(cached_pages, probes)):
+            if cached is not None and status_code == 304:
+                self.cache.hits += 1
+                await asyncio.to_thread(self.cache.touch, cached.url)
+                results[i] = cached.to_webpage()
+                continue
+            if cached is None:
+                self.cache.misses += 1
+            else:
+                self.cache.stale += 1
+            to_visit.append(i)
+
+        if to_visit:
+            webpages = await self.visitor.visit_many([url_or_webpages[i] for i in to_visit])
+            for i, webpage in zip(to_visit, webpages):
+                results[i] = webpage
+            await asyncio.gather(*(self._store(urls[i], results[i], probes[i][1]) for i in to_visit))
+
+        return [results[i] for i in sorted(results)]
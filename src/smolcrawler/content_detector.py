@@ -1,5 +1,16 @@
 import hashlib
-from typing import Protocol, runtime_checkable
+import zlib
+from array import array
+from collections import Counter
+from functools import lru_cache, partial
+from typing import Callable, Protocol, runtime_checkable
+
+from .visited import FingerprintSet
+
+try:
+    import xxhash
+except ImportError:  # optional, see `fast_hash`
+    xxhash = None
 
 
 @runtime_checkable
@@ -16,13 +27,33 @@ class ContentDetector(Protocol):
         """Clear all tracked content."""
         ...
 
+    def fingerprint(self, content: str) -> str | None:
+        """Compact form of content that `add_fingerprint` can restore, used to persist crawl state."""
+        return None
+
+    def add_fingerprint(self, fingerprint: str) -> None:
+        """Add content by its `fingerprint`."""
+        ...
+
+    def is_duplicate_fingerprint(self, fingerprint: str) -> bool:
+        """Check if the content with this `fingerprint` is duplicate."""
+        ...
+
+    def fingerprinter(self) -> Callable[[str], str] | None:
+        """A picklable function computing `fingerprint`, so that it can run in a worker process."""
+        return None
+
+
+def _md5_hex(content: str) -> str:
+    return hashlib.md5(content.encode()).hexdigest()
+
 
 class HashBasedDetector(ContentDetector):
     def __init__(self):
         self.content_hashes: set[str] = set()
 
     def _get_hash(self, content: str) -> str:
-        return hashlib.md5(content.encode()).hexdigest()
+        return _md5_hex(content)
 
     def is_duplicate(self, content: str) -> bool:
         content_hash = self._get_hash(content)
@@ -36,19 +67,372 @@ class HashBasedDetector(ContentDetector):
     def clear(self) -> None:
         self.content_hashes.clear()
 
+    def fingerprint(self, content: str) -> str | None:
+        return self._get_hash(content)
+
+    def add_fingerprint(self, fingerprint: str) -> None:
+        self.content_hashes.add(fingerprint)
+
+    def is_duplicate_fingerprint(self, fingerprint: str) -> bool:
+        return fingerprint in self.content_hashes
+
+    def fingerprinter(self) -> Callable[[str], str] | None:
+        return _md5_hex
+
+
+_MASK64 = (1 << 64) - 1
+_EMPTY_BIN = 0xFFFFFFFF
+
+
+def fast_hash(content: str | bytes, bits: int = 64) -> int:
+    """Non-cryptographic 64 or 128-bit hash of `content`, never 0.
+
+    XXH3 when the `xxhash` package is installed, otherwise blake2b cut to the
+    width; unlike the str hash, it is stable across processes.
+    """
+    data = content.encode("utf-8", "surrogatepass") if isinstance(content, str) else content
+    if bits == 64:
+        if xxhash is not None:
+            digest = xxhash.xxh3_64_intdigest(data)
+        else:
+            digest = int.from_bytes(hashlib.blake2b(data, digest_size=8).digest())
+    elif bits == 128:
+        if xxhash is not None:
+            digest = xxhash.xxh3_128_intdigest(data)
+        else:
+            digest = int.from_bytes(hashlib.blake2b(data, digest_size=16).digest())
+    else:
+        raise ValueError(f"bits must be 64 or 128, got {bits}")
+    return digest or 1
+
+
+HASH_ALGORITHM = "xxh3" if xxhash is not None else "blake2b"
+
+
+def fingerprint_algorithm(fingerprint: str) -> str | None:
+    """The hash algorithm a fingerprint is tagged with, e.g. "xxh3" in "xxh3:9f2c...", None if untagged."""
+    algorithm, sep, _ = fingerprint.rpartition(":")
+    return algorithm if sep else None
+
+
+_DIGITS = b"0123456789"
+_SPACES = b" \t\v\f\r"
+
+
+class ContentNormalizer:
+    """Makes pages that differ only in volatile details hash the same.
+
+    Whitespace is dropped, and with `mask_digits` so are digits (dates,
+    times, view counters), at the risk of merging pages that differ only in
+    numbers, like changelogs or pagination. With `boilerplate_pages`, lines
+    found on that many of the first `sample` pages `learn`ed are dropped too:
+    navigation, cookie banners and footers repeated across a site. Nothing is
+    stripped until the sample is complete, then the boilerplate is fixed, so
+    a page normalizes the same whenever it comes; `FastHashDetector` re-hashes
+    the sample pages at that point. A page made of boilerplate alone is kept
+    whole. One normalizer serves one crawl, which stays on one site.
+    Everything is `bytes.translate` on the UTF-8 bytes that get hashed anyway,
+    so it runs at memory speed rather than one Python object per word.
+    """
+
+    def __init__(
+        self,
+        mask_digits: bool = False,
+        boilerplate_pages: int | None = None,
+        sample: int = 100,  # pages the boilerplate is learned from, at least `boilerplate_pages`
+    ):
+        if boilerplate_pages is not None and boilerplate_pages > sample:
+            raise ValueError(f"boilerplate_pages must be at most sample={sample}, got {boilerplate_pages}")
+        self.mask_digits = mask_digits
+        self.boilerplate_pages = boilerplate_pages
+        self.sample = sample
+        self.boilerplate: frozenset[int] | None = None  # hashes of the boilerplate lines, once learned
+        self._line_pages: Counter = Counter()
+        self._learned = 0
+        self._drop = _SPACES + _DIGITS if mask_digits else _SPACES
+
+    @property
+    def learning(self) -> bool:
+        """Whether the boilerplate is still being learned, and pages are normalized without stripping it."""
+        return self.boilerplate_pages is not None and self.boilerplate is None
+
+    def _lines(self, content: str) -> list[bytes]:
+        lines = [line.translate(None, self._drop) for line in content.encode("utf-8", "surrogatepass").splitlines()]
+        return [line for line in lines if line]
+
+    def learn(self, content: str) -> bool:
+        """Count the lines of a page kept by the crawl, returns True when this completes the sample."""
+        if not self.learning:
+            return False
+        # keyed by the bytes hash, the lines themselves are not kept
+        self._line_pages.update({hash(line) for line in self._lines(content)})
+        self._learned += 1
+        if self._learned < self.sample:
+            return False
+        self.boilerplate = frozenset(key for key, pages in self._line_pages.items() if pages >= self.boilerplate_pages)
+        self._line_pages = Counter()
+        return True
+
+    def __call__(self, content: str) -> bytes:
+        if self.boilerplate_pages is None:
+            return content.encode("utf-8", "surrogatepass").translate(None, self._drop + b"\n")
+        lines = self._lines(content)
+        if self.boilerplate is None:
+            return b"\n".join(lines)
+        kept = [line for line in lines if hash(line) not in self.boilerplate]
+        return b"\n".join(kept or lines)
+
+
+def _fast_fingerprint(content: str, bits: int, normalizer: ContentNormalizer | None) -> str:
+    return f"{HASH_ALGORITHM}:{fast_hash(normalizer(content) if normalizer else content, bits):x}"
+
+
+class FastHashDetector(ContentDetector):
+    """Exact duplicates by a fast 64-bit (or 128-bit) hash of the content, optionally normalized first.
+
+    A page is hashed once even though the crawler asks `is_duplicate` and then
+    `add_content`. 64-bit digests are kept in a `FingerprintSet`, about 21 bytes
+    per page, against ~115 for a set of md5 hex strings. While a normalizer
+    learns boilerplate, the pages added are kept and hashed again once it is
+    known; their fingerprints handed out before keep the boilerplate.
+    Fingerprints are tagged with the hash algorithm, XXH3 or blake2b depending
+    on whether `xxhash` is installed, and ones of the other algorithm are
+    refused rather than never matching.
+    """
+
+    def __init__(self, normalizer: ContentNormalizer | None = None, bits: int = 64):
+        if bits not in (64, 128):
+            raise ValueError(f"bits must be 64 or 128, got {bits}")
+        self.normalizer = normalizer
+        self.bits = bits
+        self.digests: FingerprintSet | set[int] = FingerprintSet() if bits == 64 else set()
+        self._last: tuple[str, int] | None = None
+        self._sample: list[tuple[int, str | None]] = []  # pages added while the normalizer learns
+        self._contents: dict[int, str] = {}  # digest -> content, of pages hashed while it learns
+
+    def __len__(self) -> int:
+        return len(self.digests)
+
+    def digest(self, content: str) -> int:
+        if self._last is not None and self._last[0] is content:
+            return self._last[1]
+        result = fast_hash(self.normalizer(content) if self.normalizer else content, self.bits)
+        self._last = (content, result)
+        if self.normalizer is not None and self.normalizer.learning:
+            self._contents[result] = content
+        return result
+
+    def _contains(self, digest: int) -> bool:
+        if self.bits == 64:
+            return self.digests.contains_fingerprint(digest)
+        return digest in self.digests
+
+    def _add(self, digest: int) -> None:
+        if self.bits == 64:
+            self.digests.add_fingerprint(digest)
+        else:
+            self.digests.add(digest)
+
+    def _record(self, digest: int) -> None:
+        self._add(digest)
+        if self.normalizer is None or not self.normalizer.learning:
+            return
+        # restored fingerprints have no content, they are kept as they are
+        content = self._contents.pop(digest, None)
+        self._sample.append((digest, content))
+        if content is not None and self.normalizer.learn(content):
+            self._rehash()
+
+    def _rehash(self) -> None:
+        """Hash the sample pages again, now that the boilerplate is known."""
+        sample, self._sample = self._sample, []
+        self._contents.clear()
+        self._last = None
+        self.digests = FingerprintSet() if self.bits == 64 else set()
+        for digest, content in sample:
+            self._add(self.digest(content) if content is not None else digest)
+
+    def is_duplicate(self, content: str) -> bool:
+        return self._contains(self.digest(content))
+
+    def add_content(self, content: str) -> None:
+        self._record(self.digest(content))
+
+    def clear(self) -> None:
+        self.digests = FingerprintSet() if self.bits == 64 else set()
+        self._last = None
+        self._sample = []
+        self._contents = {}
+
+    def fingerprint(self, content: str) -> str | None:
+        return f"{HASH_ALGORITHM}:{self.digest(content):x}"
+
+    def _parse(self, fingerprint: str) -> int:
+        algorithm = fingerprint_algorithm(fingerprint)
+        if algorithm is not None and algorithm != HASH_ALGORITHM:
+            raise ValueError(
+                f"Fingerprint hashed with {algorithm}, this process hashes with {HASH_ALGORITHM}: "
+                f"{'uninstall' if algorithm == 'blake2b' else 'install'} the fast-hash extra or start a new crawl"
+            )
+        # untagged fingerprints of other detectors, e.g. md5 ones from an older saved crawl, keep their low `bits` bits
+        return (int(fingerprint.rpartition(":")[2], 16) & ((1 << self.bits) - 1)) or 1
+
+    def add_fingerprint(self, fingerprint: str) -> None:
+        self._record(self._parse(fingerprint))
+
+    def is_duplicate_fingerprint(self, fingerprint: str) -> bool:
+        return self._contains(self._parse(fingerprint))
+
+    def fingerprinter(self) -> Callable[[str], str] | None:
+        if self.normalizer is not None and self.normalizer.boilerplate_pages is not None:
+            # boilerplate is learned across pages, in this process
+            return None
+        return partial(_fast_fingerprint, bits=self.bits, normalizer=self.normalizer)
+
+
+@lru_cache
+def _optimal_bands(num_perm: int, threshold: float, false_positive_weight: float = 0.1) -> tuple[int, int]:
+    """Pick (bands, rows) minimizing the weighted false positive + false negative probability around `threshold`.
+
+    False positives are weighted low: candidates are verified against their
+    signature anyway, while a false negative is a missed duplicate.
+    """
+
+    def integrate(f, a: float, b: float, steps: int = 100) -> float:
+        step = (b - a) / steps
+        return sum(f(a + (i + 0.5) * step) for i in range(steps)) * step
+
+    best, best_error = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            false_positive = integrate(lambda s: 1 - (1 - s**rows) ** bands, 0.0, threshold)
+            false_negative = integrate(lambda s: (1 - s**rows) ** bands, threshold, 1.0)
+            error = false_positive_weight * false_positive + (1 - false_positive_weight) * false_negative
+            if error < best_error:
+                best, best_error = (bands, rows), error
+    return best
+
+
+def minhash_signature(content: str, num_perm: int, shingle_size: int) -> array:
+    """MinHash signature of the word shingles of `content`, with `num_perm` 32-bit slots."""
+    words = [zlib.crc32(word.encode()) for word in content.split()] or [0]
+    k = min(shingle_size, len(words))
+    # combine the word hashes of every shingle into one 64-bit hash
+    shingles = words[: len(words) - k + 1]
+    for i in range(1, k):
+        shingles = [((h * 0x9E3779B97F4A7C15) ^ w) & _MASK64 for h, w in zip(shingles, words[i:])]
+
+    mask = num_perm - 1
+    shift = num_perm.bit_length() - 1
+    bins = [_EMPTY_BIN] * num_perm
+    for h in set(shingles):
+        h = (h * 0xBF58476D1CE4E5B9) & _MASK64
+        h ^= h >> 31
+        slot, value = h & mask, (h >> shift) & 0xFFFFFFFF
+        if value < bins[slot]:
+            bins[slot] = value
+
+    # densification: an empty bin borrows the value of the next non-empty one
+    if _EMPTY_BIN in bins:
+        filled = [i for i, v in enumerate(bins) if v != _EMPTY_BIN]
+        for i, v in enumerate(bins):
+            if v == _EMPTY_BIN:
+                j = next((f for f in filled if f > i), filled[0])
+                bins[i] = (bins[j] + (j - i) * 0x9E3779B1) & 0xFFFFFFFF
+
+    return array("I", bins)
+
+
+def _signature_hex(content: str, num_perm: int, shingle_size: int) -> str:
+    return minhash_signature(content, num_perm, shingle_size).tobytes().hex()
+
 
-# Future implementation for similarity detection
 class SimilarityBasedDetector(ContentDetector):
-    def __init__(self, threshold: float = 0.8):
+    """Near-duplicate detection with MinHash signatures and an LSH band index.
+
+    Content is split into word shingles, which are summarized in a
+    `num_perm`-slot MinHash signature (one-permutation hashing with
+    densification, so a page is hashed once instead of once per slot).
+    Signatures are split into bands; pages sharing a band are candidates, and a
+    candidate is a duplicate if the estimated Jaccard similarity of their
+    shingles is at least `threshold`. Only signatures are kept, 4 bytes per
+    slot, and a lookup touches `bands` buckets instead of every page.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, shingle_size: int = 3):
+        if num_perm & (num_perm - 1):
+            raise ValueError(f"num_perm must be a power of two, got {num_perm}")
         self.threshold = threshold
-        self.contents: list[str] = []
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _optimal_bands(num_perm, threshold)
+        self.signatures = array("I")  # the signature of page i is at [i * num_perm, (i + 1) * num_perm)
+        # band key -> id of the first page in that bucket, or a list of ids once there are several
+        self.buckets: list[dict[int, int | list[int]]] = [{} for _ in range(self.bands)]
+        self._last: tuple[str, array] | None = None
+
+    def __len__(self) -> int:
+        return len(self.signatures) // self.num_perm
+
+    def signature(self, content: str) -> array:
+        if self._last is not None and self._last[0] is content:
+            return self._last[1]
+        result = minhash_signature(content, self.num_perm, self.shingle_size)
+        self._last = (content, result)
+        return result
+
+    def _band_keys(self, signature: array) -> list[int]:
+        return [hash(tuple(signature[b * self.rows : (b + 1) * self.rows])) for b in range(self.bands)]
+
+    def similarity(self, a: array, b: array) -> float:
+        return sum(x == y for x, y in zip(a, b)) / self.num_perm
+
+    def _find(self, signature: array) -> int | None:
+        checked = set()
+        for band, key in zip(self.buckets, self._band_keys(signature)):
+            bucket = band.get(key)
+            if bucket is None:
+                continue
+            for page in bucket if isinstance(bucket, list) else (bucket,):
+                if page in checked:
+                    continue
+                checked.add(page)
+                start = page * self.num_perm
+                if self.similarity(signature, self.signatures[start : start + self.num_perm]) >= self.threshold:
+                    return page
+        return None
 
     def is_duplicate(self, content: str) -> bool:
-        # TODO: Implement similarity detection using libraries like difflib or fuzzywuzzy
-        return False
+        return self._find(self.signature(content)) is not None
+
+    def _add_signature(self, signature: array) -> None:
+        page = len(self)
+        self.signatures.extend(signature)
+        for band, key in zip(self.buckets, self._band_keys(signature)):
+            bucket = band.get(key)
+            if bucket is None:
+                band[key] = page
+            elif isinstance(bucket, list):
+                bucket.append(page)
+            else:
+                band[key] = [bucket, page]
 
     def add_content(self, content: str) -> None:
-        self.contents.append(content)
+        self._add_signature(self.signature(content))
 
     def clear(self) -> None:
-        self.contents.clear()
+        self.signatures = array("I")
+        self.buckets = [{} for _ in range(self.bands)]
+        self._last = None
+
+    def fingerprint(self, content: str) -> str | None:
+        return self.signature(content).tobytes().hex()
+
+    def add_fingerprint(self, fingerprint: str) -> None:
+        self._add_signature(array("I", bytes.fromhex(fingerprint)))
+
+    def is_duplicate_fingerprint(self, fingerprint: str) -> bool:
+        return self._find(array("I", bytes.fromhex(fingerprint))) is not None
+
+    def fingerprinter(self) -> Callable[[str], str] | None:
+        return partial(_signature_hex, num_perm=self.num_perm, shingle_size=self.shingle_size)
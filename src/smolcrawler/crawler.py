@@ -1,12 +1,71 @@
+import asyncio
+import copy
+import os
 import re
-from typing import AsyncGenerator, List, Set, Tuple
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from dataclasses import dataclass
+from typing import AsyncGenerator, Callable, Deque, Dict, Iterable, List, NamedTuple, Set, Tuple
 
 from localwebpy import SmartVisitor, Visitor, Webpage
 from loguru import logger
 
-from .content_detector import ContentDetector, HashBasedDetector
-from .url_utils import normalize_url
-from .utils import extract_urls, get_default_url_prefix, is_valid_url
+from .cache import CachingVisitor, ResponseCache
+from .content_detector import ContentDetector, FastHashDetector
+from .distributed import CoordinationBackend, ShardFrontier
+from .frontier import Frontier, PriorityFrontier
+from .gate import ContentGate, SkippedPage
+from .hooks import CrawlHooks
+from .incremental import GONE_STATUS_CODES, UNCHANGED, ChangedPage, IncrementalCrawl
+from .politeness import HostScheduler
+from .processing import ProcessedPage, create_executor, process_page
+from .retry import CircuitBreaker, DelayQueue, RetryQueue, failed_status
+from .scoring import Scorer
+from .sinks import Sink, open_sink
+from .sitemap import SitemapSeeder
+from .state import StateStore
+from .stats import CrawlStats
+from .tiered import TieredVisitor
+from .url_filter import UrlFilter
+from .url_utils import TrapDetector, UrlCanonicalizer
+from .utils import extract_urls, get_default_url_prefix
+from .visited import UrlSet, memory_bytes
+
+# how many pages (in multiples of `concurrency`) may be fetched ahead of the page
+# currently waiting to be yielded
+_REORDER_WINDOW = 4
+# how many URLs (in multiples of `concurrency`) may wait for a busy host while URLs
+# of other hosts are dispatched
+_PARKED_WINDOW = 4
+
+
+class _PendingPage(NamedTuple):
+    url: str
+    depth: int
+    task: asyncio.Task
+
+
+class _Offload(NamedTuple):
+    executor: Executor
+    slots: asyncio.Semaphore  # bounds the pages waiting for or being processed by the executor
+    prefix: str
+
+
+@dataclass
+class Seed:
+    """A start URL of `Crawler.run_many`, with settings overriding the crawler's for this seed only."""
+
+    url: str
+    depth: int | None = None
+    limit: int | None = None
+    url_prefix: str | None = None
+
+
+class SeedPage(NamedTuple):
+    seed: str
+    webpage: Webpage
 
 
 class Crawler:
@@ -20,22 +79,118 @@ class Crawler:
         limit: int = 100,
         content_detector: ContentDetector | None = None,
         visitor: Visitor | None = None,  # if provided, will use this visitor instead of the default one
+        max_queue_size: int | None = None,  # URLs discovered beyond this many queued ones are dropped
+        politeness: HostScheduler | None = None,  # per-host concurrency caps, rate limits and backoff
+        state_store: StateStore | None = None,  # if provided, crawl state is saved to it and resumed from it
+        response_cache: ResponseCache | None = None,  # if provided, unchanged pages are served from it
+        max_links_per_page: int | None = None,  # stop scanning a page for links after this many
+        offload: str | None = None,  # "process", "thread" or "auto": extract links and hash pages in a worker pool
+        offload_workers: int | None = None,  # defaults to the number of CPUs
+        include: List[str] | None = None,  # glob patterns, only URLs whose path matches one are crawled
+        exclude: List[str] | None = None,  # glob patterns, URLs whose path matches one are not crawled
+        max_path_depth: int | None = None,  # URLs with more path segments are not crawled
+        url_store: Callable[[], UrlSet] = set,  # makes the visited and seen URL sets, e.g. FingerprintSet to save memory
+        keep_pages: bool = False,  # keep the (url, content size) of every page in `stats.pages`
+        stats_callback: Callable[[dict], None] | None = None,  # called with `stats.snapshot()` while crawling
+        stats_interval: float = 10.0,  # seconds between `stats_callback` calls
+        hooks: CrawlHooks | None = None,  # instrumentation callbacks, e.g. a TraceRecorder to profile a crawl
+        scorer: Scorer | None = None,  # if provided, the best scored URLs are crawled first instead of breadth first
+        sitemaps: SitemapSeeder | None = None,  # if provided, seed from sitemaps and obey robots.txt
+        tiered: bool = False,  # without a visitor: fetch over plain HTTP, use a browser only for pages that need it
+        drop_html: bool = False,  # yield pages with `html=None`, links are extracted from it first
+        incremental: IncrementalCrawl | None = None,  # if provided, diff pages against a previous crawl's manifest
+        coordinator: CoordinationBackend | None = None,  # if provided, share the frontier and dedup with other workers
+        shard: int = 0,  # the shard of `coordinator` this worker crawls, one of `coordinator.shards`
+        content_gate: ContentGate | None = None,  # if provided, skip non-HTML and oversized pages by their headers
+        canonicalizer: UrlCanonicalizer | None = None,  # canonical URLs for dedup, learns query params that don't matter
+        trap_detector: TrapDetector | None = None,  # drops links into crawler traps, defaults to TrapDetector()
+        retries: RetryQueue | None = None,  # if provided, failed fetches are retried later with backoff
+        circuit_breaker: CircuitBreaker | None = None,  # if provided, hosts that keep failing are left alone a while
+        deadline: float | None = None,  # seconds a run may take, fetches still in flight then are cancelled
+        max_fetches: int | None = None,  # visitor fetches per run, failed, duplicate and retried ones included
+        max_download_bytes: int | None = None,  # html bytes to download per run, pages already downloaded still yielded
     ):
         self.depth = depth
         self.concurrency = concurrency
         self.timeout = timeout
         self.url_prefix = url_prefix
         self.filter_regex = re.compile(filter_regex) if filter_regex else None
+        self.url_filter = UrlFilter(self.filter_regex, include=include, exclude=exclude, max_path_depth=max_path_depth)
         self.limit = limit
+        self.max_queue_size = max_queue_size
+        self.politeness = politeness
+        self.state_store = state_store
+        self.max_links_per_page = max_links_per_page
+        self.offload = offload
+        self.offload_workers = offload_workers
+        if visitor is None and tiered:
+            visitor = TieredVisitor(concurrency=concurrency, timeout=timeout)
         self.visitor = visitor or SmartVisitor(concurrency=concurrency, timeout=timeout)
-        self.visited_urls: Set[str] = set()
-        self.visited_url_variations: Set[str] = set()  # Store normalized URLs
-        self.content_detector = content_detector or HashBasedDetector()
+        # pages served per fetch tier, when fetching through a TieredVisitor
+        self.tiered_visitor = visitor if isinstance(visitor, TieredVisitor) else None
+        if response_cache is not None:
+            self.visitor = CachingVisitor(self.visitor, response_cache, timeout=timeout)
+        self.url_store = url_store
+        self.visited_urls: UrlSet = url_store()
+        self.visited_url_variations: UrlSet = url_store()  # Store normalized URLs
+        self.canonicalizer = canonicalizer or UrlCanonicalizer()
+        self.trap_detector = trap_detector or TrapDetector()
+        self.content_detector = content_detector or FastHashDetector()
+        self.keep_pages = keep_pages
+        self.stats_callback = stats_callback
+        self.stats_interval = stats_interval
+        self.stats = CrawlStats(keep_pages=keep_pages)  # live statistics of the current or last run
+        self.hooks = hooks
+        self.scorer = scorer
+        self.sitemaps = sitemaps
+        self.drop_html = drop_html
+        self.incremental = incremental
+        self.coordinator = coordinator
+        self.shard = shard
+        self.content_gate = content_gate
+        self.retries = retries
+        self.circuit_breaker = circuit_breaker
+        self._held = DelayQueue()  # URLs waiting for the circuit of their host to reopen
+        self._released: Set[asyncio.Task] = set()  # fetch tasks that gave their host slot back
+        self._yielded_url: str | None = None  # the requested URL of the page `run` last yielded
+        self._frontier: Frontier | None = None  # of the current or last run, for `memory_usage`
+        self.deadline = deadline
+        self.max_fetches = max_fetches
+        self.max_download_bytes = max_download_bytes
+        self.seed_stats: Dict[str, CrawlStats] = {}  # statistics per seed of the last `run_many`
+        # set on the per-seed crawlers of `run_many`, shared between them
+        self._fetch_slots: asyncio.Semaphore | None = None
+        self._shared_offload: Tuple[Executor, asyncio.Semaphore] | None = None
 
         logger.info(
             f"Initialized crawler with depth={depth}, concurrency={concurrency}, url_prefix={url_prefix}, filter_regex={filter_regex}, limit={limit}"
         )
 
+    def memory_usage(self) -> dict:
+        """Approximate bytes held by the visited URL sets and the seen URL keys of the current or last run's frontier."""
+        return {
+            "visited_urls": memory_bytes(self.visited_urls),
+            "visited_url_variations": memory_bytes(self.visited_url_variations),
+            "frontier_seen": self._frontier.memory_bytes() if self._frontier is not None else 0,
+        }
+
+    # content detectors only need `is_duplicate` and `add_content`, the fingerprint methods are optional
+    def _fingerprint(self, content: str) -> str | None:
+        fingerprint = getattr(self.content_detector, "fingerprint", None)
+        return fingerprint(content) if fingerprint is not None else None
+
+    def _fingerprinter(self) -> Callable[[str], str] | None:
+        fingerprinter = getattr(self.content_detector, "fingerprinter", None)
+        return fingerprinter() if fingerprinter is not None else None
+
+    def _is_duplicate_fingerprint(self, fingerprint: str | None) -> bool | None:
+        """Whether the content with `fingerprint` is a duplicate, None if the detector cannot tell by fingerprint."""
+        is_duplicate = getattr(self.content_detector, "is_duplicate_fingerprint", None)
+        if fingerprint is None or is_duplicate is None or not hasattr(self.content_detector, "add_fingerprint"):
+            return None
+        # None from the Protocol's default body
+        return is_duplicate(fingerprint)
+
     def _should_skip_url(self, url: str, depth: int) -> bool:
         # Check if we've visited this exact URL
         if url in self.visited_urls:
@@ -43,117 +198,723 @@ class Crawler:
             return True
 
         # Check if we've visited a similar URL (normalized)
-        normalized_url = normalize_url(url)
+        normalized_url = self.canonicalizer.canonicalize(url)
         if normalized_url in self.visited_url_variations:
-            logger.debug(f"Skipping similar URL: {url} (normalized: {normalized_url})")
+            logger.debug("Skipping similar URL: {} (normalized: {})", url, normalized_url)
             return True
 
         if depth > self.depth:
-            logger.debug(f"Skipping URL at depth {depth} > {self.depth}: {url}")
+            logger.debug("Skipping URL at depth {} > {}: {}", depth, self.depth, url)
             return True
 
         return False
 
-    async def _crawl_page(self, url: str) -> Webpage | None:
+    async def _crawl_page(self, url: str) -> Webpage | SkippedPage | None:
         try:
+            if self.content_gate is not None:
+                skipped = await self.content_gate.check(url)
+                if skipped is not None:
+                    return skipped
             webpages = await self.visitor.visit_many([url])
             return webpages[0] if webpages else None
         except Exception as e:
             logger.error(f"Error crawling {url}: {e}")
             return None
 
+    async def _visit(self, url: str) -> Webpage | SkippedPage | None:
+        if self.politeness is None and self.circuit_breaker is None:
+            return await self._crawl_page(url)
+
+        start = time.monotonic()
+        webpage = await self._crawl_page(url)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(url, ok=webpage is not None and not failed_status(webpage))
+        if self.politeness is None:
+            return webpage
+        status_code = getattr(webpage, "status_code", None)
+        self.politeness.release(
+            url,
+            time.monotonic() - start,
+            ok=webpage is not None,
+            status_code=status_code if isinstance(status_code, int) else None,
+        )
+        # the task may still be cancelled while its page is processed, the slot is given back already
+        self._released.add(asyncio.current_task())
+        return webpage
+
+    async def _timed_visit(self, url: str, depth: int, queued: float) -> Webpage | SkippedPage | None:
+        start = time.monotonic()
+        if self.hooks is not None:
+            self.hooks.on_fetch_start(url, depth, queued, start)
+        webpage = await self._visit(url)
+        end = time.monotonic()
+        self.stats.observe("fetch", end - start)
+        if self.hooks is not None:
+            self.hooks.on_fetch_end(url, depth, start, end, webpage is not None)
+        return webpage
+
+    async def _fetch(
+        self, url: str, depth: int, offload: _Offload | None, queued: float
+    ) -> Tuple[Webpage | SkippedPage | None, ProcessedPage | None]:
+        if self._fetch_slots is None:
+            webpage = await self._timed_visit(url, depth, queued)
+        else:
+            # the concurrency budget shared by the seeds of `run_many`
+            async with self._fetch_slots:
+                webpage = await self._timed_visit(url, depth, queued)
+        if webpage is not None and not isinstance(webpage, SkippedPage) and webpage.html:
+            # counted as soon as the fetch completes, whatever happens to the page next
+            self.stats.downloaded_bytes += len(webpage.html.encode("utf-8", "surrogatepass"))
+        if offload is None or webpage is None or isinstance(webpage, SkippedPage) or not webpage.content:
+            return webpage, None
+
+        job = partial(
+            process_page,
+            webpage.html,
+            webpage.content,
+            url,
+            offload.prefix,
+            self.url_filter,
+            self.max_links_per_page,
+            self._fingerprinter(),
+            depth < self.depth,
+            self.scorer is not None,
+        )
+        async with offload.slots:
+            start = time.monotonic()
+            try:
+                processed = await asyncio.get_running_loop().run_in_executor(offload.executor, job)
+            except Exception as e:
+                # e.g. a broken worker pool, the page is processed inline instead
+                logger.error(f"Processing {url} in the worker pool failed: {e}")
+                return webpage, None
+            end = time.monotonic()
+            self.stats.observe("extract", end - start)
+            if self.hooks is not None:
+                self.hooks.on_extract(url, start, end, len(processed.links))
+        return webpage, processed
+
+    def _create_offload(self) -> Tuple[Executor, asyncio.Semaphore]:
+        workers = self.offload_workers or os.cpu_count() or 1
+        return create_executor(self.offload, workers), asyncio.Semaphore(2 * workers)
+
+    def _release_cancelled(self, url: str):
+        def callback(task: asyncio.Task) -> None:
+            if task in self._released:
+                self._released.discard(task)
+            elif task.cancelled():
+                self.politeness.cancel(url)
+
+        return callback
+
+    def _next_url(self, frontier: Frontier) -> Tuple[str, int] | None:
+        # due retries go first, they were dispatched before anything in the frontier
+        retry = self._held.pop_ready() if self._held else None
+        if retry is None and self.retries:
+            retry = self.retries.pop_ready()
+        if self.politeness is None:
+            if retry is not None:
+                return retry
+            return frontier.pop() if frontier else None
+
+        item = self.politeness.pop_ready()
+        if item is not None:
+            if retry is not None:
+                self.politeness.park(*retry)
+            return item
+        if retry is not None:
+            if self.politeness.is_ready(retry[0]):
+                return retry
+            self.politeness.park(*retry)
+        # look past URLs of busy hosts, without draining the whole frontier into the parking lot
+        while frontier and self.politeness.parked < self.concurrency * _PARKED_WINDOW:
+            url, depth = frontier.pop()
+            if self.politeness.is_ready(url):
+                return url, depth
+            self.politeness.park(url, depth)
+        return None
+
+    def _resume(self, frontier: Frontier) -> None:
+        state = self.state_store.load()
+        for url, normalized_url in state.visited:
+            self.visited_urls.add(url)
+            self.visited_url_variations.add(normalized_url)
+        add_fingerprint = getattr(self.content_detector, "add_fingerprint", None)
+        if add_fingerprint is not None:
+            for fingerprint in state.fingerprints:
+                add_fingerprint(fingerprint)
+        for url in state.done:
+            frontier.mark_seen(url)
+        for url, depth in state.frontier:
+            frontier.push(url, depth)
+        if state.frontier:
+            logger.info(f"Resuming crawl with {len(state.frontier)} queued URLs")
+
+    async def _seed_from_sitemaps(self, frontier: Frontier, url: str, prefix: str) -> None:
+        # robots.txt of `url` was loaded by `run` before pushing it
+        delay = self.sitemaps.crawl_delay(url)
+        if delay:
+            if self.politeness is None:
+                # keep the overall concurrency, only spread the requests out; `run` drops it when done
+                self.politeness = HostScheduler(max_per_host=self.concurrency)
+            self.politeness.set_crawl_delay(HostScheduler.host_of(url), delay)
+            logger.info(f"Obeying robots.txt Crawl-delay of {delay}s for {HostScheduler.host_of(url)}")
+        if not self.sitemaps.seed_sitemaps:
+            return
+
+        seeded = 0
+        # unchanged URLs are not crawled through links of other pages either
+        async for entry in self.sitemaps.entries(url, on_unchanged=frontier.mark_seen):
+            # sitemap URLs are seeds, their links are followed `depth` levels like the start URL's
+            if self.url_filter.accepts(entry.url, prefix) and not self._should_skip_url(entry.url, 0):
+                seeded += self._push(frontier, entry.url, 0)
+        logger.info(
+            f"Seeded {seeded} URLs from sitemaps, skipped {self.sitemaps.skipped_unchanged} unchanged since lastmod"
+        )
+
+    def _push(self, frontier: Frontier, url: str, depth: int, anchor_text: str = "") -> bool:
+        if self.sitemaps is not None and not self.sitemaps.allowed(url):
+            logger.debug("Skipping URL disallowed by robots.txt: {}", url)
+            return False
+        if not frontier.push(url, depth, anchor_text):
+            return False
+        if self.state_store is not None:
+            self.state_store.add_queued(url, depth)
+        return True
+
+    def _fetch_failed(
+        self, frontier: Frontier, url: str, depth: int, retry: bool = True, status_code: int | None = None
+    ) -> None:
+        """Queue a retry of `url`, or count it as failed when none is left."""
+        if retry and self.retries is not None:
+            not_before = self.circuit_breaker.reopens_at(url) if self.circuit_breaker is not None else 0.0
+            if self.retries.schedule(url, depth, not_before):
+                logger.info(f"Retrying {url} later (failed {self.retries.failures[url]} times)")
+                self.stats.retried += 1
+                return
+        self.stats.failed += 1
+        if self.incremental is not None:
+            self.incremental.failed(url, status_code)
+        self._done(frontier, url)
+
+    def _done(self, frontier: Frontier, url: str, content: str | None = None, fingerprint: str | None = None) -> None:
+        frontier.done(url)
+        if self.state_store is None:
+            return
+        if content is None:
+            self.state_store.add_done(url)
+        else:
+            if fingerprint is None:
+                fingerprint = self._fingerprint(content)
+            self.state_store.add_done(url, self.canonicalizer.canonicalize(url), fingerprint)
+
     def _get_next_urls(
         self, webpage: Webpage, prefix: str, current_url: str, current_depth: int
-    ) -> List[Tuple[str, int]]:
-        new_urls = extract_urls(webpage.html, current_url)
-        valid_urls = {url for url in new_urls if is_valid_url(url, prefix, self.filter_regex)}
+    ) -> List[Tuple[str, int, str]]:
+        start = time.monotonic()
+        anchor_texts = {} if self.scorer is not None else None
+        new_urls = extract_urls(webpage.html, current_url, self.max_links_per_page, anchor_texts)
+        valid_urls = {url for url in new_urls if self.url_filter.accepts(url, prefix)}
+        end = time.monotonic()
+        self.stats.observe("extract", end - start)
+        if self.hooks is not None:
+            self.hooks.on_extract(current_url, start, end, len(valid_urls))
         logger.debug(
-            f"[Depth={current_depth}] Found {len(valid_urls)}/{len(new_urls)} valid URLs to crawl from {current_url}"
+            "[Depth={}] Found {}/{} valid URLs to crawl from {}", current_depth, len(valid_urls), len(new_urls), current_url
         )
-        return [(url, current_depth + 1) for url in valid_urls]
+        return [(url, current_depth + 1, anchor_texts.get(url, "") if anchor_texts else "") for url in valid_urls]
 
-    async def run(self, url: str) -> AsyncGenerator[Webpage, None]:
-        prefix = self.url_prefix or get_default_url_prefix(url)
-        logger.info(f"Run crawler prefix={prefix} url={url}")
+    def _page_links(
+        self, webpage: Webpage, processed: ProcessedPage | None, prefix: str, current_url: str, current_depth: int
+    ) -> List[Tuple[str, int, str]]:
+        # Only add next URLs if we haven't reached max depth
+        if current_depth >= self.depth:
+            next_urls = []
+        elif processed is not None:
+            anchor_texts = processed.anchor_texts or {}
+            next_urls = [(next_url, current_depth + 1, anchor_texts.get(next_url, "")) for next_url in processed.links]
+        else:
+            try:
+                next_urls = self._get_next_urls(webpage, prefix, current_url, current_depth)
+            except Exception as e:
+                # a page that breaks link extraction must not end the crawl
+                logger.error(f"Extracting links from {current_url} failed: {e}")
+                next_urls = []
+        if self.incremental is not None:
+            self.incremental.set_links(current_url, [next_url for next_url, _, _ in next_urls])
+        return next_urls
 
-        queue = [(url, 0)]
-        queue_urls_seen = set()
-        total_pages = 0
-        skipped_pages = 0
-        fetched_urls = []
-        fetched_pages_info = []  # Store tuples of (url, content_size)
-
-        while queue and (self.limit == -1 or total_pages - skipped_pages < self.limit):
-            # Process URLs in batches up to concurrency limit
-            batch_size = min(self.concurrency, len(queue))
-            current_batch = [queue.pop(0) for _ in range(batch_size)]
-
-            # Filter out URLs that should be skipped
-            urls_to_crawl = []
-            for current_url, current_depth in current_batch:
-                if current_url in queue_urls_seen:
+    def _dispatch(
+        self,
+        pending: Deque[_PendingPage],
+        frontier: Frontier,
+        offload: _Offload | None,
+    ) -> None:
+        """Start fetches from the frontier until every concurrency slot is busy."""
+        active = sum(1 for p in pending if not p.task.done())
+        while active < self.concurrency and len(pending) < self.concurrency * _REORDER_WINDOW:
+            # never have more pages in flight than the remaining limit can absorb
+            if self.limit != -1 and self.stats.fetched + len(pending) >= self.limit:
+                break
+            if self.max_fetches is not None and self.stats.queued >= self.max_fetches:
+                break
+            item = self._next_url(frontier)
+            if item is None:
+                break
+            current_url, current_depth = item
+            if self.circuit_breaker is not None and not self.circuit_breaker.allow(current_url):
+                if self.circuit_breaker.is_down(current_url):
+                    logger.debug("Not fetching {}, its host is down", current_url)
+                    self._fetch_failed(frontier, current_url, current_depth, retry=False)
                     continue
-                if not self._should_skip_url(current_url, current_depth):
-                    queue_urls_seen.add(current_url)
-                    urls_to_crawl.append((current_url, current_depth))
-                    total_pages += 1
-                    logger.info(f"Queuing [{total_pages}] {current_url} (depth: {current_depth})")
+                # not a failure of the URL: it waits, without using up its retries
+                logger.debug("Holding {} until the circuit of its host reopens", current_url)
+                self.stats.short_circuited += 1
+                self._held.push(current_url, current_depth, self.circuit_breaker.reopens_at(current_url))
+                continue
+            self.stats.queued += 1
+            logger.info(f"Queuing [{self.stats.queued}] {current_url} (depth: {current_depth})")
+            if self.politeness is not None:
+                # take the host's slot right away, the next `_next_url` call must see it
+                self.politeness.acquire(current_url)
+            task = asyncio.create_task(self._fetch(current_url, current_depth, offload, time.monotonic()))
+            if self.politeness is not None:
+                task.add_done_callback(self._release_cancelled(current_url))
+            pending.append(_PendingPage(current_url, current_depth, task))
+            active += 1
+
+    def _deduped(self, url: str, start: float, duplicate: bool) -> None:
+        end = time.monotonic()
+        self.stats.observe("dedup", end - start)
+        if self.hooks is not None:
+            self.hooks.on_dedup(url, start, end, duplicate)
 
-            if not urls_to_crawl:
+    async def _share_fingerprints(self, pending: Deque[_PendingPage], frontier: ShardFrontier) -> None:
+        """Check the fingerprints of the fetched pages at the head of `pending` with the coordinator, in one call."""
+        pages = []
+        for p in pending:
+            if not p.task.done():
+                break
+            webpage, processed = p.task.result()
+            if frontier.is_shared(p.url) or webpage is None or isinstance(webpage, SkippedPage) or not webpage.content:
                 continue
+            if self.retries is not None and failed_status(webpage):
+                continue
+            fingerprint = processed.fingerprint if processed else None
+            if fingerprint is None:
+                fingerprint = self._fingerprint(webpage.content)
+            if fingerprint is not None:
+                pages.append((p.url, fingerprint))
+        await frontier.share_fingerprints(pages, lambda fingerprint: bool(self._is_duplicate_fingerprint(fingerprint)))
+
+    def _exhausted_budget(self, deadline_at: float | None) -> str | None:
+        """The budget that ends the crawl, cancelling the fetches in flight, if any."""
+        if deadline_at is not None and time.monotonic() >= deadline_at:
+            return "deadline"
+        if self.max_download_bytes is not None and self.stats.downloaded_bytes >= self.max_download_bytes:
+            return "bytes"
+        return None
 
-            # Create a mapping of URLs to their depths
-            url_depth_map = {url: depth for url, depth in urls_to_crawl}
-            webpages: List[Webpage] = await self.visitor.visit_many([url for url, _ in urls_to_crawl])
+    def _rekey(self, frontier: Frontier) -> None:
+        """Canonical URLs seen so far may keep a parameter the canonicalizer just learned to drop."""
+        frontier.rekey()
+        if isinstance(self.visited_url_variations, set):
+            canonicalize = self.canonicalizer.canonicalize
+            self.visited_url_variations.update({canonicalize(key) for key in self.visited_url_variations})
+
+    def _report(self, frontier: Frontier) -> None:
+        self.stats.queue_size = len(frontier)
+        self.stats_callback(self.stats.snapshot())
+
+    async def run(self, url: str) -> AsyncGenerator[Webpage, None]:
+        prefix = self.url_prefix or get_default_url_prefix(url)
+        logger.info(f"Run crawler prefix={prefix} url={url}")
+        if self.coordinator is not None and (self.scorer or self.state_store or self.incremental):
+            raise ValueError("a sharded crawl keeps its frontier in the coordinator: no scorer, state_store or incremental")
+        self.stats = stats = CrawlStats(keep_pages=self.keep_pages)
+        if self.incremental is not None:
+            self.incremental.start()
+        if self.retries is not None:
+            self.retries.start()
+        self.canonicalizer.start()
+        self.trap_detector.start()
+        self._held = DelayQueue()
+        self._released = set()
+        next_report = time.monotonic() + self.stats_interval
+        deadline_at = stats.started + self.deadline if self.deadline is not None else None
 
-            for webpage in webpages:
-                assert webpage is not None, "Received None webpage"
-                fetched_urls.append(webpage.url)
+        if self.coordinator is not None:
+            frontier = ShardFrontier(
+                self.coordinator, self.shard, key=self.canonicalizer.canonicalize, seen=self.url_store()
+            )
+            await frontier.join()
+        elif self.scorer is None:
+            frontier = Frontier(max_size=self.max_queue_size, key=self.canonicalizer.canonicalize, seen=self.url_store())
+        else:
+            self.scorer.start(url, prefix)
+            frontier = PriorityFrontier(
+                self.scorer, max_size=self.max_queue_size, key=self.canonicalizer.canonicalize, seen=self.url_store()
+            )
+        self._frontier = frontier
+        if self.state_store is not None:
+            self._resume(frontier)
+        # a scheduler created for a Crawl-delay only lasts for this run
+        politeness = self.politeness
+        if self.sitemaps is not None:
+            await self.sitemaps.load_robots(url)
+        if not self._should_skip_url(url, 0):
+            self._push(frontier, url, 0)
+        if self.sitemaps is not None:
+            await self._seed_from_sitemaps(frontier, url, prefix)
+        # pages are fetched by up to `concurrency` tasks at once, but handled and
+        # yielded in dispatch order so that output matches a plain BFS crawl
+        pending: Deque[_PendingPage] = deque()
+        draining = False  # the byte budget is used up, only the pages already downloaded are left
+        offload = None
+        if self._shared_offload is not None:
+            offload = _Offload(*self._shared_offload, prefix)
+        elif self.offload:
+            offload = _Offload(*self._create_offload(), prefix)
 
-                current_url = webpage.url
-                if current_url not in url_depth_map:
-                    logger.warning(f"Received webpage for unexpected URL: {current_url}")
+        try:
+            while True:
+                if draining:
+                    if not pending:
+                        break
+                else:
+                    exhausted = self._exhausted_budget(deadline_at)
+                    if exhausted is not None:
+                        logger.info(f"Stopping the crawl, its {exhausted} budget is used up")
+                        stats.stopped_by = exhausted
+                        if exhausted == "deadline":
+                            break
+                        # the pages already downloaded are still handled and yielded, nothing more is fetched
+                        draining = True
+                        in_flight = [p.task for p in pending if not p.task.done()]
+                        for task in in_flight:
+                            task.cancel()
+                        await asyncio.gather(*in_flight, return_exceptions=True)
+                        pending = deque(p for p in pending if not p.task.cancelled())
+                        continue
+                    if self.stats_callback is not None and time.monotonic() >= next_report:
+                        self._report(frontier)
+                        next_report = time.monotonic() + self.stats_interval
+                    if self.coordinator is not None:
+                        await frontier.sync(self.concurrency)
+                    self._dispatch(pending, frontier, offload)
+                # URLs parked for a rate-limited host become ready by time alone
+                wakeup = self.politeness.next_wakeup() if self.politeness and self.politeness.parked else None
+                for delayed in (self.retries, self._held):
+                    if delayed:
+                        retry_wakeup = delayed.next_wakeup()
+                        wakeup = retry_wakeup if wakeup is None else min(wakeup, retry_wakeup)
+                if not pending:
+                    if self.limit != -1 and stats.fetched >= self.limit:
+                        stats.stopped_by = "limit"
+                        break
+                    if self.max_fetches is not None and stats.queued >= self.max_fetches:
+                        stats.stopped_by = "fetches"
+                        break
+                    if wakeup is None and self.politeness is not None and self.politeness.parked:
+                        # the hosts are busy with requests of other seeds of `run_many`
+                        await self.politeness.wait_for_release(
+                            max(0.0, deadline_at - time.monotonic()) if deadline_at is not None else None
+                        )
+                        continue
+                    if wakeup is None:
+                        # other workers may still queue URLs for this shard
+                        if self.coordinator is not None and await frontier.wait_for_work(self.concurrency):
+                            continue
+                        break
+                    if deadline_at is not None:
+                        wakeup = min(wakeup, max(0.0, deadline_at - time.monotonic()))
+                    await asyncio.sleep(wakeup)
+                    continue
+                if self.stats_callback is not None:
+                    until_report = max(0.0, next_report - time.monotonic())
+                    wakeup = until_report if wakeup is None else min(wakeup, until_report)
+                if deadline_at is not None:
+                    until_deadline = max(0.0, deadline_at - time.monotonic())
+                    wakeup = until_deadline if wakeup is None else min(wakeup, until_deadline)
+
+                head = pending[0]
+                if not head.task.done():
+                    # wake up as soon as any slot frees, so it can be refilled right away
+                    running = {p.task for p in pending if not p.task.done()}
+                    await asyncio.wait(running, timeout=wakeup, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                if self.coordinator is not None and not frontier.is_shared(head.url):
+                    await self._share_fingerprints(pending, frontier)
+                pending.popleft()
+                current_url, current_depth = head.url, head.depth
+                webpage, processed = head.task.result()
+                status_code = getattr(webpage, "status_code", None)
+                if webpage is None or (self.retries is not None and failed_status(webpage)):
+                    self._fetch_failed(frontier, current_url, current_depth, status_code=status_code)
+                    continue
+                if self.incremental is not None and status_code in GONE_STATUS_CODES:
+                    # removed since the previous crawl, reported in `incremental.deleted` rather than as changed
+                    self._fetch_failed(frontier, current_url, current_depth, retry=False, status_code=status_code)
+                    continue
+                if self.retries is not None:
+                    self.retries.succeeded(current_url)
+                if isinstance(webpage, SkippedPage):
+                    logger.info(f"Skipping {current_url} by its headers ({webpage.reason})")
+                    stats.gated += 1
+                    stats.gated_bytes += webpage.size or 0
+                    self._done(frontier, current_url)
                     continue
 
-                current_depth = url_depth_map[current_url]
                 content = webpage.content
                 if not content:
                     logger.warning(f"No content found for {current_url}")
-                    skipped_pages += 1
+                    stats.empty += 1
+                    if self.incremental is not None:
+                        self.incremental.failed(current_url)
+                    self._done(frontier, current_url)
                     continue
-                if self.content_detector.is_duplicate(content):
+                fingerprint = processed.fingerprint if processed else None
+                shared = frontier.fingerprint(current_url) if self.coordinator is not None else None
+                start = time.monotonic()
+                if fingerprint is None:
+                    # hashed once, for the dedup check, the detector, the saved state and the diff
+                    fingerprint = shared[0] if shared is not None else self._fingerprint(content)
+                duplicate = self._is_duplicate_fingerprint(fingerprint)
+                by_fingerprint = duplicate is not None
+                if not by_fingerprint:
+                    duplicate = self.content_detector.is_duplicate(content)
+                if fingerprint is not None:
+                    # duplicates are what tells a query parameter does not matter
+                    if self.canonicalizer.observe(current_url, fingerprint):
+                        self._rekey(frontier)
+                if not duplicate and shared is not None:
+                    # seen by another worker, e.g. a mirror on a host of another shard
+                    duplicate = shared[1]
+                if duplicate:
+                    self._deduped(current_url, start, True)
                     logger.info(f"Skipping duplicate content for {current_url}")
-                    skipped_pages += 1
+                    stats.duplicates += 1
+                    if self.incremental is not None:
+                        # still there, only not yielded
+                        self.incremental.record(current_url, fingerprint or self.incremental.fingerprint(content))
+                    self._done(frontier, current_url)
                     continue
 
                 # Only mark URLs as visited after successful crawling
                 self.visited_urls.add(current_url)
-                self.visited_url_variations.add(normalize_url(current_url))
-                self.content_detector.add_content(content)
+                self.visited_url_variations.add(self.canonicalizer.canonicalize(current_url))
+                if by_fingerprint:
+                    self.content_detector.add_fingerprint(fingerprint)
+                else:
+                    self.content_detector.add_content(content)
+                self._deduped(current_url, start, False)
 
-                # Track content size
-                content_size = len(content) if content else 0
-                fetched_pages_info.append((current_url, content_size))
+                stats.add_page(current_url, current_depth, webpage.html, content)
+                next_urls = None
+                if self.incremental is not None:
+                    status = self.incremental.record(current_url, fingerprint or self.incremental.fingerprint(content))
+                    # seeds are always expanded, otherwise an unchanged home page would end the crawl
+                    if status == UNCHANGED and self.incremental.prune_unchanged and current_depth > 0:
+                        self.incremental.carry_over(current_url)
+                        next_urls = []
+                if self.drop_html:
+                    # extract the links first, nothing needs the html afterwards
+                    if next_urls is None:
+                        next_urls = self._page_links(webpage, processed, prefix, current_url, current_depth)
+                    webpage.html = None
+                # `webpage.url` may differ, after a redirect
+                self._yielded_url = current_url
+                if self.hooks is None:
+                    yield webpage
+                else:
+                    start = time.monotonic()
+                    yield webpage
+                    self.hooks.on_yield(current_url, current_depth, start, time.monotonic())
 
-                yield webpage
+                if next_urls is None:
+                    next_urls = self._page_links(webpage, processed, prefix, current_url, current_depth)
+                # drop already queued or visited URLs now, instead of when they are dequeued
+                stats.links_found += len(next_urls)
+                for next_url, next_depth, anchor_text in next_urls:
+                    try:
+                        if frontier.seen(next_url) or self._should_skip_url(next_url, next_depth):
+                            continue
+                        if not self.trap_detector.admit(next_url):
+                            logger.debug("Skipping URL looking like a crawler trap: {}", next_url)
+                            stats.trapped += 1
+                            if self.incremental is not None:
+                                self.incremental.skipped(next_url)
+                            continue
+                        stats.links_queued += self._push(frontier, next_url, next_depth, anchor_text)
+                    except ValueError as e:
+                        # one malformed link must not end the crawl
+                        logger.warning(f"Skipping malformed link {next_url}: {e}")
+                # recorded only now, so that a resumed crawl still has the links of this page
+                self._done(frontier, current_url, content, fingerprint)
+        except (GeneratorExit, asyncio.CancelledError):
+            # the consumer stopped iterating early
+            stats.stopped_by = stats.stopped_by or "closed"
+            raise
+        finally:
+            # don't leave fetches running, and let them unwind before returning
+            for p in pending:
+                p.task.cancel()
+            if pending:
+                await asyncio.gather(*(p.task for p in pending), return_exceptions=True)
+            if offload is not None and self._shared_offload is None:
+                offload.executor.shutdown(wait=False, cancel_futures=True)
+            if self.coordinator is not None:
+                # blocking calls to the backend, an HTTP round trip with `HttpBackend`
+                await asyncio.to_thread(frontier.close)
+            if self.state_store is not None:
+                self.state_store.flush()
+            self.politeness = politeness
 
-                # Only add next URLs if we haven't reached max depth
-                if current_depth < self.depth:
-                    next_urls = self._get_next_urls(
-                        webpage, prefix=prefix, current_url=current_url, current_depth=current_depth
-                    )
-                    # Filter out URLs that would exceed depth limit
-                    next_urls = [(url, depth) for url, depth in next_urls if depth <= self.depth]
-                    queue.extend(next_urls)
-        # Calculate total content size
-        total_content_size = sum(size for _, size in fetched_pages_info)
+        if self.stats_callback is not None:
+            self._report(frontier)
+        logger.info(f"Crawling completed. {stats.summary()}")
+        if self.incremental is not None:
+            self.incremental.finish(complete=stats.stopped_by is None and not frontier.dropped)
+        if self.tiered_visitor is not None:
+            logger.info(f"Pages per fetch tier: {self.tiered_visitor.stats()}")
+        if self.content_gate is not None:
+            logger.info(f"Content gate: {self.content_gate.stats()}")
+        if self.circuit_breaker is not None and self.circuit_breaker.open_hosts():
+            logger.warning(f"Hosts with an open circuit: {', '.join(self.circuit_breaker.open_hosts())}")
 
-        # Format fetched pages with size info
-        fetched_pages_str = "\n".join([f"- {url} ({size:,} bytes)" for url, size in fetched_pages_info])
+    async def run_incremental(self, url: str) -> AsyncGenerator[ChangedPage, None]:
+        """Like `run`, with each page tagged new, changed or unchanged against `incremental.previous`.
 
-        logger.info(
-            f"Crawling completed. Total pages: {total_pages}, "
-            f"Skipped: {skipped_pages}, "
-            f"Total content size: {total_content_size:,} bytes\n"
-            f"{fetched_pages_str}"
-        )
+        Unchanged pages are left out with `incremental.only_changed`. Once the
+        crawl is done, `incremental.manifest` is the manifest for the next run
+        and `incremental.deleted` lists the pages gone since the previous one.
+        """
+        if self.incremental is None:
+            raise ValueError("run_incremental needs Crawler(incremental=IncrementalCrawl(previous_manifest))")
+        async for webpage in self.run(url):
+            # recorded under the URL the crawl requested
+            status = self.incremental.status(self._yielded_url)
+            if status == UNCHANGED and self.incremental.only_changed:
+                continue
+            yield ChangedPage(status, webpage)
+
+    async def run_to(self, url: str, sink: Sink) -> CrawlStats:
+        """Crawl `url` into `sink` (see `smolcrawler.sinks`), closing it at the end, and return the statistics."""
+        try:
+            async for webpage in self.run(url):
+                await sink.write(webpage)
+        finally:
+            await sink.close()
+        return self.stats
+
+    def _seed_crawler(self, seed: Seed) -> "Crawler":
+        """A crawler for one seed of `run_many`: own URL scope, dedup and stats, shared visitor."""
+        crawler = copy.copy(self)
+        crawler.depth = seed.depth if seed.depth is not None else self.depth
+        crawler.limit = seed.limit if seed.limit is not None else self.limit
+        crawler.url_prefix = seed.url_prefix or self.url_prefix
+        crawler.visited_urls = self.url_store()
+        crawler.visited_url_variations = self.url_store()
+        crawler.content_detector = copy.deepcopy(self.content_detector)
+        # the hosts' slots, rates and backoff are shared, parked URLs and scorer state are per crawl
+        crawler.politeness = self.politeness.shared() if self.politeness is not None else None
+        crawler.scorer = copy.deepcopy(self.scorer)
+        crawler.retries = copy.deepcopy(self.retries)
+        crawler.canonicalizer = copy.deepcopy(self.canonicalizer)
+        crawler.trap_detector = copy.deepcopy(self.trap_detector)
+        crawler.stats = CrawlStats(keep_pages=self.keep_pages)
+        # the per-seed snapshots would interleave, report through `seed_stats` instead
+        crawler.stats_callback = None
+        return crawler
+
+    async def run_many(
+        self,
+        seeds: Iterable[str | Seed],
+        max_concurrency: int | None = None,  # fetches in flight over all seeds, defaults to `concurrency`
+        max_active_seeds: int = 16,  # seeds crawled at the same time
+    ) -> AsyncGenerator[SeedPage, None]:
+        """Crawl several seeds at once, yielding `(seed, webpage)` as pages are ready.
+
+        Every seed keeps its own prefix, depth, limit, visited URLs and content
+        dedup, as if crawled by `run` alone, while the visitor (and its
+        connection pool or browser) and the concurrency budget are shared.
+        Pages of a seed come in its usual order, seeds interleave.
+        """
+        if self.state_store is not None:
+            raise ValueError("run_many does not support state_store, the state of a single crawl")
+        if self.incremental is not None:
+            raise ValueError("run_many does not support incremental, the manifest of a single crawl")
+        if self.coordinator is not None:
+            raise ValueError("run_many does not support coordinator, seeds are not sharded")
+        seeds = [seed if isinstance(seed, Seed) else Seed(seed) for seed in seeds]
+        fetch_slots = asyncio.Semaphore(max_concurrency or self.concurrency)
+        shared_offload = self._create_offload() if self.offload else None
+        active_seeds = asyncio.Semaphore(max_active_seeds)
+        # bounded, so that seeds stop fetching while the consumer is busy
+        results: asyncio.Queue[SeedPage | None] = asyncio.Queue(maxsize=2 * (max_concurrency or self.concurrency))
+        self.seed_stats = {}
+
+        async def crawl(seed: Seed) -> None:
+            try:
+                async with active_seeds:
+                    crawler = self._seed_crawler(seed)
+                    crawler._fetch_slots = fetch_slots
+                    crawler._shared_offload = shared_offload
+                    async for webpage in crawler.run(seed.url):
+                        # `run` starts a new CrawlStats, the live one is known once it started
+                        self.seed_stats[seed.url] = crawler.stats
+                        await results.put(SeedPage(seed.url, webpage))
+                    self.seed_stats[seed.url] = crawler.stats
+            except Exception as e:
+                logger.error(f"Crawling seed {seed.url} failed: {e}")
+            # not on cancellation: nobody is waiting for it then
+            await results.put(None)
+
+        tasks = [asyncio.create_task(crawl(seed)) for seed in seeds]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await results.get()
+                if item is None:
+                    remaining -= 1
+                    continue
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if shared_offload is not None:
+                shared_offload[0].shutdown(wait=False, cancel_futures=True)
+        logger.info(f"Crawled {len(seeds)} seeds, {sum(stats.fetched for stats in self.seed_stats.values())} pages")
+
+
+def crawl_shard(url: str, coordinator: CoordinationBackend, shard: int, output: str | None = None, **crawler_kwargs) -> dict:
+    """Run the worker of one shard until the whole crawl is done, in its own event loop.
+
+    The target of worker processes, on this host or others. Pages are written
+    to `output` (a path for `open_sink`, "{shard}" is replaced by the shard
+    number) or dropped. `limit` counts the pages of this worker only. Returns
+    the worker's `stats.snapshot()`.
+    """
+
+    async def crawl() -> dict:
+        crawler = Crawler(coordinator=coordinator, shard=shard, **crawler_kwargs)
+        if output:
+            await crawler.run_to(url, open_sink(output.format(shard=shard)))
+        else:
+            async for _ in crawler.run(url):
+                pass
+        return crawler.stats.snapshot()
+
+    return asyncio.run(crawl())
+
+
+def crawl_sharded(url: str, coordinator: CoordinationBackend, output: str | None = None, **crawler_kwargs) -> List[dict]:
+    """Crawl `url` with one worker process per shard of `coordinator`, returning the stats of every worker."""
+    with ProcessPoolExecutor(max_workers=coordinator.shards) as pool:
+        futures = [
+            pool.submit(crawl_shard, url, coordinator, shard, output, **crawler_kwargs)
+            for shard in range(coordinator.shards)
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,467 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Protocol, Set, Tuple, runtime_checkable
+from urllib.parse import urlparse
+
+import httpx
+from loguru import logger
+
+from .frontier import Frontier
+from .url_utils import normalize_url
+from .visited import UrlSet
+
+Link = Tuple[str, str, int]  # (normalized url, url, depth)
+
+
+@lru_cache(maxsize=1 << 16)
+def _host_shard(host: str, shards: int) -> int:
+    return max(range(shards), key=lambda shard: hashlib.blake2b(f"{shard}/{host}".encode(), digest_size=8).digest())
+
+
+def shard_of(url: str, shards: int) -> int:
+    """The shard crawling `url`, chosen by its host with rendezvous hashing.
+
+    Stable across processes and machines, and going from n to n + 1 shards
+    only moves the hosts taken over by the new shard.
+    """
+    return _host_shard(urlparse(url).netloc.lower(), shards)
+
+
+@runtime_checkable
+class CoordinationBackend(Protocol):
+    """The frontier, visited URLs and content fingerprints shared by the workers of a sharded crawl."""
+
+    shards: int  # number of workers, each crawling the hosts of one shard
+
+    def join(self, shard: int) -> None:
+        """A worker starts crawling `shard`."""
+        ...
+
+    def exchange(self, shard: int, done: List[str], links: List[Link], claim: int) -> List[Tuple[str, int]]:
+        """Mark the `done` URLs handled and queue the new `links`, then claim up to `claim` (url, depth) of `shard`."""
+        ...
+
+    def leave(self, shard: int, unhandled: List[str]) -> None:
+        """A worker stops: its `unhandled` claims are queued again, for whoever joins `shard` next."""
+        ...
+
+    def add_fingerprints(self, fingerprints: List[str]) -> List[bool]:
+        """Record the content fingerprints of pages, returns for each whether no worker saw it before."""
+        ...
+
+    def unfinished(self) -> int:
+        """URLs claimed by a worker, or queued for a shard whose worker did not leave; the crawl is over at 0."""
+        ...
+
+    def counts(self) -> Dict[str, int]:
+        """Queued, claimed and done URLs and the number of fingerprints, for progress reports."""
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class SQLiteBackend(CoordinationBackend):
+    """Coordination through a SQLite database in WAL mode, for worker processes on one host.
+
+    SQLite's file locks serialize the transactions of the workers. A pickled
+    backend reconnects to the same file, so it can be handed to worker
+    processes. Every call of a worker renews its lease; a worker not heard
+    from for `lease` seconds is taken for dead, e.g. killed without leaving,
+    and the next worker claiming URLs takes its shard over, its claims
+    included, until a worker joins that shard again.
+    """
+
+    def __init__(self, path: str, shards: int, lease: float = 300.0):
+        self.path = path
+        self.shards = shards
+        self.lease = lease
+        self._lock = threading.Lock()  # the connection is shared with `asyncio.to_thread` and server threads
+        # transactions are explicit, see `_transaction`
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS frontier (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                shard INTEGER NOT NULL,
+                state INTEGER NOT NULL DEFAULT 0,  -- 0 queued, 1 claimed, 2 done
+                claimed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS frontier_shard_state ON frontier (shard, state);
+            CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state);
+            CREATE TABLE IF NOT EXISTS fingerprints (fingerprint TEXT PRIMARY KEY) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS departed (shard INTEGER PRIMARY KEY);
+            -- the worker crawling each shard, its own or one taken over, and when it was last heard from
+            CREATE TABLE IF NOT EXISTS workers (shard INTEGER PRIMARY KEY, worker INTEGER NOT NULL, seen_at REAL);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+            """
+        )
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'shards'").fetchone()
+            if row is None:
+                conn.execute("INSERT INTO meta (key, value) VALUES ('shards', ?)", (shards,))
+            elif row[0] != shards:
+                raise ValueError(f"{path} coordinates {row[0]} shards, not {shards}")
+
+    def __reduce__(self):
+        return SQLiteBackend, (self.path, self.shards, self.lease)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def join(self, shard: int) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM departed WHERE shard = ?", (shard,))
+            self._renew(conn, shard, time.time())
+
+    @staticmethod
+    def _renew(conn: sqlite3.Connection, shard: int, now: float) -> None:
+        conn.execute(
+            "INSERT INTO workers (shard, worker, seen_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (shard) DO UPDATE SET worker = excluded.worker, seen_at = excluded.seen_at",
+            (shard, shard, now),
+        )
+        conn.execute("UPDATE workers SET seen_at = ? WHERE worker = ?", (now, shard))
+
+    def exchange(self, shard: int, done: List[str], links: List[Link], claim: int) -> List[Tuple[str, int]]:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany("UPDATE frontier SET state = 2 WHERE key = ?", ((key,) for key in done))
+            conn.executemany(
+                "INSERT OR IGNORE INTO frontier (key, url, depth, shard) VALUES (?, ?, ?, ?)",
+                ((key, url, depth, shard_of(url, self.shards)) for key, url, depth in links),
+            )
+            self._renew(conn, shard, now)
+            if claim <= 0:
+                return []
+            conn.execute(
+                "UPDATE frontier SET state = 0 WHERE shard = ? AND state = 1 AND claimed_at < ?",
+                (shard, now - self.lease),
+            )
+            dead = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT shard FROM workers WHERE seen_at < ? AND shard NOT IN (SELECT shard FROM departed)",
+                    (now - self.lease,),
+                )
+            ]
+            if dead:
+                logger.warning(f"Worker {shard} takes over shards {dead}, not heard from for {self.lease}s")
+                conn.executemany(
+                    "UPDATE workers SET worker = ?, seen_at = ? WHERE shard = ?", ((shard, now, d) for d in dead)
+                )
+                conn.executemany("UPDATE frontier SET state = 0 WHERE shard = ? AND state = 1", ((d,) for d in dead))
+            rows = conn.execute(
+                "SELECT key, url, depth FROM frontier "
+                "WHERE shard IN (SELECT shard FROM workers WHERE worker = ?) AND state = 0 ORDER BY rowid LIMIT ?",
+                (shard, claim),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE frontier SET state = 1, claimed_at = ? WHERE key = ?", ((now, key) for key, _, _ in rows)
+            )
+        return [(url, depth) for _, url, depth in rows]
+
+    def leave(self, shard: int, unhandled: List[str]) -> None:
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE frontier SET state = 0, claimed_at = NULL WHERE key = ? AND state = 1",
+                ((key,) for key in unhandled),
+            )
+            # with the shards it took over
+            conn.execute(
+                "INSERT OR IGNORE INTO departed (shard) SELECT shard FROM workers WHERE worker = ? UNION SELECT ?",
+                (shard, shard),
+            )
+            conn.execute("DELETE FROM workers WHERE worker = ?", (shard,))
+
+    def add_fingerprints(self, fingerprints: List[str]) -> List[bool]:
+        with self._transaction() as conn:
+            return [
+                conn.execute("INSERT OR IGNORE INTO fingerprints (fingerprint) VALUES (?)", (fingerprint,)).rowcount == 1
+                for fingerprint in fingerprints
+            ]
+
+    def unfinished(self) -> int:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM frontier "
+                "WHERE state = 1 OR (state = 0 AND shard NOT IN (SELECT shard FROM departed))"
+            ).fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            states = dict(self.conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall())
+            fingerprints = self.conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+        return {
+            "queued": states.get(0, 0),
+            "claimed": states.get(1, 0),
+            "done": states.get(2, 0),
+            "fingerprints": fingerprints,
+        }
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class HttpBackend(CoordinationBackend):
+    """Coordination through a `BackendServer`, for workers on several hosts.
+
+    Every call is one JSON request; workers batch their updates into
+    `exchange` calls and the fingerprints of the pages fetched meanwhile
+    into `add_fingerprints` calls, so there are a few round trips per batch
+    of pages.
+    """
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.client = httpx.Client(timeout=timeout)
+        self._shards: int | None = None
+
+    def __reduce__(self):
+        return HttpBackend, (self.url, self.timeout)
+
+    @property
+    def shards(self) -> int:
+        if self._shards is None:
+            self._shards = self._call("shards")
+        return self._shards
+
+    def _call(self, method: str, **kwargs):
+        response = self.client.post(f"{self.url}/{method}", json=kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def join(self, shard: int) -> None:
+        self._call("join", shard=shard)
+
+    def exchange(self, shard: int, done: List[str], links: List[Link], claim: int) -> List[Tuple[str, int]]:
+        claimed = self._call("exchange", shard=shard, done=done, links=links, claim=claim)
+        return [(url, depth) for url, depth in claimed]
+
+    def leave(self, shard: int, unhandled: List[str]) -> None:
+        self._call("leave", shard=shard, unhandled=unhandled)
+
+    def add_fingerprints(self, fingerprints: List[str]) -> List[bool]:
+        return self._call("add_fingerprints", fingerprints=fingerprints)
+
+    def unfinished(self) -> int:
+        return self._call("unfinished")
+
+    def counts(self) -> Dict[str, int]:
+        return self._call("counts")
+
+    def close(self) -> None:
+        self.client.close()
+
+
+_METHODS: Dict[str, Callable[[CoordinationBackend], Callable]] = {
+    "shards": lambda backend: lambda: backend.shards,
+    "join": lambda backend: backend.join,
+    "exchange": lambda backend: backend.exchange,
+    "leave": lambda backend: backend.leave,
+    "add_fingerprints": lambda backend: backend.add_fingerprints,
+    "unfinished": lambda backend: backend.unfinished,
+    "counts": lambda backend: backend.counts,
+}
+
+
+class _BackendRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep the connections of `HttpBackend` clients open
+    disable_nagle_algorithm = True  # headers and body are separate writes, don't wait for an ACK in between
+
+    def do_POST(self) -> None:
+        method = _METHODS.get(self.path.strip("/"))
+        if method is None:
+            self.send_error(404)
+            return
+        kwargs = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        try:
+            result = method(self.server.backend)(**kwargs)
+        except Exception as e:
+            logger.error(f"Coordination call {self.path} failed: {e}")
+            self.send_error(500, str(e))
+            return
+        body = json.dumps(result).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # one line per call would drown the crawl logs
+        pass
+
+
+class BackendServer:
+    """Serves a backend, usually a `SQLiteBackend`, to `HttpBackend` workers from a background thread.
+
+        with BackendServer(SQLiteBackend("crawl.db", shards=8), host="0.0.0.0", port=8765) as server:
+            ...  # workers on other hosts use HttpBackend(f"http://coordinator:8765")
+    """
+
+    def __init__(self, backend: CoordinationBackend, host: str = "127.0.0.1", port: int = 0):
+        self.backend = backend
+        self.server = ThreadingHTTPServer((host, port), _BackendRequestHandler)
+        self.server.backend = backend
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Serving crawl coordination for {self.backend.shards} shards at {self.url}")
+        return self.url
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "BackendServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class ShardFrontier(Frontier):
+    """Frontier of one worker of a sharded crawl, kept by a `CoordinationBackend`.
+
+    Pushed URLs go to the backend, which queues them for the shard of their
+    host; pops come from URLs claimed for this worker's shard, so every host
+    is crawled by a single worker, in order. Handled URLs and new links are
+    sent together with the next claim, once `batch_size` of them are pending
+    or `flush_interval` seconds passed. Content fingerprints are checked
+    against the other workers' for all fetched pages at once, see
+    `share_fingerprints`.
+    """
+
+    def __init__(
+        self,
+        backend: CoordinationBackend,
+        shard: int,
+        key: Callable[[str], str] = normalize_url,
+        seen: UrlSet | None = None,
+        batch_size: int = 64,
+        flush_interval: float = 0.1,  # also how often an idle worker asks for URLs
+    ):
+        if not 0 <= shard < backend.shards:
+            raise ValueError(f"shard must be in [0, {backend.shards}), got {shard}")
+        super().__init__(key=key, seen=seen)
+        self.backend = backend
+        self.shard = shard
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._outbox: List[Link] = []
+        self._handled: List[str] = []
+        self._claimed: Set[str] = set()  # claimed keys not handled yet
+        self._fingerprints: Dict[str, Tuple[str, bool]] = {}  # url -> (fingerprint, seen by another worker)
+        self._last_sync = time.monotonic()
+        self._next_claim = 0.0
+
+    def _append(self, url: str, depth: int, anchor_text: str) -> None:
+        self._outbox.append((self.key(url), url, depth))
+
+    def done(self, url: str) -> None:
+        key = self.key(url)
+        self._claimed.discard(key)
+        self._handled.append(key)
+
+    async def join(self) -> None:
+        await asyncio.to_thread(self.backend.join, self.shard)
+
+    async def sync(self, low: int, force: bool = False) -> int:
+        """Send the pending updates when due, claiming URLs once fewer than `low` are left; returns the claimed count."""
+        now = time.monotonic()
+        claim = 0
+        if len(self._queue) < low and (force or now >= self._next_claim):
+            claim = 2 * low - len(self._queue)
+        updates = len(self._outbox) + len(self._handled)
+        if not claim and updates < self.batch_size and not (updates and (force or now - self._last_sync >= self.flush_interval)):
+            return 0
+
+        handled, links = self._handled, self._outbox
+        self._handled, self._outbox = [], []
+        claimed = await asyncio.to_thread(self.backend.exchange, self.shard, handled, links, claim)
+        self._last_sync = time.monotonic()
+        for url, depth in claimed:
+            key = self.key(url)
+            self._seen.add(key)
+            self._claimed.add(key)
+            self._queue.append((url, depth))
+        if claim and not claimed:
+            # nothing queued for this shard, don't ask again for every page
+            self._next_claim = self._last_sync + self.flush_interval
+        return len(claimed)
+
+    async def share_fingerprints(self, pages: List[Tuple[str, str]], local: Callable[[str], bool]) -> None:
+        """Record the fingerprints of fetched `(url, fingerprint)` pages with one backend call, see `fingerprint`.
+
+        Fingerprints `local` tells are duplicates of this worker's pages are
+        not sent. A page whose fingerprint was sent counts as seen by the
+        other workers even if the run stops before handling it.
+        """
+        shared = []
+        for url, fingerprint in pages:
+            self._fingerprints[url] = (fingerprint, False)
+            if not local(fingerprint):
+                shared.append((url, fingerprint))
+        if not shared:
+            return
+        new = await asyncio.to_thread(self.backend.add_fingerprints, [fingerprint for _, fingerprint in shared])
+        for (url, fingerprint), is_new in zip(shared, new):
+            self._fingerprints[url] = (fingerprint, not is_new)
+
+    def is_shared(self, url: str) -> bool:
+        return url in self._fingerprints
+
+    def fingerprint(self, url: str) -> Tuple[str, bool] | None:
+        """The fingerprint shared for `url`, and whether another worker had it first; None if not shared."""
+        return self._fingerprints.pop(url, None)
+
+    async def wait_for_work(self, low: int) -> bool:
+        """With nothing left to fetch: whether the crawl goes on, waiting a little if other workers are still busy."""
+        if await self.sync(low, force=True):
+            return True
+        if not await asyncio.to_thread(self.backend.unfinished):
+            return False
+        await asyncio.sleep(self.flush_interval)
+        return True
+
+    def close(self) -> None:
+        """Send the pending updates and give back the claimed URLs that were not handled."""
+        try:
+            self.backend.exchange(self.shard, self._handled, self._outbox, 0)
+            self.backend.leave(self.shard, list(self._claimed))
+        except Exception as e:
+            logger.error(f"Could not leave shard {self.shard}: {e}")
+        self._handled, self._outbox = [], []
+        self._claimed.clear()
+        self._fingerprints.clear()
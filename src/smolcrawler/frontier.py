@@ -0,0 +1,110 @@
+import heapq
+from collections import deque
+from typing import Callable, Deque, List, Tuple
+
+from loguru import logger
+
+from .scoring import Scorer
+from .url_utils import normalize_url
+from .visited import UrlSet, memory_bytes
+
+
+class Frontier:
+    """FIFO queue of (url, depth) pairs waiting to be crawled.
+
+    URLs are deduplicated when they are pushed, by their normalized form, so a
+    page linked from thousands of other pages is queued only once. `max_size`
+    bounds the number of queued entries; pushes beyond it are dropped. `seen`
+    holds the keys of pushed URLs, a `set` unless given, see `smolcrawler.visited`.
+    """
+
+    def __init__(
+        self,
+        max_size: int | None = None,
+        key: Callable[[str], str] = normalize_url,
+        seen: UrlSet | None = None,
+    ):
+        self.max_size = max_size
+        self.key = key
+        self._queue: Deque[Tuple[str, int]] = deque()
+        self._seen: UrlSet = seen if seen is not None else set()
+        self.dropped = 0
+
+    def push(self, url: str, depth: int, anchor_text: str = "") -> bool:
+        """Queue `url` unless a similar URL was already pushed, returns whether it was queued."""
+        key = self.key(url)
+        if key in self._seen:
+            return False
+        if self.max_size is not None and len(self) >= self.max_size:
+            self.dropped += 1
+            if self.dropped == 1:
+                logger.warning(f"Frontier is full ({self.max_size} URLs), dropping new URLs")
+            return False
+        self._seen.add(key)
+        self._append(url, depth, anchor_text)
+        return True
+
+    def _append(self, url: str, depth: int, anchor_text: str) -> None:
+        self._queue.append((url, depth))
+
+    def mark_seen(self, url: str) -> None:
+        """Never queue `url` (or a similar URL), e.g. because a previous run already handled it."""
+        self._seen.add(self.key(url))
+
+    def pop(self) -> Tuple[str, int]:
+        return self._queue.popleft()
+
+    def done(self, url: str) -> None:
+        """`url` was popped and handled, whether visited or skipped."""
+
+    def seen(self, url: str) -> bool:
+        return self.key(url) in self._seen
+
+    def rekey(self) -> None:
+        """Add the seen keys in their current form, after `key` changed; only a plain `set` keeps its keys."""
+        if isinstance(self._seen, set):
+            self._seen.update({self.key(key) for key in self._seen})
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the seen URL keys."""
+        return memory_bytes(self._seen)
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __bool__(self) -> bool:
+        return bool(self._queue)
+
+
+class PriorityFrontier(Frontier):
+    """Frontier popping the URL with the highest `scorer` score first, in push order among equal scores.
+
+    A binary heap, so push and pop stay O(log n) however many URLs are queued.
+    """
+
+    def __init__(
+        self,
+        scorer: Scorer,
+        max_size: int | None = None,
+        key: Callable[[str], str] = normalize_url,
+        seen: UrlSet | None = None,
+    ):
+        super().__init__(max_size=max_size, key=key, seen=seen)
+        self.scorer = scorer
+        self._heap: List[Tuple[float, int, str, int]] = []  # (-score, push order, url, depth)
+        self._pushed = 0
+
+    def _append(self, url: str, depth: int, anchor_text: str) -> None:
+        score = self.scorer.score(url, depth, anchor_text)
+        heapq.heappush(self._heap, (-score, self._pushed, url, depth))
+        self._pushed += 1
+
+    def pop(self) -> Tuple[str, int]:
+        _, _, url, depth = heapq.heappop(self._heap)
+        return url, depth
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._heap)
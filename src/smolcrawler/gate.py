@@ -0,0 +1,151 @@
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple, Set, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from loguru import logger
+
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+# answers of servers that don't support HEAD requests
+HEAD_UNSUPPORTED = frozenset({405, 501})
+
+TYPE = "type"
+SIZE = "size"
+LEARNED = "learned"
+
+_DIGITS = re.compile(r"[0-9]+")
+
+
+class SkippedPage(NamedTuple):
+    """A URL kept from the visitor by a `ContentGate`, in place of its page."""
+
+    url: str
+    reason: str  # "type", "size" or "learned"
+    size: int | None  # Content-Length of the body that was not downloaded, when known
+
+
+def path_pattern(url: str) -> str:
+    """The host and directory of a URL with digit runs collapsed, e.g. `example.com/files/v#/*`."""
+    parts = urlsplit(url)
+    directory = parts.path.rsplit("/", 1)[0]
+    return f"{parts.netloc}{_DIGITS.sub('#', directory)}/*"
+
+
+class ContentGate:
+    """Checks the response headers of a URL before the visitor downloads and converts it.
+
+    A HEAD request is sent: pages that are not HTML by their Content-Type, or
+    larger than `max_bytes` by their Content-Length, are skipped. With
+    `method="GET"`, and for hosts answering HEAD with 405 or 501, a GET is
+    sent and only its headers are read, but bodies without a Content-Length
+    are streamed up to `max_bytes` and skipped past it. Pages passing a GET
+    probe are requested twice, by the probe and by the visitor, until their
+    pattern is trusted.
+
+    Probes go out with `headers` through `client`, so pass the visitor's
+    User-Agent and cookies, or a client with its proxy, for servers to answer
+    the gate as they answer the visitor.
+
+    Verdicts are kept per path pattern (see `path_pattern`): once
+    `learn_after` URLs of a pattern were not HTML and none was, its other URLs
+    are skipped without any request; once `trust_after` were HTML and none
+    was anything else, its URLs go to the visitor without a probe. `counts`
+    and `skipped_bytes` show what the gate saved.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 5 << 20,  # larger pages are skipped
+        method: str = "HEAD",  # or "GET", for servers whose HEAD responses lack the headers
+        headers: Dict[str, str] | None = None,  # sent with every probe, e.g. the visitor's User-Agent and cookies
+        html_types: Tuple[str, ...] = HTML_TYPES,  # Content-Types passed to the visitor, a missing one passes too
+        learn_after: int = 3,  # skip a path pattern after this many non-HTML URLs, and no HTML one
+        trust_after: int = 20,  # stop probing a path pattern after this many HTML URLs, and nothing else
+        timeout: float = 30,
+        client: httpx.AsyncClient | None = None,  # e.g. one with the visitor's proxy and cookie jar
+    ):
+        if method not in ("GET", "HEAD"):
+            raise ValueError(f"method must be GET or HEAD, got {method}")
+        self.max_bytes = max_bytes
+        self.method = method
+        self.headers = headers
+        self.html_types = html_types
+        self.learn_after = learn_after
+        self.trust_after = trust_after
+        self.client = client or httpx.AsyncClient(timeout=timeout, follow_redirects=True)
+        self.patterns: Dict[str, List[int]] = {}  # path pattern -> [html, not html, too large]
+        self.counts: Counter = Counter()  # probed, passed, trusted, skipped_type, skipped_size, skipped_learned
+        self.skipped_bytes = 0  # Content-Length of the skipped pages, never downloaded
+        self.probe_bytes = 0  # body bytes read by probes
+        self._no_head: Set[str] = set()  # hosts probed with GET, they don't support HEAD
+
+    def _verdict(self, response: httpx.Response) -> Tuple[str | None, int | None, int | None]:
+        """(skip reason, Content-Length, index of the verdict in `patterns`) from the headers."""
+        if response.status_code >= 400:
+            # the visitor reports the error, and it says nothing about the pattern
+            return None, None, None
+        length = response.headers.get("content-length", "")
+        length = int(length) if length.isdigit() else None
+        content_type = response.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        if content_type and content_type not in self.html_types:
+            return TYPE, length, 1
+        if length is not None and length > self.max_bytes:
+            return SIZE, length, 2
+        return None, length, 0
+
+    async def _probe(self, url: str) -> Tuple[str | None, int | None, int | None]:
+        host = urlsplit(url).netloc
+        try:
+            if self.method == "HEAD" and host not in self._no_head:
+                response = await self.client.head(url, headers=self.headers)
+                if response.status_code not in HEAD_UNSUPPORTED:
+                    return self._verdict(response)
+                logger.info(f"{host} does not support HEAD requests, probing it with GET")
+                self._no_head.add(host)
+            async with self.client.stream("GET", url, headers=self.headers) as response:
+                reason, length, verdict = self._verdict(response)
+                if reason is not None or length is not None or verdict is None:
+                    # leaving the block without reading the body closes the connection
+                    return reason, length, verdict
+                read = 0
+                async for chunk in response.aiter_raw():
+                    read += len(chunk)
+                    if read > self.max_bytes:
+                        break
+                self.probe_bytes += read
+                return (SIZE, None, 2) if read > self.max_bytes else (None, None, 0)
+        except Exception as e:
+            # e.g. httpx.InvalidURL, which is no HTTPError: the visitor gets the URL and reports it
+            logger.debug(f"Probing {url} failed: {e}")
+            return None, None, None
+
+    async def check(self, url: str) -> SkippedPage | None:
+        """Why `url` is skipped, None when it goes to the visitor."""
+        pattern = path_pattern(url)
+        html, other, large = self.patterns.get(pattern, (0, 0, 0))
+        if other >= self.learn_after and not html:
+            self.counts["skipped_learned"] += 1
+            return SkippedPage(url, LEARNED, None)
+        if html >= self.trust_after and not other and not large:
+            self.counts["trusted"] += 1
+            return None
+
+        self.counts["probed"] += 1
+        reason, length, verdict = await self._probe(url)
+        if verdict is not None:
+            self.patterns.setdefault(pattern, [0, 0, 0])[verdict] += 1
+        if reason is None:
+            self.counts["passed"] += 1
+            return None
+        self.counts[f"skipped_{reason}"] += 1
+        self.skipped_bytes += length or 0
+        if verdict == 1 and self.patterns[pattern][1] == self.learn_after and not self.patterns[pattern][0]:
+            logger.info(f"Skipping URLs of {pattern} from now on, they are not HTML")
+        return SkippedPage(url, reason, length)
+
+    def stats(self) -> dict:
+        return {**self.counts, "skipped_bytes": self.skipped_bytes, "probe_bytes": self.probe_bytes}
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
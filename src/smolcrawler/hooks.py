@@ -0,0 +1,122 @@
+import json
+import time
+from typing import Dict, List
+
+from .stats import Histogram
+
+
+class CrawlHooks:
+    """Callbacks from the hot path of `Crawler.run`, override the ones you need.
+
+    Times are `time.monotonic()` seconds. Without hooks (`Crawler(hooks=None)`,
+    the default) the crawler only pays for an `is None` check per call site.
+    """
+
+    def on_fetch_start(self, url: str, depth: int, queued: float, start: float) -> None:
+        """A fetch task started running, `queued` is when it was dispatched: the difference is event loop backlog."""
+
+    def on_fetch_end(self, url: str, depth: int, start: float, end: float, ok: bool) -> None:
+        """The visitor returned, `ok` is False if it gave no page. Includes conversion to markdown."""
+
+    def on_extract(self, url: str, start: float, end: float, links: int) -> None:
+        """Links of a page were extracted and filtered (and its content hashed, when offloaded)."""
+
+    def on_dedup(self, url: str, start: float, end: float, duplicate: bool) -> None:
+        """The content of a page was checked against, and added to, the content detector."""
+
+    def on_yield(self, url: str, depth: int, start: float, end: float) -> None:
+        """A page was handed to the consumer at `start`, which asked for the next one at `end`."""
+
+
+class TraceRecorder(CrawlHooks):
+    """Records every hook call, to write a Chrome trace and a summary of where the time went.
+
+    The trace (chrome://tracing or https://ui.perfetto.dev) has one track for
+    the crawler's own work (extract, dedup, consumer) and one per concurrent
+    fetch. Keeps one event per call, meant for profiling runs.
+    """
+
+    def __init__(self):
+        self.events: List[dict] = []
+        self.started = time.monotonic()
+        self.cpu_started = time.process_time()
+        self.finished: float | None = None
+        self.cpu_finished: float | None = None
+        self.totals: Dict[str, float] = {"backlog": 0.0, "fetch": 0.0, "extract": 0.0, "dedup": 0.0, "consumer": 0.0}
+        self.histograms: Dict[str, Histogram] = {name: Histogram() for name in self.totals}
+        self._free_lanes: List[int] = []
+        self._lanes: Dict[str, int] = {}
+
+    def _event(self, name: str, category: str, start: float, end: float, lane: int, **args) -> None:
+        self.events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self.started) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": 1,
+                "tid": lane,
+                "args": args,
+            }
+        )
+
+    def _add(self, name: str, seconds: float) -> None:
+        self.totals[name] += seconds
+        self.histograms[name].observe(seconds)
+
+    def on_fetch_start(self, url: str, depth: int, queued: float, start: float) -> None:
+        # lane 0 is the crawler itself, fetches take the lowest free lane after it
+        self._lanes[url] = self._free_lanes.pop() if self._free_lanes else len(self._lanes) + 1
+        self._add("backlog", start - queued)
+
+    def on_fetch_end(self, url: str, depth: int, start: float, end: float, ok: bool) -> None:
+        lane = self._lanes.pop(url, 0)
+        if lane:
+            self._free_lanes.append(lane)
+            self._free_lanes.sort(reverse=True)
+        self._add("fetch", end - start)
+        self._event("fetch", "fetch", start, end, lane, url=url, depth=depth, ok=ok)
+
+    def on_extract(self, url: str, start: float, end: float, links: int) -> None:
+        self._add("extract", end - start)
+        self._event("extract", "extract", start, end, 0, url=url, links=links)
+
+    def on_dedup(self, url: str, start: float, end: float, duplicate: bool) -> None:
+        self._add("dedup", end - start)
+        self._event("dedup", "dedup", start, end, 0, url=url, duplicate=duplicate)
+
+    def on_yield(self, url: str, depth: int, start: float, end: float) -> None:
+        self._add("consumer", end - start)
+        self._event("consumer", "yield", start, end, 0, url=url, depth=depth)
+
+    def finish(self) -> None:
+        self.finished = time.monotonic()
+        self.cpu_finished = time.process_time()
+
+    def write_chrome_trace(self, path: str) -> None:
+        metadata = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": "crawler"}}]
+        lanes = {event["tid"] for event in self.events if event["tid"]}
+        metadata += [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": lane, "args": {"name": f"fetch slot {lane}"}}
+            for lane in sorted(lanes)
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, f)
+
+    def summary(self) -> str:
+        wall = (self.finished or time.monotonic()) - self.started
+        cpu = (self.cpu_finished or time.process_time()) - self.cpu_started
+        # extract, dedup (inline) and the consumer run on the event loop thread, so their wall time is CPU time
+        # there; the rest of the CPU goes to the visitor (conversion included), the event loop and workers
+        lines = [f"Wall: {wall:.2f}s, CPU: {cpu:.2f}s ({cpu / wall:.0%} of wall)" if wall > 0 else "Wall: 0s"]
+        for name, total in self.totals.items():
+            histogram = self.histograms[name]
+            if not histogram.count:
+                continue
+            share = f"{total / wall:6.1%} of wall" if name != "fetch" else "overlapping"
+            lines.append(
+                f"  {name:>8}: {total:8.2f}s total ({share}), {histogram.count} calls, "
+                f"p50 <= {histogram.quantile(0.5)}s, p99 <= {histogram.quantile(0.99)}s"
+            )
+        return "\n".join(lines)
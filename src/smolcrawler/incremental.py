@@ -0,0 +1,193 @@
+import gzip
+import hashlib
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, NamedTuple
+
+from localwebpy import Webpage
+from loguru import logger
+
+from .content_detector import fingerprint_algorithm
+
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+# status codes of pages removed from the site, rather than failing for now
+GONE_STATUS_CODES = frozenset({404, 410})
+
+
+@dataclass
+class ManifestEntry:
+    url: str
+    fingerprint: str
+    last_seen: float  # unix time of the crawl that last fetched the page
+    links: List[str] = field(default_factory=list)  # links followed from the page, to carry pruned subtrees over
+
+
+class Manifest:
+    """URL -> content fingerprint, last-seen time and links of a crawl, saved as JSON lines (gzipped for .gz)."""
+
+    def __init__(self, entries: Dict[str, ManifestEntry] | None = None):
+        self.entries: Dict[str, ManifestEntry] = entries or {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.entries
+
+    def __iter__(self) -> Iterator[ManifestEntry]:
+        return iter(self.entries.values())
+
+    def get(self, url: str) -> ManifestEntry | None:
+        return self.entries.get(url)
+
+    def add(self, entry: ManifestEntry) -> None:
+        self.entries[entry.url] = entry
+
+    @staticmethod
+    def _open(path: str, mode: str):
+        if path.endswith(".gz"):
+            return gzip.open(path, mode + "t", encoding="utf-8")
+        return open(path, mode, encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str) -> "Manifest":
+        manifest = cls()
+        with cls._open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    manifest.add(ManifestEntry(**json.loads(line)))
+        logger.info(f"Loaded manifest of {len(manifest)} pages from {path}")
+        return manifest
+
+    def save(self, path: str) -> None:
+        with self._open(path, "w") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(asdict(entry), ensure_ascii=False) + "\n")
+
+
+class ChangedPage(NamedTuple):
+    status: str  # "new", "changed" or "unchanged"
+    webpage: Webpage
+
+
+class IncrementalCrawl:
+    """Diffs a crawl against the manifest of a previous one.
+
+    Every page is classified as new, changed or unchanged by its content
+    fingerprint, and recorded in `manifest`, to be saved for the next run.
+    With `prune_unchanged`, links of unchanged pages (other than the seeds)
+    are not followed: their subtree, as recorded in the previous manifest, is
+    assumed unchanged too and carried over without fetching it. Previously
+    seen URLs answering 404 or 410, or no longer linked, are reported in
+    `deleted`; when the crawl stopped at its limit, only the gone ones are.
+    Pages failing otherwise (errors, timeouts, 5xx) or linked but not
+    fetched (crawler traps) keep their previous entry, they may well be back
+    next time.
+    """
+
+    def __init__(
+        self,
+        previous: Manifest | None = None,
+        only_changed: bool = False,  # `Crawler.run_incremental` yields new and changed pages only
+        prune_unchanged: bool = False,  # don't follow the links of unchanged pages below the seeds
+    ):
+        self.previous = previous or Manifest()
+        self.only_changed = only_changed
+        self.prune_unchanged = prune_unchanged
+        self.manifest = Manifest()
+        self.counts: Dict[str, int] = {NEW: 0, CHANGED: 0, UNCHANGED: 0, "carried_over": 0}
+        self.deleted: List[str] = []
+        self._statuses: Dict[str, str] = {}
+        self._gone: List[str] = []
+        self._started = time.time()
+
+    def start(self) -> None:
+        """Reset for a new crawl."""
+        self.manifest = Manifest()
+        self.counts = dict.fromkeys(self.counts, 0)
+        self.deleted = []
+        self._statuses = {}
+        self._gone = []
+        self._started = time.time()
+
+    def status(self, url: str) -> str | None:
+        """Whether a page fetched by the current crawl is new, changed or unchanged."""
+        return self._statuses.get(url)
+
+    def fingerprint(self, content: str) -> str:
+        """For content detectors without fingerprints of their own."""
+        return hashlib.md5(content.encode()).hexdigest()
+
+    def record(self, url: str, fingerprint: str) -> str:
+        """Add a fetched page to the manifest, returning whether it is new, changed or unchanged."""
+        old = self.previous.get(url)
+        if old is not None and old.fingerprint != fingerprint:
+            previous, current = fingerprint_algorithm(old.fingerprint), fingerprint_algorithm(fingerprint)
+            if previous is not None and current is not None and previous != current:
+                raise ValueError(
+                    f"The previous manifest was hashed with {previous}, this crawl hashes with {current}: "
+                    "every page would show as changed, install the same hash extras or start over"
+                )
+        if old is None:
+            status = NEW
+        elif old.fingerprint == fingerprint:
+            status = UNCHANGED
+        else:
+            status = CHANGED
+        self.counts[status] += 1
+        if url in self.manifest:
+            # carried over below an unchanged page, but reached through another one
+            self.counts["carried_over"] -= 1
+        self.manifest.add(ManifestEntry(url, fingerprint, self._started))
+        self._statuses[url] = status
+        return status
+
+    def set_links(self, url: str, links: List[str]) -> None:
+        self.manifest.entries[url].links = links
+
+    def failed(self, url: str, status_code: int | None = None) -> None:
+        """A page that could not be fetched: deleted when its server says so, carried over otherwise."""
+        if status_code in GONE_STATUS_CODES:
+            self._gone.append(url)
+            return
+        self.skipped(url)
+
+    def skipped(self, url: str) -> None:
+        """A linked page the crawl did not fetch, e.g. dropped as a crawler trap: carried over, not deleted."""
+        old = self.previous.get(url)
+        if old is not None and url not in self.manifest:
+            self.manifest.add(old)
+            self.counts["carried_over"] += 1
+
+    def carry_over(self, url: str) -> None:
+        """Keep the previous entries of the subtree below an unchanged page, which is not crawled again."""
+        old = self.previous.get(url)
+        if old is None:
+            return
+        self.manifest.entries[url].links = old.links
+        stack = list(old.links)
+        while stack:
+            entry = self.previous.get(stack.pop())
+            if entry is None or entry.url in self.manifest:
+                continue
+            self.manifest.add(entry)
+            self.counts["carried_over"] += 1
+            stack.extend(entry.links)
+
+    def finish(self, complete: bool) -> None:
+        """Work out the deleted URLs; `complete` when the crawl ran out of URLs rather than hit its limit."""
+        gone = set(self._gone)
+        self.deleted = [
+            entry.url
+            for entry in self.previous
+            if entry.url in gone or (complete and entry.url not in self.manifest)
+        ]
+        logger.info(
+            f"Incremental crawl: {self.counts[NEW]} new, {self.counts[CHANGED]} changed, "
+            f"{self.counts[UNCHANGED]} unchanged, {self.counts['carried_over']} carried over, "
+            f"{len(self.deleted)} deleted"
+        )
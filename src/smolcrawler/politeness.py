@@ -0,0 +1,202 @@
+import asyncio
+import copy
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Tuple
+from urllib.parse import urlparse
+
+from loguru import logger
+
+# status codes meaning "slow down"
+THROTTLE_STATUS_CODES = frozenset({429, 503})
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `burst` requests."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until_ready(self, now: float) -> float:
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+
+@dataclass
+class HostState:
+    limit: float  # current concurrency limit, lowered on throttling and raised again on success
+    bucket: TokenBucket | None
+    in_flight: int = 0
+    backoff: float = 0.0
+    blocked_until: float = 0.0
+    latency: float | None = None  # moving average of request latency
+    best_latency: float | None = None
+
+
+class HostScheduler:
+    """Per-host politeness for `Crawler`.
+
+    Every host (netloc) gets its own concurrency cap and, if `rate` is set, a
+    token bucket limiting requests per second. A 429/503 response or a failed
+    fetch halves the host's concurrency and blocks it for an exponentially
+    growing delay; latency rising above `slow_factor` times the best seen
+    latency halves the concurrency too. Successful requests slowly raise the
+    concurrency back to `max_per_host`.
+
+    URLs whose host is busy are parked here while the crawler dispatches URLs
+    of other hosts, and are handed back as soon as their host is ready.
+    Crawls sharing hosts share their slots, rates and backoff through
+    `shared()` schedulers, each with its own parked URLs.
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = 2,
+        rate: float | None = None,  # requests per second per host, None for unlimited
+        burst: int = 1,
+        backoff: float = 1.0,  # first delay after a throttled request, doubled on every further one
+        max_backoff: float = 60.0,
+        slow_factor: float = 3.0,
+    ):
+        self.max_per_host = max_per_host
+        self.rate = rate
+        self.burst = burst
+        self.initial_backoff = backoff
+        self.max_backoff = max_backoff
+        self.slow_factor = slow_factor
+        self.hosts: Dict[str, HostState] = {}
+        # host -> parked URLs, in round-robin order of the hosts
+        self._parked_hosts: OrderedDict[str, Deque[Tuple[str, int]]] = OrderedDict()
+        self.parked = 0
+        self._waiters: List[asyncio.Future] = []  # shared too, see `wait_for_release`
+
+    def shared(self) -> "HostScheduler":
+        """A scheduler with the same host states (slots, rate limits, backoff) and no parked URLs."""
+        scheduler = copy.copy(self)
+        scheduler._parked_hosts = OrderedDict()
+        scheduler.parked = 0
+        return scheduler
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlparse(url).netloc
+
+    def _state(self, host: str) -> HostState:
+        state = self.hosts.get(host)
+        if state is None:
+            bucket = TokenBucket(self.rate, self.burst) if self.rate else None
+            state = self.hosts[host] = HostState(limit=self.max_per_host, bucket=bucket)
+        return state
+
+    def _wait_time(self, state: HostState, now: float) -> float | None:
+        """Seconds until the host may get another request, None if it waits for an in-flight one."""
+        if state.in_flight >= max(1, int(state.limit)):
+            return None
+        wait = max(0.0, state.blocked_until - now)
+        if state.bucket:
+            wait = max(wait, state.bucket.time_until_ready(now))
+        return wait
+
+    def set_crawl_delay(self, host: str, delay: float) -> None:
+        """Space requests to `host` by at least `delay` seconds (robots.txt Crawl-delay), unless already slower."""
+        state = self._state(host)
+        if delay > 0 and (state.bucket is None or state.bucket.rate > 1 / delay):
+            state.bucket = TokenBucket(1 / delay, 1)
+
+    def is_ready(self, url: str) -> bool:
+        return self._wait_time(self._state(self.host_of(url)), time.monotonic()) == 0
+
+    def park(self, url: str, depth: int) -> None:
+        host = self.host_of(url)
+        self._state(host)
+        parked = self._parked_hosts.get(host)
+        if parked is None:
+            parked = self._parked_hosts[host] = deque()
+        parked.append((url, depth))
+        self.parked += 1
+
+    def pop_ready(self) -> Tuple[str, int] | None:
+        """Return a parked URL whose host is ready, taking hosts in turn."""
+        now = time.monotonic()
+        for host, parked in list(self._parked_hosts.items()):
+            if self._wait_time(self.hosts[host], now) != 0:
+                continue
+            item = parked.popleft()
+            self.parked -= 1
+            if parked:
+                self._parked_hosts.move_to_end(host)
+            else:
+                del self._parked_hosts[host]
+            return item
+        return None
+
+    def next_wakeup(self) -> float | None:
+        """Seconds until a parked URL may become ready by time alone, None if none will."""
+        now = time.monotonic()
+        waits = [self._wait_time(self.hosts[host], now) for host in self._parked_hosts]
+        waits = [wait for wait in waits if wait is not None]
+        return min(waits) if waits else None
+
+    async def wait_for_release(self, timeout: float | None = None) -> None:
+        """Wait until a request completes, in this crawl or another one sharing the hosts."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _wake(self) -> None:
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+
+    def acquire(self, url: str) -> None:
+        state = self._state(self.host_of(url))
+        state.in_flight += 1
+        if state.bucket:
+            state.bucket.take(time.monotonic())
+
+    def cancel(self, url: str) -> None:
+        """Give back the slot of a request that was cancelled before it completed."""
+        self._state(self.host_of(url)).in_flight -= 1
+        self._wake()
+
+    def release(self, url: str, latency: float, ok: bool, status_code: int | None = None) -> None:
+        host = self.host_of(url)
+        state = self._state(host)
+        state.in_flight -= 1
+        self._wake()
+
+        if not ok or status_code in THROTTLE_STATUS_CODES:
+            state.limit = max(1.0, state.limit / 2)
+            state.backoff = min(self.max_backoff, state.backoff * 2 if state.backoff else self.initial_backoff)
+            state.blocked_until = time.monotonic() + state.backoff
+            logger.info(f"Backing off {host} for {state.backoff:.1f}s (status={status_code}, ok={ok})")
+            return
+
+        state.backoff = 0.0
+        state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+        if state.best_latency is None or state.latency < state.best_latency:
+            state.best_latency = state.latency
+        if state.latency > self.slow_factor * state.best_latency:
+            if state.limit > 1:
+                state.limit = max(1.0, state.limit / 2)
+                logger.info(f"Latency of {host} rising ({state.latency:.2f}s), lowering concurrency to {state.limit:.0f}")
+            # start over from the current latency, so the host is not throttled forever
+            state.best_latency = state.latency
+        else:
+            state.limit = min(self.max_per_host, state.limit + 1 / state.limit)
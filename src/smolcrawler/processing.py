@@ -0,0 +1,54 @@
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+from .url_filter import UrlFilter
+from .utils import extract_urls
+
+
+@dataclass
+class ProcessedPage:
+    """What the crawler needs from a page, small enough to send back from a worker process."""
+
+    links: List[str]
+    fingerprint: str | None
+    anchor_texts: Dict[str, str] | None = None
+
+
+def process_page(
+    html: str | None,
+    content: str | None,
+    url: str,
+    prefix: str | None,
+    url_filter: UrlFilter,
+    max_urls: int | None,
+    fingerprinter: Callable[[str], str] | None,
+    extract_links: bool,
+    with_anchor_texts: bool = False,
+) -> ProcessedPage:
+    """Extract and filter the links of a page and fingerprint its content."""
+    links = []
+    anchor_texts = {} if with_anchor_texts else None
+    if extract_links and html:
+        links = [
+            link for link in extract_urls(html, url, max_urls, anchor_texts) if url_filter.accepts(link, prefix)
+        ]
+    fingerprint = fingerprinter(content) if fingerprinter and content else None
+    return ProcessedPage(links=links, fingerprint=fingerprint, anchor_texts=anchor_texts)
+
+
+def free_threaded() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def create_executor(kind: str, workers: int) -> Executor:
+    """Executor for page post-processing: "process", "thread", or "auto" (threads on free-threaded builds)."""
+    if kind == "auto":
+        kind = "thread" if free_threaded() else "process"
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    raise ValueError(f"Unknown offload kind: {kind}")
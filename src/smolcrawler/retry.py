@@ -0,0 +1,201 @@
+import heapq
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+from urllib.parse import urlparse
+
+from loguru import logger
+
+# status codes of pages worth fetching again a little later
+RETRY_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def failed_status(webpage) -> bool:
+    """Whether the visitor got a page, but one of a transient server error."""
+    return getattr(webpage, "status_code", None) in RETRY_STATUS_CODES
+
+
+class DelayQueue:
+    """(url, depth) items, each handed out once its `time.monotonic()` time has come."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str, int]] = []  # (ready at, sequence, url, depth)
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, url: str, depth: int, ready_at: float) -> None:
+        heapq.heappush(self._heap, (ready_at, self._sequence, url, depth))
+        self._sequence += 1
+
+    def pop_ready(self) -> Tuple[str, int] | None:
+        """An item whose time has come, None if none has."""
+        if not self._heap or self._heap[0][0] > time.monotonic():
+            return None
+        _, _, url, depth = heapq.heappop(self._heap)
+        return url, depth
+
+    def next_wakeup(self) -> float | None:
+        """Seconds until the next item is ready, None without items."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+
+class RetryQueue:
+    """Failed URLs of a `Crawler` waiting to be fetched again.
+
+    A URL is retried after `backoff` seconds, doubled on every further
+    failure up to `max_backoff`, until it was tried `max_attempts` times in
+    all. `budget` caps the retries of the whole crawl, so a broken site
+    cannot keep the crawler busy with it forever. `retried` and `given_up`
+    count the retries scheduled and the URLs dropped.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,  # fetches of a URL, the first one included
+        backoff: float = 1.0,  # delay before the first retry, doubled on every further one
+        max_backoff: float = 60.0,
+        budget: int = 1000,  # retries over the whole crawl
+    ):
+        self.max_attempts = max_attempts
+        self.initial_backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.start()
+
+    def start(self) -> None:
+        """Forget the retries of a previous crawl."""
+        self.failures: Dict[str, int] = {}  # URL -> failed fetches, while it waits for a retry
+        self.queue = DelayQueue()
+        self.retried = 0
+        self.given_up = 0
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def schedule(self, url: str, depth: int, not_before: float = 0.0) -> bool:
+        """Queue `url` to be fetched again, False when out of attempts or budget.
+
+        `not_before` is a `time.monotonic()` time the retry waits for anyway,
+        e.g. the reopening of the host's circuit.
+        """
+        failures = self.failures.pop(url, 0) + 1
+        if failures >= self.max_attempts or self.retried >= self.budget:
+            self.given_up += 1
+            return False
+        self.failures[url] = failures
+        delay = min(self.max_backoff, self.initial_backoff * 2 ** (failures - 1))
+        self.queue.push(url, depth, max(time.monotonic() + delay, not_before))
+        self.retried += 1
+        if self.retried == self.budget:
+            logger.warning(f"Retry budget of {self.budget} used up, further failed URLs are not retried")
+        return True
+
+    def succeeded(self, url: str) -> None:
+        self.failures.pop(url, None)
+
+    def pop_ready(self) -> Tuple[str, int] | None:
+        """A URL whose retry is due, None if none is."""
+        return self.queue.pop_ready()
+
+    def next_wakeup(self) -> float | None:
+        """Seconds until the next retry is due, None without retries."""
+        return self.queue.next_wakeup()
+
+
+@dataclass
+class Circuit:
+    failures: int = 0  # consecutive failed fetches
+    open_until: float = 0.0  # no fetches before this `time.monotonic()` time, but a probe
+    open_for: float = 0.0  # how long the circuit was opened last, doubled while probes fail
+    probing: bool = False  # a probe was let through since
+    trips: int = 0  # times opened without a successful fetch in between
+
+
+class CircuitBreaker:
+    """Stops spending fetches on hosts that keep failing.
+
+    After `failures` consecutive failed fetches (errors, timeouts, missing
+    pages or 5xx/429 responses) the host's circuit opens: its URLs are not
+    fetched for `reset_after` seconds. Then one probe is let through; a
+    success closes the circuit, a failure opens it again for twice as long,
+    up to `max_reset`. After `give_up_after` openings without a success the
+    host is considered down, and its URLs are dropped without a fetch.
+    `trips` counts how often circuits opened.
+    """
+
+    def __init__(
+        self,
+        failures: int = 5,  # consecutive failed fetches opening a host's circuit
+        reset_after: float = 30.0,  # seconds until the first probe, doubled while probes fail
+        max_reset: float = 600.0,
+        give_up_after: int = 4,  # openings in a row after which the host is down for the crawl
+    ):
+        self.max_failures = failures
+        self.reset_after = reset_after
+        self.max_reset = max_reset
+        self.give_up_after = give_up_after
+        self.hosts: Dict[str, Circuit] = {}
+        self.trips = 0
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlparse(url).netloc
+
+    def allow(self, url: str) -> bool:
+        """Whether `url` may be fetched now: its host's circuit is closed, or due for a probe."""
+        circuit = self.hosts.get(self.host_of(url))
+        if circuit is None or circuit.failures < self.max_failures:
+            return True
+        now = time.monotonic()
+        if now < circuit.open_until or circuit.trips >= self.give_up_after:
+            return False
+        # one probe per period, even if its result never comes back
+        circuit.open_until = now + circuit.open_for
+        circuit.probing = True
+        return True
+
+    def is_down(self, url: str) -> bool:
+        """Whether the host of `url` failed so often that its URLs are not fetched anymore."""
+        circuit = self.hosts.get(self.host_of(url))
+        return circuit is not None and circuit.trips >= self.give_up_after
+
+    def reopens_at(self, url: str) -> float:
+        """The `time.monotonic()` time the host of `url` gets its next probe, 0 if its circuit is closed."""
+        circuit = self.hosts.get(self.host_of(url))
+        if circuit is None or circuit.failures < self.max_failures:
+            return 0.0
+        return circuit.open_until
+
+    def record(self, url: str, ok: bool) -> None:
+        host = self.host_of(url)
+        circuit = self.hosts.get(host)
+        if ok:
+            if circuit is not None:
+                if circuit.failures >= self.max_failures:
+                    logger.info(f"Circuit of {host} closed again")
+                del self.hosts[host]
+            return
+        if circuit is None:
+            circuit = self.hosts[host] = Circuit()
+        circuit.failures += 1
+        if circuit.failures < self.max_failures:
+            return
+        if circuit.failures > self.max_failures and not circuit.probing:
+            # fetches started before the circuit opened
+            return
+        circuit.probing = False
+        circuit.open_for = min(self.max_reset, circuit.open_for * 2 if circuit.open_for else self.reset_after)
+        circuit.open_until = time.monotonic() + circuit.open_for
+        circuit.trips += 1
+        self.trips += 1
+        if circuit.trips >= self.give_up_after:
+            logger.warning(f"Giving up on {host} after {circuit.failures} failed fetches")
+            return
+        logger.warning(f"Circuit of {host} open for {circuit.open_for:.0f}s after {circuit.failures} failed fetches")
+
+    def open_hosts(self) -> List[str]:
+        return [host for host, circuit in self.hosts.items() if circuit.failures >= self.max_failures]
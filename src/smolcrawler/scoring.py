@@ -0,0 +1,104 @@
+import re
+from typing import Dict, List, Protocol
+from urllib.parse import urlsplit
+
+
+class Scorer(Protocol):
+    """Priority of a discovered URL for `PriorityFrontier`, higher is crawled first."""
+
+    def start(self, url: str, prefix: str) -> None:
+        """Called when a crawl starts, with its seed URL and URL prefix."""
+        pass
+
+    def score(self, url: str, depth: int, anchor_text: str) -> float: ...
+
+
+def _segments(url: str) -> List[str]:
+    return [segment for segment in urlsplit(url).path.split("/") if segment]
+
+
+class DepthScorer(Scorer):
+    """Prefers shallow pages: -`weight` per level."""
+
+    def __init__(self, weight: float = 1.0):
+        self.weight = weight
+
+    def score(self, url: str, depth: int, anchor_text: str) -> float:
+        return -self.weight * depth
+
+
+class PathScorer(Scorer):
+    """Prefers URLs whose path shares leading segments with the target's, the URL prefix or seed by default.
+
+    Scores `weight` times the share of the target's segments matched, less
+    `extra_weight` per segment beyond them, so that pages right under the
+    target come before far-away or deeply nested ones.
+    """
+
+    def __init__(self, target: str | None = None, weight: float = 2.0, extra_weight: float = 0.1):
+        self.target = target
+        self.weight = weight
+        self.extra_weight = extra_weight
+        self._target_segments = _segments(target) if target else None
+
+    def start(self, url: str, prefix: str) -> None:
+        if self.target is None:
+            # a bare-origin prefix says nothing about paths, the seed does
+            self._target_segments = _segments(prefix) or _segments(url)
+
+    def score(self, url: str, depth: int, anchor_text: str) -> float:
+        target = self._target_segments or []
+        segments = _segments(url)
+        common = 0
+        for a, b in zip(target, segments):
+            if a != b:
+                break
+            common += 1
+        similarity = common / len(target) if target else 1.0
+        return self.weight * similarity - self.extra_weight * max(0, len(segments) - len(target))
+
+
+class RegexScorer(Scorer):
+    """Adds the boost of every pattern found in the URL or in the anchor text, negative boosts demote.
+
+        RegexScorer(url_boosts={r"/docs/": 3, r"/(changelog|releases)/": -5}, anchor_boosts={r"(?i)tutorial": 2})
+    """
+
+    def __init__(self, url_boosts: Dict[str, float] | None = None, anchor_boosts: Dict[str, float] | None = None):
+        self.url_boosts = [(re.compile(pattern), boost) for pattern, boost in (url_boosts or {}).items()]
+        self.anchor_boosts = [(re.compile(pattern), boost) for pattern, boost in (anchor_boosts or {}).items()]
+
+    def score(self, url: str, depth: int, anchor_text: str) -> float:
+        total = 0.0
+        for pattern, boost in self.url_boosts:
+            if pattern.search(url):
+                total += boost
+        if anchor_text:
+            for pattern, boost in self.anchor_boosts:
+                if pattern.search(anchor_text):
+                    total += boost
+        return total
+
+
+class CombinedScorer(Scorer):
+    """Sum of the scores of several scorers."""
+
+    def __init__(self, *scorers: Scorer):
+        self.scorers = scorers
+
+    def start(self, url: str, prefix: str) -> None:
+        for scorer in self.scorers:
+            scorer.start(url, prefix)
+
+    def score(self, url: str, depth: int, anchor_text: str) -> float:
+        return sum(scorer.score(url, depth, anchor_text) for scorer in self.scorers)
+
+
+def default_scorer(
+    url_boosts: Dict[str, float] | None = None, anchor_boosts: Dict[str, float] | None = None
+) -> CombinedScorer:
+    """Depth, path similarity to the URL prefix / seed, and optional regex boosts."""
+    scorers: List[Scorer] = [DepthScorer(), PathScorer()]
+    if url_boosts or anchor_boosts:
+        scorers.append(RegexScorer(url_boosts, anchor_boosts))
+    return CombinedScorer(*scorers)
@@ -0,0 +1,178 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import re
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO, Deque, Dict, List
+from urllib.parse import unquote, urlsplit
+
+from localwebpy import Webpage
+
+Record = Dict[str, Any]
+
+_UNSAFE = re.compile(r"[^\w.\-]+")
+
+
+def page_record(webpage: Webpage, include_html: bool = False) -> Record:
+    record = {"url": webpage.url, "title": webpage.title, "content": webpage.content}
+    if include_html:
+        record["html"] = webpage.html
+    return record
+
+
+class Sink:
+    """Writes crawled pages in batches on a writer thread, off the event loop.
+
+    Pages are turned into small records right away and the `Webpage` is
+    released. A full batch is handed to the writer thread; while
+    `max_pending` batches are still being written, `write` waits, so a slow
+    disk slows the crawl down instead of letting pages pile up in memory.
+    Subclasses implement `_write_batch` and `_close`, both run on the writer
+    thread, in order.
+    """
+
+    def __init__(self, batch_size: int = 100, max_pending: int = 2, include_html: bool = False):
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.include_html = include_html
+        self.written = 0
+        self._batch: List[Record] = []
+        self._pending: Deque[asyncio.Future] = deque()
+        # a single thread keeps the batches in order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=type(self).__name__)
+
+    async def write(self, webpage: Webpage) -> None:
+        self._batch.append(page_record(webpage, self.include_html))
+        if len(self._batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Hand the buffered pages to the writer thread, waiting while it is `max_pending` batches behind."""
+        while self._pending and (self._pending[0].done() or len(self._pending) >= self.max_pending):
+            await self._pending.popleft()
+        if self._batch:
+            batch, self._batch = self._batch, []
+            self._pending.append(self._submit(self._write_batch, batch))
+            self.written += len(batch)
+
+    async def close(self) -> None:
+        try:
+            await self.flush()
+            while self._pending:
+                await self._pending.popleft()
+            await self._submit(self._close)
+        finally:
+            self._executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> "Sink":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _submit(self, fn, *args) -> asyncio.Future:
+        future: Future = self._executor.submit(fn, *args)
+        return asyncio.wrap_future(future)
+
+    def _write_batch(self, records: List[Record]) -> None:
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        pass
+
+
+def _open_compressed(path: Path, compression: str | None, level: int | None) -> BinaryIO:
+    if compression is None:
+        return open(path, "wb")
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=6 if level is None else level)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("zstd compression needs the zstandard package: pip install zstandard") from e
+        compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+        return compressor.stream_writer(open(path, "wb"), closefd=True)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+class JsonlSink(Sink):
+    """One JSON object per line, gzip or zstd compressed for .gz / .zst paths (or per `compression`)."""
+
+    def __init__(self, path: str, compression: str | None = None, level: int | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        if compression is None:
+            compression = {".gz": "gzip", ".zst": "zstd"}.get(self.path.suffix)
+        self._file = _open_compressed(self.path, compression, level)
+
+    def _write_batch(self, records: List[Record]) -> None:
+        self._file.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode())
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+def markdown_path(url: str) -> Path:
+    """Relative file path mirroring a URL: host/path.md, index.md for directories, a hash suffix for queries."""
+    parts = urlsplit(url)
+    segments = [_UNSAFE.sub("_", unquote(segment)) for segment in parts.path.split("/") if segment]
+    segments = [segment for segment in segments if segment.strip(".")]
+    if not segments or parts.path.endswith("/"):
+        segments.append("index")
+    name = re.sub(r"\.(html?|php|aspx?)$", "", segments[-1]) or "index"
+    if parts.query:
+        name += "_" + hashlib.sha1(parts.query.encode()).hexdigest()[:8]
+    segments[-1] = name + ".md"
+    return Path(_UNSAFE.sub("_", parts.netloc), *segments)
+
+
+class MarkdownTreeSink(Sink):
+    """Writes the content of each page to `root`/host/path.md, with its URL and title as front matter."""
+
+    def __init__(self, root: str, **kwargs):
+        kwargs.setdefault("batch_size", 16)
+        super().__init__(**kwargs)
+        self.root = Path(root)
+
+    def _write_batch(self, records: List[Record]) -> None:
+        for record in records:
+            path = self.root / markdown_path(record["url"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            header = f"---\nurl: {json.dumps(record['url'])}\ntitle: {json.dumps(record['title'])}\n---\n\n"
+            path.write_text(header + (record["content"] or ""), encoding="utf-8")
+
+
+class ParquetSink(Sink):
+    """A Parquet file with url, title, content (and html) columns, one row group per batch. Needs pyarrow."""
+
+    def __init__(self, path: str, batch_size: int = 1000, compression: str = "zstd", **kwargs):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("ParquetSink needs the pyarrow package: pip install pyarrow") from e
+        super().__init__(batch_size=batch_size, **kwargs)
+        columns = ["url", "title", "content"] + (["html"] if self.include_html else [])
+        self._pa = pa
+        self._schema = pa.schema([(column, pa.string()) for column in columns])
+        self._writer = pq.ParquetWriter(path, self._schema, compression=compression)
+
+    def _write_batch(self, records: List[Record]) -> None:
+        self._writer.write_table(self._pa.Table.from_pylist(records, schema=self._schema))
+
+    def _close(self) -> None:
+        self._writer.close()
+
+
+def open_sink(path: str, **kwargs) -> Sink:
+    """The sink for an output path: .jsonl[.gz|.zst] for JSONL, .parquet for Parquet, a markdown tree otherwise."""
+    suffixes = Path(path).suffixes
+    if suffixes[-1:] == [".parquet"]:
+        return ParquetSink(path, **kwargs)
+    if ".jsonl" in suffixes[-2:]:
+        return JsonlSink(path, **kwargs)
+    return MarkdownTreeSink(path, **kwargs)
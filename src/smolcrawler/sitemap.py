@@ -0,0 +1,189 @@
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+import httpx
+from loguru import logger
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+@dataclass
+class SitemapEntry:
+    url: str
+    lastmod: datetime | None = None
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_lastmod(value: str | None) -> datetime | None:
+    """W3C datetime of a sitemap <lastmod>, as an aware datetime (UTC if no offset is given)."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class SitemapSeeder:
+    """Seeds a crawl from robots.txt and sitemaps, and enforces robots.txt rules.
+
+    Sitemaps are found in the `Sitemap:` lines of robots.txt (or at
+    /sitemap.xml), followed through sitemap indexes, and parsed as they are
+    downloaded, gzipped or not, so memory stays flat on 50k-URL files. URLs
+    with a `lastmod` older than `since` are skipped. With `respect_robots`,
+    Disallow rules and Crawl-delay of the seed's host are applied for
+    `user_agent`.
+    """
+
+    def __init__(
+        self,
+        since: datetime | None = None,  # skip URLs whose lastmod is older, e.g. the time of the previous crawl
+        sitemap_urls: List[str] | None = None,  # use these instead of discovering sitemaps
+        seed_sitemaps: bool = True,  # False to only apply robots.txt rules
+        respect_robots: bool = True,
+        user_agent: str = "smolcrawler",
+        max_sitemaps: int = 1000,
+        timeout: int = 60,
+        client: httpx.AsyncClient | None = None,
+    ):
+        self.since = since if since is None or since.tzinfo else since.replace(tzinfo=timezone.utc)
+        self.sitemap_urls = sitemap_urls
+        self.seed_sitemaps = seed_sitemaps
+        self.respect_robots = respect_robots
+        self.user_agent = user_agent
+        self.max_sitemaps = max_sitemaps
+        self.client = client or httpx.AsyncClient(
+            timeout=timeout, follow_redirects=True, headers={"User-Agent": user_agent}
+        )
+        self.robots: Dict[str, RobotFileParser] = {}
+        self.skipped_unchanged = 0
+
+    async def load_robots(self, url: str) -> RobotFileParser:
+        """Fetch and parse the robots.txt of `url`'s origin, once per origin."""
+        origin = _origin(url)
+        if origin in self.robots:
+            return self.robots[origin]
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        lines: List[str] = []
+        try:
+            response = await self.client.get(f"{origin}/robots.txt")
+            if response.status_code == 200:
+                lines = response.text.splitlines()
+            else:
+                logger.debug(f"No robots.txt for {origin} (status {response.status_code})")
+        except httpx.HTTPError as e:
+            logger.warning(f"Fetching robots.txt of {origin} failed: {e}")
+        parser.parse(lines)
+        self.robots[origin] = parser
+        return parser
+
+    def allowed(self, url: str) -> bool:
+        """Whether robots.txt allows `url`, True for origins whose robots.txt was not loaded."""
+        if not self.respect_robots:
+            return True
+        parser = self.robots.get(_origin(url))
+        return parser is None or parser.can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url: str) -> float | None:
+        parser = self.robots.get(_origin(url))
+        if not self.respect_robots or parser is None:
+            return None
+        delay = parser.crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+    async def entries(
+        self, url: str, on_unchanged: Callable[[str], None] | None = None
+    ) -> AsyncIterator[SitemapEntry]:
+        """Page URLs from the sitemaps of `url`'s site, nested sitemaps included.
+
+        URLs skipped as unchanged since `since` are passed to `on_unchanged`.
+        """
+        robots = await self.load_robots(url)
+        self.skipped_unchanged = 0
+        queue = deque(self.sitemap_urls or robots.site_maps() or [f"{_origin(url)}/sitemap.xml"])
+        seen = set(queue)
+        fetched = 0
+        while queue and fetched < self.max_sitemaps:
+            sitemap_url = queue.popleft()
+            fetched += 1
+            async for kind, loc, lastmod in self._parse(sitemap_url):
+                if kind == "sitemap":
+                    if loc not in seen:
+                        seen.add(loc)
+                        queue.append(loc)
+                    continue
+                entry = SitemapEntry(loc, parse_lastmod(lastmod))
+                if self.since is not None and entry.lastmod is not None and entry.lastmod < self.since:
+                    self.skipped_unchanged += 1
+                    if on_unchanged is not None:
+                        on_unchanged(loc)
+                    continue
+                yield entry
+        if queue:
+            logger.warning(f"Stopped after {self.max_sitemaps} sitemaps, {len(queue)} left")
+
+    async def _parse(self, sitemap_url: str) -> AsyncIterator[Tuple[str, str, str | None]]:
+        """Stream (kind, loc, lastmod) of the <url> and <sitemap> entries of a sitemap."""
+        parser = XMLPullParser(events=("start", "end"))
+        decompressor = None
+        root: List[Element] = []
+        try:
+            async with self.client.stream("GET", sitemap_url) as response:
+                if response.status_code != 200:
+                    logger.warning(f"Fetching sitemap {sitemap_url} failed with status {response.status_code}")
+                    return
+                first = True
+                async for chunk in response.aiter_bytes():
+                    if first:
+                        # .xml.gz files are served as is, not with Content-Encoding
+                        if chunk.startswith(_GZIP_MAGIC):
+                            decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+                        first = False
+                    parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+                    for item in self._read_events(parser, root):
+                        yield item
+            parser.close()
+            for item in self._read_events(parser, root):
+                yield item
+        except (httpx.HTTPError, ParseError, zlib.error) as e:
+            logger.warning(f"Reading sitemap {sitemap_url} failed: {e}")
+
+    @staticmethod
+    def _read_events(parser: XMLPullParser, root: List[Element]) -> Iterator[Tuple[str, str, str | None]]:
+        for event, element in parser.read_events():
+            if event == "start":
+                if not root:
+                    root.append(element)
+                continue
+            kind = _local_name(element.tag)
+            if kind not in ("url", "sitemap"):
+                continue
+            loc = lastmod = None
+            for child in element:
+                name = _local_name(child.tag)
+                if name == "loc":
+                    loc = (child.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = child.text
+            if loc:
+                yield kind, loc, lastmod
+            # drop handled entries, the document is never held in memory as a whole
+            root[0].clear()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
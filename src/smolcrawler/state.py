@@ -0,0 +1,120 @@
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import List, Protocol, Tuple, runtime_checkable
+
+from loguru import logger
+
+
+@dataclass
+class CrawlState:
+    visited: List[Tuple[str, str]] = field(default_factory=list)  # (url, normalized url)
+    fingerprints: List[str] = field(default_factory=list)  # content fingerprints of visited pages
+    frontier: List[Tuple[str, int]] = field(default_factory=list)  # (url, depth) queued but not handled yet
+    done: List[str] = field(default_factory=list)  # URLs handled, whether visited or skipped
+
+
+@runtime_checkable
+class StateStore(Protocol):
+    def load(self) -> CrawlState:
+        """Load the state saved by previous runs."""
+        ...
+
+    def add_queued(self, url: str, depth: int) -> None:
+        """Record a URL pushed to the frontier."""
+        ...
+
+    def add_done(self, url: str, normalized_url: str | None = None, fingerprint: str | None = None) -> None:
+        """Record a handled URL, with its normalized form and content fingerprint if it was visited."""
+        ...
+
+    def flush(self) -> None:
+        """Write buffered records."""
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class SQLiteStateStore(StateStore):
+    """Crawl state in a SQLite database in WAL mode.
+
+    Records are buffered and written in one transaction every `batch_size`
+    records or `flush_interval` seconds, so the cost per page stays small.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queued: List[Tuple[str, int]] = []
+        self._done: List[Tuple[str, str | None, str | None]] = []
+        self._last_flush = time.monotonic()
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                depth INTEGER,
+                done INTEGER NOT NULL DEFAULT 0,
+                normalized_url TEXT,
+                fingerprint TEXT
+            );
+            """
+        )
+
+    def load(self) -> CrawlState:
+        self.flush()
+        state = CrawlState()
+        for url, depth, done, normalized_url, fingerprint in self.conn.execute(
+            "SELECT url, depth, done, normalized_url, fingerprint FROM pages ORDER BY rowid"
+        ):
+            if not done:
+                state.frontier.append((url, depth))
+                continue
+            state.done.append(url)
+            if normalized_url is not None:
+                state.visited.append((url, normalized_url))
+            if fingerprint is not None:
+                state.fingerprints.append(fingerprint)
+        logger.info(
+            f"Loaded crawl state from {self.path}: {len(state.visited)} visited, {len(state.frontier)} queued"
+        )
+        return state
+
+    def add_queued(self, url: str, depth: int) -> None:
+        self._queued.append((url, depth))
+        self._maybe_flush()
+
+    def add_done(self, url: str, normalized_url: str | None = None, fingerprint: str | None = None) -> None:
+        self._done.append((url, normalized_url, fingerprint))
+        self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if (
+            len(self._queued) + len(self._done) >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._queued and not self._done:
+            return
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO pages (url, depth) VALUES (?, ?)", self._queued)
+            self.conn.executemany(
+                "INSERT INTO pages (url, done, normalized_url, fingerprint) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET done = 1, "
+                "normalized_url = excluded.normalized_url, fingerprint = excluded.fingerprint",
+                self._done,
+            )
+        self._queued.clear()
+        self._done.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
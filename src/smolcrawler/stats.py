@@ -0,0 +1,169 @@
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+# upper bounds in seconds, like Prometheus' default buckets stretched to slow page loads
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# fetch: the visitor's visit, which converts the page to markdown too
+# extract: link extraction and filtering, plus content hashing when offloaded
+# dedup: duplicate content check and indexing
+PHASES = ("fetch", "extract", "dedup")
+
+
+class Histogram:
+    """Counts of observations per bucket, constant memory however many are made."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile, None without observations."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+
+class CrawlStats:
+    """Running statistics of a crawl, `Crawler.stats`.
+
+    Everything is a counter or a histogram, so memory does not grow with the
+    number of pages, except `pages`: the (url, content size) of every yielded
+    page, only kept with `keep_pages`.
+    """
+
+    def __init__(self, keep_pages: bool = False):
+        self.started = time.monotonic()
+        self.queued = 0  # URLs dispatched to the visitor
+        self.fetched = 0  # pages yielded
+        self.failed = 0  # visits that returned no page, after their retries
+        self.retried = 0  # failed visits queued to be retried, see `smolcrawler.retry.RetryQueue`
+        self.short_circuited = 0  # visits held back until their host's circuit reopens, see `smolcrawler.retry.CircuitBreaker`
+        self.empty = 0  # pages without content
+        self.duplicates = 0  # pages with already seen content
+        self.gated = 0  # URLs skipped by the content gate, not HTML or too large by their headers
+        self.gated_bytes = 0  # their Content-Length, when known: bytes not downloaded
+        self.html_bytes = 0
+        self.downloaded_bytes = 0  # UTF-8 html of every page the visitor returned, duplicates and errors included
+        self.content_bytes = 0
+        self.links_found = 0  # valid links found on fetched pages
+        self.links_queued = 0  # of which new, and pushed to the frontier
+        self.trapped = 0  # of which dropped as crawler traps, see `smolcrawler.url_utils.TrapDetector`
+        self.queue_size = 0
+        self.pages_by_depth: Dict[int, int] = {}
+        self.phases: Dict[str, Histogram] = {phase: Histogram() for phase in PHASES}
+        self.pages: List[Tuple[str, int]] | None = [] if keep_pages else None
+        # what ended the crawl early: "limit", "fetches", "bytes", "deadline", or "closed" by the consumer
+        self.stopped_by: str | None = None
+
+    @property
+    def skipped(self) -> int:
+        return self.failed + self.empty + self.duplicates + self.gated
+
+    def observe(self, phase: str, seconds: float) -> None:
+        self.phases[phase].observe(seconds)
+
+    def add_page(self, url: str, depth: int, html: str | None, content: str) -> None:
+        self.fetched += 1
+        self.html_bytes += len(html or "")
+        self.content_bytes += len(content)
+        self.pages_by_depth[depth] = self.pages_by_depth.get(depth, 0) + 1
+        if self.pages is not None:
+            self.pages.append((url, len(content)))
+
+    def snapshot(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            "elapsed": elapsed,
+            "queued": self.queued,
+            "fetched": self.fetched,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "retried": self.retried,
+            "short_circuited": self.short_circuited,
+            "empty": self.empty,
+            "duplicates": self.duplicates,
+            "gated": self.gated,
+            "gated_bytes": self.gated_bytes,
+            "html_bytes": self.html_bytes,
+            "content_bytes": self.content_bytes,
+            "downloaded_bytes": self.downloaded_bytes,
+            "links_found": self.links_found,
+            "links_queued": self.links_queued,
+            "trapped": self.trapped,
+            "queue_size": self.queue_size,
+            "pages_per_second": self.fetched / elapsed if elapsed > 0 else 0.0,
+            "pages_by_depth": dict(self.pages_by_depth),
+            "phases": {phase: histogram.snapshot() for phase, histogram in self.phases.items()},
+            "stopped_by": self.stopped_by,
+        }
+
+    def summary(self) -> str:
+        return (
+            f"Total pages: {self.queued}, Fetched: {self.fetched}, Skipped: {self.skipped} "
+            f"(failed {self.failed}, empty {self.empty}, duplicate {self.duplicates}, gated {self.gated}), "
+            f"Retried: {self.retried}, "
+            f"Total content size: {self.content_bytes:,} bytes, "
+            f"Elapsed: {time.monotonic() - self.started:.1f}s"
+            + (f", stopped by {self.stopped_by}" if self.stopped_by else "")
+        )
+
+    def to_prometheus(self, namespace: str = "smolcrawler") -> str:
+        """The statistics in the Prometheus text exposition format."""
+        lines = [
+            f"# TYPE {namespace}_pages_total counter",
+            f'{namespace}_pages_total{{status="queued"}} {self.queued}',
+            f'{namespace}_pages_total{{status="fetched"}} {self.fetched}',
+            f'{namespace}_pages_total{{status="failed"}} {self.failed}',
+            f'{namespace}_pages_total{{status="empty"}} {self.empty}',
+            f'{namespace}_pages_total{{status="duplicate"}} {self.duplicates}',
+            f'{namespace}_pages_total{{status="gated"}} {self.gated}',
+            f'{namespace}_pages_total{{status="retried"}} {self.retried}',
+            f'{namespace}_pages_total{{status="short_circuited"}} {self.short_circuited}',
+            f"# TYPE {namespace}_bytes_total counter",
+            f'{namespace}_bytes_total{{kind="html"}} {self.html_bytes}',
+            f'{namespace}_bytes_total{{kind="content"}} {self.content_bytes}',
+            f'{namespace}_bytes_total{{kind="downloaded"}} {self.downloaded_bytes}',
+            f'{namespace}_bytes_total{{kind="gated"}} {self.gated_bytes}',
+            f"# TYPE {namespace}_links_total counter",
+            f'{namespace}_links_total{{status="found"}} {self.links_found}',
+            f'{namespace}_links_total{{status="queued"}} {self.links_queued}',
+            f'{namespace}_links_total{{status="trapped"}} {self.trapped}',
+            f"# TYPE {namespace}_queue_size gauge",
+            f"{namespace}_queue_size {self.queue_size}",
+            f"# TYPE {namespace}_pages_by_depth counter",
+        ]
+        for depth, count in sorted(self.pages_by_depth.items()):
+            lines.append(f'{namespace}_pages_by_depth{{depth="{depth}"}} {count}')
+        lines.append(f"# TYPE {namespace}_phase_seconds histogram")
+        for phase, histogram in self.phases.items():
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{namespace}_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {cumulative}')
+            lines.append(f'{namespace}_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{namespace}_phase_seconds_sum{{phase="{phase}"}} {histogram.sum}')
+            lines.append(f'{namespace}_phase_seconds_count{{phase="{phase}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
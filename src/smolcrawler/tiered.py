@@ -0,0 +1,156 @@
+import re
+from collections import Counter
+from typing import Dict, List, Set
+from urllib.parse import urlsplit
+
+from localwebpy import BrowserVisitor, HttpVisitor, Visitor, Webpage
+from loguru import logger
+
+HTTP = "http"
+BROWSER = "browser"
+
+# markers of anti-bot interstitials, matched against the raw HTML
+_CHALLENGE = re.compile(
+    r"cf-browser-verification|challenge-platform|cf_chl_|<title>\s*just a moment|checking your browser"
+    r"|ddos protection by|g-recaptcha|h-captcha|captcha-delivery|px-captcha",
+    re.IGNORECASE,
+)
+# mount points of client-rendered apps and "please enable JavaScript" notices
+_JS_SHELL = re.compile(
+    r"""<div[^>]+id=["'](?:root|app|__next|__nuxt|svelte)["'][^>]*>\s*</div>"""
+    r"|<noscript>[^<]*(?:enable|requires?)\s+javascript",
+    re.IGNORECASE,
+)
+
+
+def escalation_reason(webpage: Webpage | None, min_content: int = 200) -> str | None:
+    """Why a page fetched over plain HTTP needs a browser, None if it does not.
+
+    "failed" when nothing came back, "challenge" for anti-bot interstitials,
+    "empty" when no content was extracted, and "js" for client-rendered shells
+    whose content is shorter than `min_content` characters.
+    """
+    if webpage is None:
+        return "failed"
+    html = webpage.html or ""
+    content = (webpage.content or "").strip()
+    if _CHALLENGE.search(html):
+        return "challenge"
+    if not content:
+        return "empty"
+    if len(content) < min_content and _JS_SHELL.search(html):
+        return "js"
+    return None
+
+
+def prefix_key(url: str) -> str:
+    """The host and first path segment of a URL, e.g. `example.com/docs`."""
+    parts = urlsplit(url)
+    segment = parts.path.lstrip("/").split("/", 1)[0]
+    return f"{parts.netloc}/{segment}"
+
+
+class TieredVisitor:
+    """Fetches over plain HTTP first and falls back to a browser only for pages that need one.
+
+    A page is escalated to `browser` when `escalation_reason` flags the HTTP
+    result. Once the browser succeeds where HTTP did not, the page's path
+    prefix (host + first path segment) goes straight to the browser from then
+    on, and so does the whole host after `host_after` of its prefixes did.
+    `counts` tells how many pages each tier served and why pages escalated.
+    """
+
+    def __init__(
+        self,
+        http: Visitor | None = None,  # defaults to localwebpy's HttpVisitor
+        browser: Visitor | None = None,  # defaults to localwebpy's BrowserVisitor, created on first use
+        concurrency: int = 3,
+        timeout: int = 60,  # seconds per page, for both tiers
+        min_content: int = 200,  # shorter content with a JS app shell is escalated
+        host_after: int = 3,  # send a whole host to the browser after this many of its prefixes needed it
+    ):
+        self.http = http or HttpVisitor(concurrency=concurrency, timeout=timeout)
+        self._browser = browser
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.min_content = min_content
+        self.host_after = host_after
+        self.browser_prefixes: Set[str] = set()
+        self.browser_hosts: Set[str] = set()
+        self.counts: Counter = Counter()  # http, browser, escalated, remembered, escalated_<reason>
+
+    @property
+    def browser(self) -> Visitor:
+        # launching a browser is expensive, crawls that never need one never start it
+        if self._browser is None:
+            self._browser = BrowserVisitor(concurrency=self.concurrency, timeout=self.timeout)
+        return self._browser
+
+    def tier(self, url: str) -> str:
+        """The tier `url` starts with, from what earlier pages of its host and prefix needed."""
+        if urlsplit(url).netloc in self.browser_hosts or prefix_key(url) in self.browser_prefixes:
+            return BROWSER
+        return HTTP
+
+    def _remember(self, url: str) -> None:
+        key = prefix_key(url)
+        if key in self.browser_prefixes:
+            return
+        self.browser_prefixes.add(key)
+        host = urlsplit(url).netloc
+        logger.debug("Using the browser for {} from now on", key)
+        if sum(1 for prefix in self.browser_prefixes if prefix.split("/", 1)[0] == host) >= self.host_after:
+            self.browser_hosts.add(host)
+            logger.info(f"Using the browser for every page of {host}")
+
+    async def _visit(self, visitor: Visitor, urls: List[str]) -> List[Webpage | None]:
+        try:
+            webpages = await visitor.visit_many(urls)
+        except Exception as e:
+            logger.debug(f"Visiting {len(urls)} URLs failed: {e}")
+            return [None] * len(urls)
+        return list(webpages) + [None] * (len(urls) - len(webpages))
+
+    async def visit_many(self, url_or_webpages: List[str | Webpage]) -> List[Webpage | None]:
+        urls = [item if isinstance(item, str) else item.url for item in url_or_webpages]
+        results: Dict[int, Webpage | None] = {}
+        tiers = [self.tier(url) for url in urls]
+        direct = [i for i, tier in enumerate(tiers) if tier == BROWSER]
+        first = [i for i, tier in enumerate(tiers) if tier == HTTP]
+
+        escalate: List[int] = []
+        if first:
+            for i, webpage in zip(first, await self._visit(self.http, [urls[i] for i in first])):
+                reason = escalation_reason(webpage, self.min_content)
+                if reason is None:
+                    self.counts[HTTP] += 1
+                    results[i] = webpage
+                else:
+                    self.counts[f"escalated_{reason}"] += 1
+                    results[i] = webpage  # kept if the browser does no better
+                    escalate.append(i)
+
+        todo = direct + escalate
+        if todo:
+            remembered = set(direct)
+            for i, webpage in zip(todo, await self._visit(self.browser, [urls[i] for i in todo])):
+                if i in remembered:
+                    results[i] = webpage
+                    if webpage is not None:
+                        self.counts[BROWSER] += 1
+                        self.counts["remembered"] += 1
+                    continue
+                if escalation_reason(webpage, self.min_content) is not None:
+                    # the browser did no better, a dead or genuinely empty page: nothing to learn
+                    if results[i] is None:
+                        results[i] = webpage
+                    continue
+                self.counts[BROWSER] += 1
+                self.counts["escalated"] += 1
+                self._remember(urls[i])
+                results[i] = webpage
+
+        return [results[i] for i in range(len(urls))]
+
+    def stats(self) -> dict:
+        return dict(self.counts)
@@ -0,0 +1,113 @@
+import re
+from fnmatch import translate
+from functools import lru_cache
+from typing import Iterable
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+
+# extensions of pages worth crawling, anything else alphabetic (css, js, jpg, ...) is skipped
+HTML_EXTENSIONS = frozenset({"", "html", "htm", "php", "asp", "aspx", "jsp", "md", "markdown", "txt"})
+
+
+def _compile_globs(globs: Iterable[str] | None) -> re.Pattern | None:
+    globs = list(globs or [])
+    if not globs:
+        return None
+    return re.compile("|".join(f"(?:{translate(glob)})" for glob in globs))
+
+
+def _split_path(url: str) -> str:
+    """The path of an absolute URL, without parsing the whole URL."""
+    # cut the query and fragment first, they may hold a "/" of their own
+    end = len(url)
+    for sep in "?#":
+        i = url.find(sep)
+        if i != -1 and i < end:
+            end = i
+    start = url.find("/", url.find("://") + 3, end)
+    if start == -1:
+        return ""
+    return url[start:end]
+
+
+class UrlFilter:
+    """Decides which discovered URLs are crawled, built once per `Crawler`.
+
+    Rules are compiled up front and verdicts are kept in an LRU cache, since the same links show up on many pages of a site. `include`
+    and `exclude` are glob patterns matched against the URL path, e.g.
+    "/docs/*"; `max_path_depth` limits the number of path segments.
+    """
+
+    def __init__(
+        self,
+        filter_regex: re.Pattern | str | None = None,
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] | None = None,
+        max_path_depth: int | None = None,
+        cache_size: int = 1 << 16,
+    ):
+        self.filter_regex = re.compile(filter_regex) if isinstance(filter_regex, str) else filter_regex
+        self.include = _compile_globs(include)
+        self.exclude = _compile_globs(exclude)
+        self.max_path_depth = max_path_depth
+        self.cache_size = cache_size
+        self._init_caches()
+
+    def _init_caches(self) -> None:
+        self.is_valid = lru_cache(maxsize=self.cache_size)(self._is_valid)
+
+    def __getstate__(self) -> dict:
+        # the cache can't be pickled, e.g. to send the filter to a worker process
+        state = self.__dict__.copy()
+        del state["is_valid"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._init_caches()
+
+    def accepts(self, url: str, url_prefix: str | None = None) -> bool:
+        """Check the prefix, then the cached verdict of the other rules."""
+        if url_prefix and not url.startswith(url_prefix):
+            return False
+        return self.is_valid(url)
+
+    def _is_valid(self, url: str) -> bool:
+        if not url[:8].lower().startswith(("http://", "https://")):
+            logger.debug("Skipping URL with invalid scheme: {}", url)
+            return False
+        try:
+            urlsplit(url)
+        except ValueError:
+            logger.debug("Skipping unparseable URL: {}", url)
+            return False
+
+        path = _split_path(url)
+        dot = path.rfind(".")
+        if dot != -1 and path.rfind("/") < dot:
+            ext = path[dot + 1 :].lower()
+            # not all a-z -> seem not a valid extension
+            if ext.isalpha() and ext not in HTML_EXTENSIONS:
+                logger.debug("Skipping URL with invalid extension: {}, extension: {}", url, ext)
+                return False
+
+        if self.max_path_depth is not None and len([s for s in path.split("/") if s]) > self.max_path_depth:
+            logger.debug("Skipping URL deeper than {} path segments: {}", self.max_path_depth, url)
+            return False
+        if self.include is not None and not self.include.match(path or "/"):
+            logger.debug("Skipping URL not matching include globs: {}", url)
+            return False
+        if self.exclude is not None and self.exclude.match(path or "/"):
+            logger.debug("Skipping URL matching exclude globs: {}", url)
+            return False
+
+        if self.filter_regex and not self.filter_regex.search(url):
+            logger.debug("Skipping URL with regex not matching: {}, regex: {}", url, self.filter_regex)
+            return False
+
+        return True
+
+    def cache_info(self) -> dict:
+        return {"is_valid": self.is_valid.cache_info()}
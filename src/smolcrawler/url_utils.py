@@ -1,5 +1,10 @@
-from typing import Set
-from urllib.parse import urlparse, urlunparse
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlsplit, urlunparse, urlunsplit
+
+from loguru import logger
 
 
 def normalize_url(url: str) -> str:
@@ -38,3 +43,172 @@ def get_url_variations(url: str) -> Set[str]:
 def is_similar_url(url1: str, url2: str) -> bool:
     """Check if two URLs point to the same page by comparing their normalized forms."""
     return normalize_url(url1) == normalize_url(url2)
+
+
+# query parameters that never change what a page shows: campaign tracking and session ids
+TRACKING_PARAMS = frozenset(
+    {
+        "gclid", "dclid", "fbclid", "msclkid", "yclid", "twclid", "igshid", "mc_cid", "mc_eid",
+        "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ref_src",
+        "sessionid", "session_id", "sid", "phpsessid", "jsessionid", "aspsessionid", "cfid", "cftoken",
+    }
+)  # fmt: skip
+_SESSION_PATH = re.compile(r";(?:jsessionid|phpsessid|sid)=[^/?#]*", re.IGNORECASE)
+
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith("utm_")
+
+
+class UrlCanonicalizer:
+    """Canonical form of URLs for dedup: like `normalize_url`, but keeping the query parameters that matter.
+
+    Scheme and host are lowercased, fragments, trailing slashes, tracking
+    and session parameters (`TRACKING_PARAMS`, `utm_*`, `;jsessionid=` path
+    parameters) are dropped, and the other parameters are sorted, so
+    `?page=2` and `?id=7` stay distinct pages.
+
+    `observe` learns, per host, which other parameters do not change the
+    content: once `learn_after` pairs of URLs differing only by a
+    parameter's value had the same content fingerprint, and none had a
+    different one, the parameter is dropped too. A single pair with
+    different content keeps it for good, so no page is lost. The crawler
+    then re-keys the URLs it has seen, when they are kept in plain sets;
+    compact stores (`FingerprintSet`, Bloom filters) and sharded backends
+    keep the old keys, so a URL may be fetched once more in its new form.
+    """
+
+    def __init__(self, learn_after: int = 3, max_samples: int = 256, cache_size: int = 1 << 16):
+        self.learn_after = learn_after
+        self.max_samples = max_samples  # remembered (value, fingerprint) per host and parameter
+        self.cache_size = cache_size
+        self.start()
+
+    def start(self) -> None:
+        """Forget the parameters learned in a previous crawl."""
+        self.ignored: Dict[str, Set[str]] = {}  # host -> learned parameters to drop
+        self._significant: Set[Tuple[str, str]] = set()  # (host, parameter) seen changing the content
+        self._samples: Dict[Tuple[str, str], Dict[str, Tuple[str, str]]] = {}  # -> {rest of url: (value, fingerprint)}
+        self._votes: Dict[Tuple[str, str], int] = {}  # (host, parameter) -> pairs with the same content
+        self._init_cache()
+
+    def _init_cache(self) -> None:
+        self.canonicalize = lru_cache(maxsize=self.cache_size)(self._canonicalize)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["canonicalize"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._init_cache()
+
+    def _params(self, host: str, query: str) -> List[Tuple[str, str]]:
+        ignored = self.ignored.get(host, ())
+        return [
+            (name, value)
+            for name, value in parse_qsl(query, keep_blank_values=True)
+            if not is_tracking_param(name) and name not in ignored
+        ]
+
+    def _canonicalize(self, url: str) -> str:
+        parts = urlsplit(url)
+        host = parts.netloc.lower()
+        path = _SESSION_PATH.sub("", parts.path).rstrip("/")
+        query = urlencode(sorted(self._params(host, parts.query))) if parts.query else ""
+        return urlunsplit((parts.scheme.lower(), host, path, query, ""))
+
+    def observe(self, url: str, fingerprint: str) -> bool:
+        """Learn from the content fingerprint of a fetched page which of its query parameters matter.
+
+        Returns whether a parameter was learned, changing the canonical form of URLs seen before.
+        """
+        parts = urlsplit(url)
+        if not parts.query:
+            return False
+        host = parts.netloc.lower()
+        params = self._params(host, parts.query)
+        for i, (name, value) in enumerate(params):
+            key = (host, name)
+            if key in self._significant:
+                continue
+            rest = parts.path.rstrip("/") + "?" + urlencode(sorted(params[:i] + params[i + 1 :]))
+            samples = self._samples.setdefault(key, {})
+            sample = samples.get(rest)
+            if sample is None:
+                if len(samples) < self.max_samples:
+                    samples[rest] = (value, fingerprint)
+                continue
+            if sample[0] == value:
+                continue
+            if sample[1] != fingerprint:
+                self._significant.add(key)
+                del self._samples[key]
+                continue
+            self._votes[key] = self._votes.get(key, 0) + 1
+            if self._votes[key] >= self.learn_after:
+                logger.info(f"Ignoring query parameter {name!r} on {host}, it does not change the content")
+                self.ignored.setdefault(host, set()).add(name)
+                del self._samples[key]
+                # canonical forms computed so far may have kept it
+                self.canonicalize.cache_clear()
+                return True
+        return False
+
+
+_NUMBER = re.compile(r"[0-9]+")
+# long hex strings and long mixes of letters and digits: session ids, hashes, tokens
+_ID_SEGMENT = re.compile(r"[0-9a-fA-F]{16,}|(?=[A-Za-z_-]*[0-9])(?=[0-9_-]*[A-Za-z])[A-Za-z0-9_-]{20,}")
+
+
+class TrapDetector:
+    """Spots crawler traps among discovered links: endless calendars, session ids in paths, looping paths.
+
+    A link is a trap when one of its path segments occurs more than
+    `max_repeats` times (e.g. /a/b/a/b/a/b/a), or, with `max_per_pattern`,
+    once that many links of its pattern were admitted. The pattern is the
+    host and path with numbers and id-like segments wildcarded, plus the
+    names of the query parameters, so /calendar/2024/05/12?view=day counts
+    with every other day. The fan-out limit is off by default: large sites
+    have as many legitimate /item/123 pages. `counts` tells how many links
+    each rule stopped.
+    """
+
+    def __init__(self, max_repeats: int = 3, max_per_pattern: int | None = None):
+        self.max_repeats = max_repeats
+        self.max_per_pattern = max_per_pattern
+        self.start()
+
+    def start(self) -> None:
+        """Forget the links counted in a previous crawl."""
+        self.patterns: Dict[str, int] = {}  # pattern -> links admitted
+        self.counts: Dict[str, int] = {"repeated": 0, "fanout": 0}
+        self._reported: Set[str] = set()
+
+    @staticmethod
+    def pattern(url: str) -> str:
+        parts = urlsplit(url)
+        segments = ["*" if _ID_SEGMENT.fullmatch(s) else _NUMBER.sub("#", s) for s in parts.path.split("/") if s]
+        names = sorted({name for name, _ in parse_qsl(parts.query, keep_blank_values=True)})
+        return f"{parts.netloc.lower()}/{'/'.join(segments)}?{'&'.join(names)}"
+
+    def admit(self, url: str) -> bool:
+        """Whether to follow a newly discovered link, counting it against its pattern."""
+        segments = [s for s in urlsplit(url).path.split("/") if s]
+        if len(segments) > self.max_repeats and max(Counter(segments).values()) > self.max_repeats:
+            self.counts["repeated"] += 1
+            return False
+        if self.max_per_pattern is None:
+            return True
+        pattern = self.pattern(url)
+        admitted = self.patterns.get(pattern, 0)
+        if admitted >= self.max_per_pattern:
+            self.counts["fanout"] += 1
+            if pattern not in self._reported:
+                self._reported.add(pattern)
+                logger.info(f"Not following more links like {pattern}, {admitted} already followed")
+            return False
+        self.patterns[pattern] = admitted + 1
+        return True
@@ -1,53 +1,151 @@
 import re
-from typing import Set
-from urllib.parse import urlparse
+from html import unescape
+from itertools import chain
+from typing import Dict, List, Set, Tuple
+from urllib.parse import urljoin, urlparse
 
 from loguru import logger
 
-
-def extract_urls(html: str, base_url: str) -> Set[str]:
+from .url_filter import UrlFilter
+
+
+# Links come from <a>/<area href>, in one pass that also skips comments whole; the regex
+# engine gives up on every other tag at its first letter. Attributes are matched as whole
+# name=value tokens, so an "href=" inside another attribute's value is not taken. <base href>
+# and <link rel=next|prev href> are read from the head, before <body>.
+_ATTR_VALUE = r"""(?:"([^"]*)"|'([^']*)'|([^\s>]+))"""
+_OTHER_ATTRS = r"""(?:\s+(?!(?i:href)\s*=)[^\s=>]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s>"']+))?)*"""
+_TAG_PATTERN = re.compile(
+    rf"<[!aA](?:(?<=[aA])(?i:rea)?{_OTHER_ATTRS}\s+(?i:href)\s*=\s*{_ATTR_VALUE}|--.*?-->)", re.DOTALL
+)
+_HEAD_PATTERN = re.compile(r"<(?:(?i:(base|link))(\s[^>]*)>|(?i:body)[\s>]|!--.*?-->)", re.DOTALL)
+_ATTR_PATTERN = re.compile(rf"([^\s=>]+)(?:\s*=\s*{_ATTR_VALUE})?")
+_SKIPPED_SCHEMES = ("#", "javascript:", "mailto:", "tel:", "data:")
+_FOLLOWED_RELS = frozenset({"next", "prev", "previous"})
+_MARKUP = re.compile(r"<[^>]*>")
+_ANCHOR_END = re.compile(r"</a\s*>", re.IGNORECASE)
+_ANCHOR_TEXT_WINDOW = 500  # how far past <a ...> to look for its text
+
+
+def _attributes(attrs: str) -> Dict[str, str]:
+    """Attributes of a tag, lowercased names to values; the first of repeated ones wins."""
+    found = {}
+    for match in _ATTR_PATTERN.finditer(attrs):
+        name, double, single, bare = match.groups()
+        found.setdefault(name.lower(), double if double is not None else single if single is not None else bare or "")
+    return found
+
+
+def _head_links(html: str) -> Tuple[str | None, List[str]]:
+    """The first <base href> of the head, and the hrefs of its <link rel=next|prev> tags."""
+    base = None
+    links = []
+    for match in _HEAD_PATTERN.finditer(html):
+        name, attrs = match.groups()
+        if name is None:
+            if match.group(0)[1] != "!":
+                break  # <body>
+            continue
+        found = _attributes(attrs)
+        if name.lower() == "link":
+            if found.get("href") and _FOLLOWED_RELS.intersection(found.get("rel", "").lower().split()):
+                links.append(found["href"])
+        elif base is None and found.get("href"):
+            # only the first <base href> counts
+            base = found["href"]
+    return base, links
+
+
+def _resolve(url: str, base: str, origin: str, directory: str) -> str:
+    """Resolve a relative `url`, with fast paths for the common forms and `urljoin` for everything else."""
+    if url[0] == "/":
+        # root-relative URL
+        if "//" in url or "/." in url:
+            return urljoin(base, url)
+        return origin + url
+
+    path = url
+    if path.startswith("./"):
+        path = path[2:]
+    else:
+        # drop one directory per leading ../, never above the root
+        while path.startswith("../"):
+            path = path[3:]
+            directory = directory[: directory.rfind("/", 0, len(directory) - 1) + 1] or "/"
+    if not path or path[0] in "/.?" or ":" in path or "/." in path or "//" in path:
+        # query-only, scheme-like, or with dot segments / empty segments left
+        return urljoin(base, url)
+    # relative to the base's directory
+    return origin + directory + path
+
+
+def _anchor_text(html: str, start: int) -> str:
+    """Text of the <a> element whose href ends at `start`."""
+    open_end = html.find(">", start)
+    if open_end == -1:
+        return ""
+    close = _ANCHOR_END.search(html, open_end, open_end + _ANCHOR_TEXT_WINDOW)
+    text = html[open_end + 1 : close.start() if close else open_end + 1 + _ANCHOR_TEXT_WINDOW]
+    if "<" in text:
+        text = _MARKUP.sub(" ", text)
+    return " ".join(unescape(text).split())
+
+
+def extract_urls(
+    html: str,
+    base_url: str,
+    max_urls: int | None = None,
+    anchor_texts: Dict[str, str] | None = None,
+) -> Set[str]:
+    """Extract the absolute URLs of the links in `html`.
+
+    Relative URLs are resolved per RFC 3986 against `<base href>` if present,
+    otherwise against `base_url`. Stops scanning once `max_urls` URLs were found.
+    If `anchor_texts` is given, it is filled with the text of the first <a>
+    with text linking to each URL ("" for <area> and <link>).
+    """
     urls = set()
-    url_pattern = re.compile(r'<a[^>]+href=["\'](.*?)["\']', re.IGNORECASE)
+    if not html:
+        return urls
 
-    # Parse base URL
-    base_parsed = urlparse(base_url)
-    base_path = base_parsed.path.rstrip("/")
+    base, links = _head_links(html)
+    base = urljoin(base_url, unescape(base.strip())) if base else base_url
+    origin = directory = None
 
-    for match in url_pattern.finditer(html):
-        url = match.group(1)
+    # <link rel=next|prev> of the head first, then the <a>/<area> links in document order
+    for match in chain(links, _TAG_PATTERN.finditer(html)):
+        if isinstance(match, str):
+            url, match = match, None
+        else:
+            double, single, bare = match.groups()
+            url = double if double is not None else single if single is not None else bare
+        if not url:
+            continue
+        url = url.strip()
+        if "&" in url:
+            url = unescape(url)
 
         # Skip invalid URLs
-        if not url or url.startswith(("#", "javascript:", "mailto:", "tel:")):
+        if not url or url.startswith(_SKIPPED_SCHEMES):
             continue
 
-        # Handle absolute URLs
         if url.startswith(("http://", "https://")):
-            urls.add(url)
-            continue
-
-        # Handle different URL types
-        if url.startswith("/"):
-            # Root-relative URL
-            absolute_url = f"{base_parsed.scheme}://{base_parsed.netloc}{url}"
-        elif url.startswith("../"):
-            # Parent directory
-            parent_count = url.count("../")
-            url = url[3 * parent_count :]  # Remove ../ prefixes
-            path_parts = base_path.split("/")
-            if len(path_parts) > parent_count:
-                parent_path = "/".join(path_parts[:-parent_count])
-            else:
-                parent_path = ""
-            absolute_url = f"{base_parsed.scheme}://{base_parsed.netloc}/{parent_path}/{url}"
+            # Absolute URL
+            pass
         else:
-            # Current directory or relative path
-            if url.startswith("./"):
-                url = url[2:]  # Remove ./ prefix
-            absolute_url = f"{base_parsed.scheme}://{base_parsed.netloc}/{base_path}/{url}"
-
-        # Clean up any double slashes in the path while preserving the scheme
-        absolute_url = re.sub(r"(?<!:)//+", "/", absolute_url)
-        urls.add(absolute_url)
+            if origin is None:
+                parsed = urlparse(base)
+                origin = f"{parsed.scheme}://{parsed.netloc}"
+                directory = parsed.path[: parsed.path.rfind("/") + 1] or "/"
+            url = _resolve(url, base, origin, directory)
+        urls.add(url)
+        if anchor_texts is not None and not anchor_texts.get(url):
+            # <area> and <link> have no text
+            is_a = match is not None and match.group(0)[2] in " \t\r\n"
+            anchor_texts[url] = _anchor_text(html, match.end()) if is_a else ""
+
+        if max_urls is not None and len(urls) >= max_urls:
+            break
 
     return urls
 
@@ -57,37 +155,9 @@ def is_valid_url(
     url_prefix: str | None = None,
     filter_regex: re.Pattern | None = None,
 ) -> bool:
+    """Check a single URL, see `UrlFilter` for checking many URLs with the same rules."""
     try:
-        parsed = urlparse(url)
-
-        # Basic URL validation
-        if parsed.scheme not in ("http", "https"):
-            logger.debug(f"Skipping URL with invalid scheme: {url}")
-            return False
-
-        # Check prefix if specified
-        if url_prefix and not url.startswith(url_prefix):
-            # logger.debug(f"Skipping URL with prefix not matching: {url}, prefix: {url_prefix}")
-            return False
-
-        # Get the path without query parameters
-        path = parsed.path.split("?")[0]
-
-        # Allow URLs with no extension or HTML-like extensions
-        if path and "." in path:
-            ext = path.split(".")[-1].lower()
-            # not all a-z -> seem not a valid extension
-            # only skip if is an valid ext and not in whitelist
-            if ext.isalpha() and (ext not in ["", "html", "htm", "php", "asp", "aspx", "jsp", "md", "markdown", "txt"]):
-                logger.debug(f"Skipping URL with invalid extension: {url}, extension: {ext}")
-                return False
-
-        # Check regex if specified
-        if filter_regex and not filter_regex.search(url):
-            logger.debug(f"Skipping URL with regex not matching: {url}, regex: {filter_regex}")
-            return False
-
-        return True
+        return UrlFilter(filter_regex, cache_size=0).accepts(url, url_prefix)
     except Exception as e:
         logger.error(f"Error validating URL {url}: {e}")
         return False
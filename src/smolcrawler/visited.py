@@ -0,0 +1,186 @@
+import math
+import sys
+from array import array
+from typing import List, Protocol, runtime_checkable
+
+_MASK64 = (1 << 64) - 1
+
+
+def url_fingerprint(url: str) -> int:
+    """64-bit fingerprint of a URL, never 0.
+
+    Built on the str hash, which is cached on the string object, so it is only
+    stable within a process; stores are rebuilt from URLs when a crawl resumes.
+    """
+    return (hash(url) & _MASK64) or 1
+
+
+@runtime_checkable
+class UrlSet(Protocol):
+    """The set operations `Crawler` and `Frontier` use for visited and seen URLs, `set` is one."""
+
+    def add(self, url: str) -> None: ...
+
+    def __contains__(self, url: object) -> bool: ...
+
+    def __len__(self) -> int: ...
+
+
+def memory_bytes(store: UrlSet) -> int:
+    """Approximate memory held by a URL store, including the URL strings of a plain `set`."""
+    if hasattr(store, "memory_bytes"):
+        return store.memory_bytes()
+    return sys.getsizeof(store) + sum(sys.getsizeof(url) for url in store)
+
+
+class FingerprintSet:
+    """URL set keeping only 64-bit fingerprints in an open-addressing array.
+
+    About 8 / `max_load` bytes per URL instead of a string object and a hash
+    table slot. Two different URLs collide with a probability around n / 2**64,
+    which is negligible even for billions of URLs.
+    """
+
+    def __init__(self, capacity: int = 1 << 16, max_load: float = 0.5):
+        self.max_load = max_load
+        size = 1 << max(3, math.ceil(math.log2(capacity / max_load)))
+        self._slots = array("Q", [0]) * size
+        self._mask = size - 1
+        self._count = 0
+
+    def _index(self, fingerprint: int) -> int:
+        """Slot holding `fingerprint`, or the empty slot where it would go (linear probing)."""
+        slots, mask = self._slots, self._mask
+        i = fingerprint & mask
+        while True:
+            value = slots[i]
+            if value == fingerprint or value == 0:
+                return i
+            i = (i + 1) & mask
+
+    def add(self, url: str) -> None:
+        self.add_fingerprint(url_fingerprint(url))
+
+    def add_fingerprint(self, fingerprint: int) -> None:
+        i = self._index(fingerprint)
+        if self._slots[i]:
+            return
+        self._slots[i] = fingerprint
+        self._count += 1
+        if self._count > self.max_load * len(self._slots):
+            self._grow()
+
+    def _grow(self) -> None:
+        old = self._slots
+        self._slots = array("Q", [0]) * (2 * len(old))
+        self._mask = len(self._slots) - 1
+        for fingerprint in old:
+            if fingerprint:
+                self._slots[self._index(fingerprint)] = fingerprint
+
+    def contains_fingerprint(self, fingerprint: int) -> bool:
+        return self._slots[self._index(fingerprint)] != 0
+
+    def __contains__(self, url: object) -> bool:
+        return isinstance(url, str) and self.contains_fingerprint(url_fingerprint(url))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self._slots)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over URL fingerprints, sized for `capacity` URLs at `error_rate`."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def add_fingerprint(self, fingerprint: int) -> bool:
+        """Add a fingerprint, returns False if it (probably) was already there."""
+        # double hashing (Kirsch & Mitzenmacher): the two halves of the fingerprint make all k positions
+        bits, num_bits = self._bits, self.num_bits
+        position, step = fingerprint & 0xFFFFFFFF, (fingerprint >> 32) | 1
+        added = False
+        for _ in range(self.num_hashes):
+            position %= num_bits
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                added = True
+            position += step
+        if added:
+            self.count += 1
+        return added
+
+    def contains_fingerprint(self, fingerprint: int) -> bool:
+        bits, num_bits = self._bits, self.num_bits
+        position, step = fingerprint & 0xFFFFFFFF, (fingerprint >> 32) | 1
+        for _ in range(self.num_hashes):
+            position %= num_bits
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position += step
+        return True
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self._bits)
+
+
+class ScalableBloomFilter:
+    """URL set as a scalable Bloom filter (Almeida et al., 2007), growing as URLs are added.
+
+    A full filter is followed by one `growth` times larger with an error rate
+    `tightening` times lower, so the overall false positive rate stays around
+    `error_rate` however many URLs are added. A false positive makes the crawler
+    treat an unseen URL as seen and skip it; there are no false negatives.
+    `len` counts the URLs added, less the ones mistaken for already present.
+    """
+
+    def __init__(
+        self,
+        initial_capacity: int = 1 << 16,
+        error_rate: float = 1e-4,
+        growth: int = 2,
+        tightening: float = 0.5,
+    ):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.filters: List[BloomFilter] = []
+        self._add_filter()
+
+    def _add_filter(self) -> None:
+        n = len(self.filters)
+        capacity = self.initial_capacity * self.growth**n
+        # the error rates form a geometric series summing to error_rate
+        error_rate = self.error_rate * (1 - self.tightening) * self.tightening**n
+        self.filters.append(BloomFilter(capacity, error_rate))
+
+    def add(self, url: str) -> None:
+        fingerprint = url_fingerprint(url)
+        if self._contains_fingerprint(fingerprint):
+            return
+        if self.filters[-1].count >= self.filters[-1].capacity:
+            self._add_filter()
+        self.filters[-1].add_fingerprint(fingerprint)
+
+    def _contains_fingerprint(self, fingerprint: int) -> bool:
+        # newest first: the largest filter holds most URLs
+        return any(f.contains_fingerprint(fingerprint) for f in reversed(self.filters))
+
+    def __contains__(self, url: object) -> bool:
+        return isinstance(url, str) and self._contains_fingerprint(url_fingerprint(url))
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self.filters)
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self.filters) + sum(f.memory_bytes() for f in self.filters)
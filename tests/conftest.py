@@ -0,0 +1,52 @@
+"""Fake visitors and pages shared by the tests."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+from localwebpy import Webpage
+
+
+def make_page(url: str, html: str = "", content: str | None = None) -> Webpage:
+    webpage = MagicMock(spec=Webpage)
+    webpage.url = url
+    webpage.html = html
+    webpage.content = content if content is not None else f"content of {url}"
+    return webpage
+
+
+class LatencyVisitor:
+    """Serves a small synthetic site, sleeping `latencies[url]` seconds per page."""
+
+    def __init__(self, links: dict[str, list[str]], latencies: dict[str, float] | None = None):
+        self.links = links
+        self.latencies = latencies or {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.visited: list[str] = []
+
+    async def visit_many(self, urls):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            pages = []
+            for url in urls:
+                self.visited.append(url)
+                await asyncio.sleep(self.latencies.get(url, 0.01))
+                html = "".join(f'<a href="{link}">x</a>' for link in self.links.get(url, []))
+                pages.append(make_page(url, html))
+            return pages
+        finally:
+            self.in_flight -= 1
+
+
+def star_site(n: int) -> dict[str, list[str]]:
+    root = "https://example.com/"
+    return {root: [f"https://example.com/p{i}" for i in range(n)]}
+
+
+class SameContentVisitor(LatencyVisitor):
+    async def visit_many(self, urls):
+        pages = await super().visit_many(urls)
+        for page in pages:
+            page.content = "the same page everywhere" if page.url.endswith("/p0") else page.content
+        return pages
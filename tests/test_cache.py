@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from localwebpy import Webpage
+from smolcrawler.cache import CachedPage, CachingVisitor, ResponseCache
+from smolcrawler.crawler import Crawler
+
+
+class ETagServer:
+    """Serves `/p0`..`/pN` with an ETag per page version and answers If-None-Match with 304."""
+
+    def __init__(self, pages: int):
+        self.versions = {f"/p{i}": 1 for i in range(pages)}
+        self.not_modified = 0
+        self.full = 0
+        self.methods: list[str] = []
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return "http://127.0.0.1:%d" % self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        request = (await reader.readuntil(b"\r\n\r\n")).decode()
+        method, path = request.split(" ")[:2]
+        self.methods.append(method)
+        etag = f'"{path}-v{self.versions.get(path, 1)}"'
+        if f"if-none-match: {etag}" in request.lower():
+            self.not_modified += 1
+            writer.write(f"HTTP/1.1 304 Not Modified\r\nETag: {etag}\r\nContent-Length: 0\r\n\r\n".encode())
+        else:
+            self.full += 1
+            body = f"<html>{path}</html>".encode()
+            writer.write(f"HTTP/1.1 200 OK\r\nETag: {etag}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        writer.close()
+
+
+class ConvertingVisitor:
+    """Stands in for the real visitor, counting page conversions."""
+
+    def __init__(self, server: ETagServer):
+        self.server = server
+        self.converted: list[str] = []
+
+    async def visit_many(self, urls):
+        self.converted.extend(urls)
+        pages = []
+        for url in urls:
+            path = "/" + url.rsplit("/", 1)[1]
+            links = "".join(f'<a href="{p}">{p}</a>' for p in self.server.versions) if path == "/p0" else ""
+            version = self.server.versions[path]
+            pages.append(Webpage(url=url, title=path, html=links, content=f"{path} v{version}"))
+        return pages
+
+
+@pytest_asyncio.fixture
+async def server():
+    server = ETagServer(pages=5)
+    server.base = await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_recrawl_serves_unchanged_pages_from_cache(server, tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    visitor = ConvertingVisitor(server)
+
+    async def crawl():
+        crawler = Crawler(depth=1, concurrency=2, url_prefix=server.base, visitor=visitor, response_cache=cache)
+        return {page.url: page.content async for page in crawler.run(f"{server.base}/p0")}
+
+    first = await crawl()
+    assert len(first) == 5
+    assert cache.stats()["misses"] == 5
+    # nothing to revalidate, the validators of new pages come from a HEAD
+    assert server.methods == ["HEAD"] * 5
+
+    server.versions["/p3"] = 2
+    visitor.converted.clear()
+    second = await crawl()
+
+    assert second[f"{server.base}/p3"] == "/p3 v2"
+    assert second[f"{server.base}/p1"] == first[f"{server.base}/p1"]
+    assert visitor.converted == [f"{server.base}/p3"]
+    assert cache.hits == 4
+    assert cache.stale == 1
+    assert server.not_modified == 4
+    # one conditional GET per cached page, the changed one keeps the validators of its answer
+    assert server.methods[5:] == ["GET"] * 5
+    cache.close()
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_bytes=100)
+    for i in range(3):
+        cache.put(CachedPage(f"https://example.com/{i}", '"e"', None, None, "x" * 10, "y" * 20))
+    cache.touch("https://example.com/0")
+    cache.put(CachedPage("https://example.com/3", '"e"', None, None, "x" * 10, "y" * 20))
+
+    assert cache.size == 90
+    assert cache.evictions == 1
+    assert cache.get("https://example.com/0") is not None
+    assert cache.get("https://example.com/1") is None
+
+    # the size is kept across reopening
+    cache.close()
+    assert ResponseCache(str(tmp_path / "cache.db"), max_bytes=100).size == cache.size
+
+
+@pytest.mark.asyncio
+async def test_pages_without_validators_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    visitor = CachingVisitor(ConvertingVisitor(ETagServer(1)), cache)
+    # nothing listens there: the probe fails and the page is served by the wrapped visitor, uncached
+    pages = await visitor.visit_many(["http://127.0.0.1:9/p0"])
+
+    assert pages[0].content == "/p0 v1"
+    assert cache.get("http://127.0.0.1:9/p0") is None
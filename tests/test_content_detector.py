@@ -0,0 +1,169 @@
+import random
+
+import pytest
+from smolcrawler.content_detector import (
+    ContentNormalizer,
+    FastHashDetector,
+    HashBasedDetector,
+    SimilarityBasedDetector,
+    fast_hash,
+    fingerprint_algorithm,
+)
+
+
+def random_text(rng: random.Random, words: int = 400) -> list[str]:
+    return [f"w{rng.randrange(5000)}" for _ in range(words)]
+
+
+def edit(rng: random.Random, words: list[str], changes: int) -> list[str]:
+    words = list(words)
+    for _ in range(changes):
+        words[rng.randrange(len(words))] = f"w{rng.randrange(5000)}"
+    return words
+
+
+def test_hash_based_detector():
+    detector = HashBasedDetector()
+    detector.add_content("hello")
+
+    assert detector.is_duplicate("hello")
+    assert not detector.is_duplicate("hello!")
+
+
+@pytest.mark.parametrize("bits", [64, 128])
+def test_fast_hash_detector(bits):
+    detector = FastHashDetector(bits=bits)
+    detector.add_content("hello")
+
+    assert detector.is_duplicate("hello")
+    assert not detector.is_duplicate("hello!")
+    assert len(detector) == 1
+    assert 0 < fast_hash("hello", bits) < 1 << bits
+
+
+def test_fast_hash_detector_hashes_once_per_page():
+    calls = []
+
+    class CountingNormalizer(ContentNormalizer):
+        def __call__(self, content):
+            calls.append(content)
+            return super().__call__(content)
+
+    detector = FastHashDetector(CountingNormalizer())
+    content = "a page"
+    if not detector.is_duplicate(content):
+        detector.add_content(content)
+    detector.fingerprint(content)
+
+    assert calls == ["a page"]
+
+
+def test_fast_hash_detector_fingerprints():
+    detector = FastHashDetector()
+    fingerprint = detector.fingerprint("some content")
+
+    restored = FastHashDetector()
+    restored.add_fingerprint(fingerprint)
+    assert restored.is_duplicate("some content")
+    assert detector.fingerprinter()("some content") == fingerprint
+    # md5 fingerprints of an older saved crawl still load
+    restored.add_fingerprint(HashBasedDetector().fingerprint("old"))
+    assert len(restored) == 2
+
+
+def test_fast_hash_fingerprints_are_tagged_with_their_algorithm(monkeypatch):
+    fingerprint = FastHashDetector().fingerprint("some content")
+    assert fingerprint_algorithm(fingerprint) in ("xxh3", "blake2b")
+    assert fingerprint_algorithm(HashBasedDetector().fingerprint("old")) is None
+
+    # fingerprints saved by a process with the other algorithm are refused rather than never matching
+    other = "blake2b" if fingerprint_algorithm(fingerprint) == "xxh3" else "xxh3"
+    monkeypatch.setattr("smolcrawler.content_detector.HASH_ALGORITHM", other)
+    with pytest.raises(ValueError, match="fast-hash extra"):
+        FastHashDetector().add_fingerprint(fingerprint)
+
+
+def test_normalizer_ignores_whitespace_and_digits():
+    detector = FastHashDetector(ContentNormalizer(mask_digits=True))
+    detector.add_content("# Title\n\nSome   text.\n\nLast updated 2024-01-02 10:00")
+
+    assert detector.is_duplicate("# Title\nSome text.\nLast updated 2025-12-31 23:59\n")
+    assert not detector.is_duplicate("# Title\nOther text.\nLast updated 2024-01-02 10:00")
+
+    # digits are kept by default: versions and page numbers make different pages
+    detector = FastHashDetector(ContentNormalizer())
+    detector.add_content("## Changelog\n\n- 1.2.0: faster")
+    assert detector.is_duplicate("## Changelog\n- 1.2.0: faster")
+    assert not detector.is_duplicate("## Changelog\n- 1.3.0: faster")
+
+
+def test_normalizer_strips_boilerplate_learned_from_a_sample():
+    normalizer = ContentNormalizer(boilerplate_pages=3, sample=4)
+    detector = FastHashDetector(normalizer)
+    first = "Home | Docs | Blog\nThe article\nFooter v1"
+    # checks learn nothing, only added pages do
+    for _ in range(5):
+        assert not detector.is_duplicate(first)
+    detector.add_content(first)
+    for i in range(3):
+        assert normalizer.learning
+        detector.add_content(f"Home | Docs | Blog\nPage {'abc'[i]} body\nFooter v1")
+    assert not normalizer.learning
+
+    # an exact copy of the first page, hashed before the boilerplate was known
+    assert detector.is_duplicate(first)
+    # the same article without nav and footer
+    assert detector.is_duplicate("The article")
+    assert not detector.is_duplicate("Home | Docs | Blog\nAnother article\nFooter v1")
+    # a page of boilerplate only is not reduced to nothing
+    assert normalizer("Home | Docs | Blog") == b"Home|Docs|Blog"
+    assert detector.fingerprinter() is None
+    with pytest.raises(ValueError):
+        ContentNormalizer(boilerplate_pages=200)
+
+
+def test_similarity_detector_finds_near_duplicates():
+    rng = random.Random(0)
+    detector = SimilarityBasedDetector(threshold=0.8)
+    pages = [random_text(rng) for _ in range(50)]
+    for page in pages:
+        detector.add_content(" ".join(page))
+
+    # 2 changed words out of 400: ~98% identical
+    assert all(detector.is_duplicate(" ".join(edit(rng, page, 2))) for page in pages)
+    assert not any(detector.is_duplicate(" ".join(random_text(rng))) for _ in range(50))
+
+
+def test_similarity_detector_fingerprint_roundtrip():
+    rng = random.Random(1)
+    content = " ".join(random_text(rng))
+    detector = SimilarityBasedDetector()
+    fingerprint = detector.fingerprint(content)
+
+    restored = SimilarityBasedDetector()
+    restored.add_fingerprint(fingerprint)
+
+    assert len(restored) == 1
+    assert restored.is_duplicate(content)
+
+
+def test_similarity_detector_short_and_empty_content():
+    detector = SimilarityBasedDetector()
+    detector.add_content("just two")
+
+    assert detector.is_duplicate("just two")
+    assert not detector.is_duplicate("")
+
+
+def test_similarity_detector_clear():
+    detector = SimilarityBasedDetector()
+    detector.add_content("some content here")
+    detector.clear()
+
+    assert len(detector) == 0
+    assert not detector.is_duplicate("some content here")
+
+
+def test_similarity_detector_num_perm_must_be_power_of_two():
+    with pytest.raises(ValueError):
+        SimilarityBasedDetector(num_perm=100)
@@ -1,8 +1,13 @@
+import asyncio
+from contextlib import aclosing
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from localwebpy import Webpage
-from smolcrawler.crawler import Crawler
+from smolcrawler.crawler import Crawler, Seed
+from smolcrawler.url_utils import TrapDetector
+
+from conftest import LatencyVisitor, SameContentVisitor, make_page, star_site
 
 
 @pytest.fixture
@@ -61,7 +66,7 @@ async def test_crawler_skips_similar_urls(crawler, mock_webpage, mock_visitor):
         base_url,
         base_url + "/",
         base_url + "#section",
-        base_url + "?param=value",
+        base_url + "?utm_source=newsletter",
     ]
 
     # Visit first URL
@@ -96,3 +101,264 @@ async def test_crawler_respects_depth(crawler, mock_webpage, mock_visitor):
     # Should only visit the initial page, not follow links
     assert len(pages) == 1
     assert len(crawler.visited_urls) == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_page_does_not_stall_other_slots():
+    links = star_site(9)
+    # one slow page, the rest fast: a batch barrier would take ~3 * 0.3s
+    visitor = LatencyVisitor(links, {"https://example.com/p0": 0.3})
+    crawler = Crawler(depth=1, concurrency=3, url_prefix="https://example.com", visitor=visitor)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    pages = [page async for page in crawler.run("https://example.com/")]
+    elapsed = loop.time() - start
+
+    assert len(pages) == 10
+    assert visitor.max_in_flight == 3
+    assert elapsed < 0.5
+
+
+@pytest.mark.asyncio
+async def test_pages_are_yielded_in_dispatch_order():
+    links = star_site(6)
+    latencies = {f"https://example.com/p{i}": 0.06 - i * 0.01 for i in range(6)}
+    visitor = LatencyVisitor(links, latencies)
+    crawler = Crawler(depth=1, concurrency=4, url_prefix="https://example.com", visitor=visitor)
+
+    pages = [page.url async for page in crawler.run("https://example.com/")]
+
+    assert pages == visitor.visited
+
+
+@pytest.mark.asyncio
+async def test_limit_is_not_overshot():
+    visitor = LatencyVisitor(star_site(20))
+    crawler = Crawler(depth=1, concurrency=8, limit=5, url_prefix="https://example.com", visitor=visitor)
+
+    pages = [page async for page in crawler.run("https://example.com/")]
+
+    assert len(pages) == 5
+    assert len(visitor.visited) == 5
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("offload", ["process", "thread"])
+async def test_offloaded_processing_matches_inline(offload):
+    links = star_site(6)
+    links["https://example.com/p0"] = ["https://example.com/p1", "https://example.com/deep", "https://other.com/x"]
+
+    async def crawl(**kwargs):
+        visitor = LatencyVisitor(links)
+        crawler = Crawler(depth=2, concurrency=3, url_prefix="https://example.com", visitor=visitor, **kwargs)
+        return [page.url async for page in crawler.run("https://example.com/")], crawler
+
+    inline, _ = await crawl()
+    offloaded, crawler = await crawl(offload=offload, offload_workers=2)
+
+    assert sorted(offloaded) == sorted(inline)
+    assert "https://example.com/deep" in offloaded
+    assert len(crawler.content_detector) == len(offloaded)
+
+
+def two_sites() -> dict[str, list[str]]:
+    return {
+        "https://a.com/": [f"https://a.com/p{i}" for i in range(6)],
+        "https://b.com/": [f"https://b.com/p{i}" for i in range(6)] + ["https://a.com/p0"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_run_many_shares_visitor_and_concurrency():
+    visitor = LatencyVisitor(two_sites())
+    crawler = Crawler(depth=1, concurrency=4, visitor=visitor)
+
+    results = [(seed, page.url) async for seed, page in crawler.run_many(["https://a.com/", "https://b.com/"], 3)]
+
+    assert visitor.max_in_flight == 3
+    # every seed keeps its own prefix: b.com does not crawl a.com/p0
+    assert sorted(url for seed, url in results if seed == "https://a.com/") == sorted(
+        ["https://a.com/"] + two_sites()["https://a.com/"]
+    )
+    assert sorted(url for seed, url in results if seed == "https://b.com/") == sorted(
+        ["https://b.com/"] + two_sites()["https://b.com/"][:6]
+    )
+    assert crawler.seed_stats["https://a.com/"].fetched == 7
+
+
+@pytest.mark.asyncio
+async def test_run_many_scopes_dedup_per_seed():
+    crawler = Crawler(depth=1, concurrency=2, visitor=SameContentVisitor(two_sites()))
+
+    results = [(seed, page.url) async for seed, page in crawler.run_many(["https://a.com/", "https://b.com/"])]
+
+    # p0 of both sites has the same content, but the sites are deduplicated separately
+    assert ("https://a.com/", "https://a.com/p0") in results
+    assert ("https://b.com/", "https://b.com/p0") in results
+    assert crawler.visited_urls == set()
+
+
+@pytest.mark.asyncio
+async def test_run_many_settings_per_seed():
+    crawler = Crawler(depth=1, concurrency=2, visitor=LatencyVisitor(two_sites()))
+    seeds = [Seed("https://a.com/", depth=0), Seed("https://b.com/", limit=3)]
+
+    results = [(seed, page.url) async for seed, page in crawler.run_many(seeds)]
+
+    assert [url for seed, url in results if seed == "https://a.com/"] == ["https://a.com/"]
+    assert len([url for seed, url in results if seed == "https://b.com/"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_run_many_stops_all_seeds_when_the_consumer_stops():
+    visitor = LatencyVisitor(two_sites())
+    crawler = Crawler(depth=1, concurrency=2, visitor=visitor)
+
+    async with aclosing(crawler.run_many(["https://a.com/", "https://b.com/"])) as pages:
+        async for _ in pages:
+            break
+    visited = len(visitor.visited)
+    await asyncio.sleep(0.05)
+
+    assert visitor.in_flight == 0
+    assert len(visitor.visited) == visited
+
+
+@pytest.mark.asyncio
+async def test_query_pages_are_kept_and_traps_are_not_followed():
+    root = "https://example.com/"
+    links = {root: [f"{root}list?page={i}" for i in range(3)] + [f"{root}calendar/2024/{i}" for i in range(20)]}
+    links[f"{root}archive"] = [f"{root}calendar/2025/{i}" for i in range(20)]
+    visitor = LatencyVisitor(links)
+    crawler = Crawler(depth=1, concurrency=3, limit=-1, visitor=visitor, trap_detector=TrapDetector(max_per_pattern=5))
+
+    pages = [page.url async for page in crawler.run(root)]
+
+    assert len([url for url in pages if "?page=" in url]) == 3
+    assert len([url for url in pages if "/calendar/" in url]) == 5
+    assert crawler.stats.trapped == 15
+
+    # the links counted by the previous run do not count against the next one
+    pages = [page.url async for page in crawler.run(f"{root}archive")]
+    assert len([url for url in pages if "/calendar/" in url]) == 5
+
+
+@pytest.mark.asyncio
+async def test_malformed_links_are_skipped():
+    root = "https://example.com/"
+    visitor = LatencyVisitor({root: ["https://[::1/x", f"{root}p0"]})
+    crawler = Crawler(depth=1, url_prefix="https://", visitor=visitor)
+
+    pages = [page.url async for page in crawler.run(root)]
+
+    assert pages == [root, f"{root}p0"]
+
+
+@pytest.mark.asyncio
+async def test_deadline_cancels_fetches_in_flight():
+    # every page but the first takes far longer than the deadline
+    links = star_site(20)
+    visitor = LatencyVisitor(links, {url: 2.0 for url in links["https://example.com/"]})
+    crawler = Crawler(depth=1, concurrency=4, limit=-1, visitor=visitor, deadline=0.2)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    pages = [page.url async for page in crawler.run("https://example.com/")]
+
+    assert pages == ["https://example.com/"]
+    # well before the 2s the fetches in flight would take
+    assert loop.time() - start < 1.5
+    assert visitor.in_flight == 0
+    assert crawler.stats.stopped_by == "deadline"
+
+
+@pytest.mark.asyncio
+async def test_fetch_and_byte_budgets():
+    visitor = LatencyVisitor(star_site(20))
+    crawler = Crawler(depth=1, concurrency=8, limit=-1, visitor=visitor, max_fetches=6)
+
+    pages = [page async for page in crawler.run("https://example.com/")]
+
+    assert len(pages) == len(visitor.visited) == 6
+    assert crawler.stats.stopped_by == "fetches"
+
+    # the root page has 20 links of 36 bytes, the others no html at all
+    visitor = LatencyVisitor({**star_site(20), "https://example.com/p0": ["https://example.com/"] * 40})
+    crawler = Crawler(depth=2, concurrency=1, limit=-1, visitor=visitor, max_download_bytes=1000)
+
+    pages = [page.url async for page in crawler.run("https://example.com/")]
+
+    # stopped as soon as the page that went past the budget was downloaded, which is still yielded
+    assert visitor.visited[-1] == "https://example.com/p0"
+    assert pages == visitor.visited
+    assert crawler.stats.downloaded_bytes > 1000
+    assert crawler.stats.stopped_by == "bytes"
+
+    # pages done behind a slow one count right away, in UTF-8 bytes
+    leaf = ["https://example.com/é"] * 3
+    links = {**star_site(20), **{f"https://example.com/p{i}": leaf for i in range(20)}}
+    latencies = {f"https://example.com/p{i}": 0.02 * i for i in range(1, 20)}
+    visitor = LatencyVisitor(links, {**latencies, "https://example.com/p0": 1.0})
+    root_bytes = len("".join(f'<a href="{link}">x</a>' for link in links["https://example.com/"]))
+    leaf_bytes = len("".join(f'<a href="{link}">x</a>' for link in leaf).encode())
+    crawler = Crawler(depth=1, concurrency=8, limit=-1, visitor=visitor, max_download_bytes=root_bytes + 2 * leaf_bytes + 1)
+
+    pages = [page.url async for page in crawler.run("https://example.com/")]
+
+    # the third leaf page ends the crawl, whether it is at the head of the yield order or not:
+    # the slow p0 is cancelled, every page downloaded by then is yielded
+    leaves = (crawler.stats.downloaded_bytes - root_bytes) // leaf_bytes
+    assert leaves >= 3
+    assert len(pages) == 1 + leaves
+    assert "https://example.com/p0" not in pages
+    assert visitor.in_flight == 0
+    assert crawler.stats.stopped_by == "bytes"
+
+    crawler = Crawler(depth=1, concurrency=3, limit=-1, visitor=LatencyVisitor(star_site(3)), max_download_bytes=1000)
+    assert len([page async for page in crawler.run("https://example.com/")]) == 4
+    assert crawler.stats.stopped_by is None
+
+
+@pytest.mark.asyncio
+async def test_closing_the_run_cancels_fetches_in_flight():
+    visitor = LatencyVisitor(star_site(20), {f"https://example.com/p{i}": 1.0 for i in range(20)})
+    crawler = Crawler(depth=1, concurrency=4, visitor=visitor)
+
+    async with aclosing(crawler.run("https://example.com/")) as pages:
+        async for _ in pages:
+            break
+
+    # the fetches started for the next pages are gone by the time the run is closed
+    assert visitor.in_flight == 0
+    assert crawler.stats.stopped_by == "closed"
+
+
+class PlainDetector:
+    """A content detector with only the required methods, no fingerprints."""
+
+    def __init__(self):
+        self.contents: set[str] = set()
+
+    def is_duplicate(self, content: str) -> bool:
+        return content in self.contents
+
+    def add_content(self, content: str) -> None:
+        self.contents.add(content)
+
+    def clear(self) -> None:
+        self.contents.clear()
+
+
+@pytest.mark.asyncio
+async def test_detector_without_fingerprints():
+    root = "https://example.com/"
+    links = {root: [f"{root}p0", f"{root}a/p0", f"{root}b/p0", f"{root}p1"]}
+    crawler = Crawler(depth=1, concurrency=2, visitor=SameContentVisitor(links), content_detector=PlainDetector())
+
+    pages = [page.url async for page in crawler.run(root)]
+
+    # the three p0 pages have the same content
+    assert len(pages) == 3
+    assert crawler.stats.duplicates == 2
+    assert len(crawler.content_detector.contents) == 3
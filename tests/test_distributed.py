@@ -0,0 +1,149 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from smolcrawler.crawler import Crawler
+from smolcrawler.distributed import BackendServer, HttpBackend, SQLiteBackend, shard_of
+from smolcrawler.url_utils import UrlCanonicalizer
+
+from conftest import LatencyVisitor, SameContentVisitor, star_site
+
+ROOT = "https://h0.test/"
+HOSTS = [f"https://h{i}.test/" for i in range(6)]
+
+
+def hosts_site() -> dict[str, list[str]]:
+    # the first host links to every host, each host to 4 pages of its own
+    links = {ROOT: HOSTS[1:]}
+    for host in HOSTS:
+        links.setdefault(host, []).extend(f"{host}p{i}" for i in range(4))
+    return links
+
+
+def all_urls() -> list[str]:
+    return sorted(HOSTS + [f"{host}p{i}" for host in HOSTS for i in range(4)])
+
+
+@pytest.fixture(params=["sqlite", "http"])
+def make_backend(request, tmp_path):
+    """Makes one backend per worker, as worker processes would."""
+    path = str(tmp_path / "crawl.db")
+    if request.param == "sqlite":
+        yield lambda shards: SQLiteBackend(path, shards)
+        return
+    servers = {}
+
+    def make(shards: int) -> HttpBackend:
+        if shards not in servers:
+            servers[shards] = BackendServer(SQLiteBackend(path, shards))
+            servers[shards].start()
+        return HttpBackend(servers[shards].url)
+
+    yield make
+    for server in servers.values():
+        server.stop()
+
+
+async def crawl_shard(backend, shard: int, visitor, **kwargs) -> list[str]:
+    crawler = Crawler(depth=2, concurrency=2, url_prefix="https://", visitor=visitor, coordinator=backend, shard=shard, **kwargs)
+    return [page.url async for page in crawler.run(ROOT)]
+
+
+def test_shard_of_is_consistent():
+    hosts = [f"https://host{i}.example/page" for i in range(1000)]
+    four = [shard_of(url, 4) for url in hosts]
+    five = [shard_of(url, 5) for url in hosts]
+
+    assert shard_of("https://HOST1.example/other", 4) == four[1]
+    assert min(Counter(four).values()) > 200
+    # a fifth shard only takes hosts over, the others keep theirs
+    moved = [new for old, new in zip(four, five) if old != new]
+    assert set(moved) == {4}
+    assert 150 < len(moved) < 250
+
+
+@pytest.mark.asyncio
+async def test_workers_split_hosts_and_dedup(make_backend):
+    shards = 3
+    visitors = [SameContentVisitor(hosts_site()) for _ in range(shards)]
+    results = await asyncio.gather(
+        *(crawl_shard(make_backend(shards), shard, visitor) for shard, visitor in enumerate(visitors))
+    )
+
+    # every URL fetched once, by the worker of its host's shard
+    fetched = sorted(url for visitor in visitors for url in visitor.visited)
+    assert fetched == all_urls()
+    for shard, visitor in enumerate(visitors):
+        assert all(shard_of(url, shards) == shard for url in visitor.visited)
+    assert sum(1 for visitor in visitors if visitor.visited) > 1
+    # the p0 pages of all hosts are the same page, yielded by one worker only
+    yielded = [url for pages in results for url in pages]
+    assert len(yielded) == len(set(yielded)) == len(all_urls()) - len(HOSTS) + 1
+
+    backend = make_backend(shards)
+    assert backend.unfinished() == 0
+    assert backend.counts() == {"queued": 0, "claimed": 0, "done": len(all_urls()), "fingerprints": 25}
+
+
+@pytest.mark.asyncio
+async def test_stopped_worker_gives_back_its_urls(make_backend):
+    first = SameContentVisitor(hosts_site())
+    others = SameContentVisitor(hosts_site())
+    stopped, *_ = await asyncio.wait_for(
+        asyncio.gather(crawl_shard(make_backend(2), 0, first, limit=1), crawl_shard(make_backend(2), 1, others)),
+        timeout=5,
+    )
+    # the other worker did not wait for the URLs of the stopped one
+    assert len(stopped) == 1
+    counts = make_backend(2).counts()
+    assert counts["queued"] > 0 and counts["claimed"] == 0
+
+    # a new worker for the shard picks up where the stopped one left off
+    restarted = SameContentVisitor(hosts_site())
+    await asyncio.wait_for(crawl_shard(make_backend(2), 0, restarted), timeout=5)
+    assert sorted(first.visited + others.visited + restarted.visited) == all_urls()
+    assert make_backend(2).counts()["done"] == len(all_urls())
+
+
+@pytest.mark.asyncio
+async def test_shard_of_a_dead_worker_is_taken_over(tmp_path):
+    path = str(tmp_path / "crawl.db")
+    dead_shard = shard_of(ROOT, 2)
+    # a worker claims the start URL, then dies without leaving
+    dead = SQLiteBackend(path, 2, lease=0.5)
+    dead.join(dead_shard)
+    assert dead.exchange(dead_shard, [], [(UrlCanonicalizer().canonicalize(ROOT), ROOT, 0)], 1) == [(ROOT, 0)]
+
+    visitor = SameContentVisitor(hosts_site())
+    await asyncio.wait_for(crawl_shard(SQLiteBackend(path, 2, lease=0.5), 1 - dead_shard, visitor), timeout=5)
+
+    # once its lease ran out, the other worker crawled the dead one's hosts too
+    assert sorted(visitor.visited) == all_urls()
+    assert dead.unfinished() == 0
+
+
+class CountingBackend(SQLiteBackend):
+    calls = 0
+
+    def add_fingerprints(self, fingerprints):
+        self.calls += 1
+        return super().add_fingerprints(fingerprints)
+
+
+@pytest.mark.asyncio
+async def test_fingerprints_are_checked_in_batches(tmp_path):
+    backend = CountingBackend(str(tmp_path / "crawl.db"), 1)
+    crawler = Crawler(depth=1, concurrency=8, visitor=LatencyVisitor(star_site(24)), coordinator=backend)
+
+    pages = [page.url async for page in crawler.run("https://example.com/")]
+
+    assert len(pages) == 25
+    assert backend.counts()["fingerprints"] == 25
+    # the pages fetched together are checked together
+    assert backend.calls < 10
+
+
+def test_sqlite_backend_checks_shards(tmp_path):
+    SQLiteBackend(str(tmp_path / "crawl.db"), 4).close()
+    with pytest.raises(ValueError):
+        SQLiteBackend(str(tmp_path / "crawl.db"), 2)
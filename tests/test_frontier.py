@@ -0,0 +1,138 @@
+import random
+from dataclasses import dataclass
+
+import pytest
+from smolcrawler import crawler as crawler_module
+from smolcrawler.crawler import Crawler
+from smolcrawler.frontier import Frontier
+from smolcrawler.url_utils import UrlCanonicalizer
+
+from conftest import make_page
+
+
+def test_frontier_is_fifo():
+    frontier = Frontier()
+    for i in range(3):
+        frontier.push(f"https://example.com/{i}", i)
+
+    assert [frontier.pop() for _ in range(len(frontier))] == [
+        ("https://example.com/0", 0),
+        ("https://example.com/1", 1),
+        ("https://example.com/2", 2),
+    ]
+    assert not frontier
+
+
+def test_frontier_dedups_similar_urls_on_push():
+    frontier = Frontier()
+
+    assert frontier.push("https://example.com/page", 1)
+    assert not frontier.push("https://example.com/page/", 1)
+    assert not frontier.push("https://example.com/page#section", 2)
+    assert frontier.seen("https://example.com/page/")
+    assert len(frontier) == 1
+
+    # popping does not forget the URL
+    frontier.pop()
+    assert not frontier.push("https://example.com/page", 1)
+
+
+def test_frontier_max_size():
+    frontier = Frontier(max_size=2)
+    for i in range(5):
+        frontier.push(f"https://example.com/{i}", 0)
+
+    assert len(frontier) == 2
+    assert frontier.dropped == 3
+
+
+@dataclass
+class Page:
+    url: str
+    html: str
+    content: str
+
+
+class PeakFrontier(Frontier):
+    peak = 0
+
+    def push(self, url: str, depth: int, anchor_text: str = "") -> bool:
+        queued = super().push(url, depth, anchor_text)
+        PeakFrontier.peak = max(PeakFrontier.peak, len(self))
+        return queued
+
+
+class GraphVisitor:
+    """Serves a synthetic site where every page links to `fanout` random pages."""
+
+    def __init__(self, pages: int, fanout: int, seed: int = 0):
+        rng = random.Random(seed)
+        # every page also links to the next one, so the whole graph is reachable
+        self.links = [
+            "".join(f'<a href="/p{rng.randrange(pages)}">x</a>' for _ in range(fanout))
+            + f'<a href="/p{(i + 1) % pages}">next</a>'
+            for i in range(pages)
+        ]
+        self.visits = 0
+
+    async def visit_many(self, urls):
+        pages = []
+        for url in urls:
+            self.visits += 1
+            i = int(url.rsplit("/p", 1)[1])
+            pages.append(Page(url=url, html=self.links[i], content=f"page {i}"))
+        return pages
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("pages", [10_000, pytest.param(100_000, marks=pytest.mark.slow)])
+async def test_stress_dense_graph(monkeypatch, pages):
+    monkeypatch.setattr(PeakFrontier, "peak", 0)
+    monkeypatch.setattr(crawler_module, "Frontier", PeakFrontier)
+    visitor = GraphVisitor(pages, fanout=10)
+    crawler = Crawler(depth=pages, concurrency=16, limit=-1, url_prefix="https://example.com", visitor=visitor)
+
+    crawled = {page.url async for page in crawler.run("https://example.com/p0")}
+
+    # every page is fetched exactly once, although it is linked ~11 times
+    assert len(crawled) == pages
+    assert visitor.visits == pages
+    assert PeakFrontier.peak < pages
+
+
+class ItemsVisitor:
+    """Serves `pages[url] = (links, content)` and records the fetched URLs."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.visited = []
+
+    async def visit_many(self, urls):
+        self.visited.extend(urls)
+        pages = []
+        for url in urls:
+            links, content = self.pages[url]
+            pages.append(make_page(url, "".join(f'<a href="{link}">x</a>' for link in links), content))
+        return pages
+
+
+@pytest.mark.asyncio
+async def test_seen_urls_are_rekeyed_once_a_param_is_learned():
+    item = "https://example.com/item?id=1&ref="
+    visitor = ItemsVisitor(
+        {
+            "https://example.com/": ([item + "a", item + "b", "https://example.com/hub"], "home"),
+            item + "a": ([], "item 1"),
+            item + "b": ([], "item 1"),
+            # linked once `ref` is known not to matter
+            "https://example.com/hub": ([item + "c"], "hub"),
+            item + "c": ([], "item 1"),
+        }
+    )
+    crawler = Crawler(depth=2, concurrency=1, visitor=visitor, canonicalizer=UrlCanonicalizer(learn_after=1))
+
+    pages = [page.url async for page in crawler.run("https://example.com/")]
+
+    assert crawler.canonicalizer.ignored == {"example.com": {"ref"}}
+    assert item + "c" not in visitor.visited
+    assert pages == ["https://example.com/", item + "a", "https://example.com/hub"]
@@ -0,0 +1,121 @@
+import httpx
+import pytest
+from smolcrawler.crawler import Crawler
+from smolcrawler.gate import ContentGate, path_pattern
+
+from conftest import LatencyVisitor
+
+
+async def chunks(size: int):
+    for _ in range(size // 1000):
+        yield b"x" * 1000
+
+
+class Server:
+    """Answers by path: /files/* are PDFs, /big is a large page, /stream a large page without Content-Length.
+
+    Hosts in `no_head` answer HEAD requests with 405.
+    """
+
+    def __init__(self, no_head=()):
+        self.no_head = no_head
+        self.requests: list[str] = []
+        self.methods: list[str] = []
+        self.user_agents: set[str] = set()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests.append(path)
+        self.methods.append(request.method)
+        self.user_agents.add(request.headers.get("user-agent", ""))
+        if request.method == "HEAD" and request.url.host in self.no_head:
+            return httpx.Response(405)
+        if path.startswith("/files/"):
+            return httpx.Response(200, headers={"Content-Type": "application/pdf"}, content=b"%PDF" * 500)
+        if path == "/big":
+            return httpx.Response(200, headers={"Content-Type": "text/html"}, content=b"x" * 50_000)
+        if path == "/stream":
+            return httpx.Response(200, headers={"Content-Type": "text/html"}, content=chunks(50_000))
+        return httpx.Response(200, headers={"Content-Type": "text/html; charset=utf-8"}, content=b"<p>hi</p>")
+
+
+def make_gate(server: Server, **kwargs) -> ContentGate:
+    return ContentGate(max_bytes=10_000, client=httpx.AsyncClient(transport=httpx.MockTransport(server)), **kwargs)
+
+
+def test_path_pattern():
+    assert path_pattern("https://a.com/files/v12/report") == "a.com/files/v#/*"
+    assert path_pattern("https://a.com/report?id=1") == "a.com/*"
+
+
+@pytest.mark.asyncio
+async def test_gate_skips_by_headers():
+    gate = make_gate(Server(), method="GET")
+
+    assert await gate.check("https://a.com/docs/intro") is None
+    pdf = await gate.check("https://a.com/files/1")
+    assert (pdf.reason, pdf.size) == ("type", 2000)
+    assert (await gate.check("https://a.com/big")).reason == "size"
+    streamed = await gate.check("https://a.com/stream")
+    assert (streamed.reason, streamed.size) == ("size", None)
+    # the stream was abandoned right past the cap
+    assert gate.probe_bytes <= 11_000
+    assert gate.skipped_bytes == 52_000
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method", ["GET", "HEAD"])
+async def test_gate_learns_path_patterns(method):
+    server = Server()
+    gate = make_gate(server, method=method, learn_after=2, trust_after=2)
+
+    for i in range(4):
+        await gate.check(f"https://a.com/files/{i}")
+        await gate.check(f"https://a.com/docs/p{i}")
+
+    # two probes per pattern, then the verdict is remembered
+    assert sorted(server.requests) == ["/docs/p0", "/docs/p1", "/files/0", "/files/1"]
+    assert gate.counts["skipped_learned"] == 2 and gate.counts["trusted"] == 2
+
+
+@pytest.mark.asyncio
+async def test_gate_probes_with_head_and_the_visitors_headers():
+    server = Server(no_head=("b.com",))
+    gate = make_gate(server, headers={"User-Agent": "visitor/1.0"})
+
+    assert (await gate.check("https://a.com/files/1")).reason == "type"
+    assert await gate.check("https://a.com/docs/intro") is None
+    # b.com refuses HEAD once, then gets a GET right away
+    assert (await gate.check("https://b.com/files/1")).reason == "type"
+    assert await gate.check("https://b.com/docs/intro") is None
+
+    assert server.methods == ["HEAD", "HEAD", "HEAD", "GET", "GET"]
+    assert server.user_agents == {"visitor/1.0"}
+
+
+@pytest.mark.asyncio
+async def test_urls_the_gate_cannot_probe_go_to_the_visitor():
+    root = "https://a.com/"
+    gate = make_gate(Server())
+    assert await gate.check("https://a.com:abc/x") is None
+
+    visitor = LatencyVisitor({root: ["https://a.com:abc/x", f"{root}docs/p0"]})
+    crawler = Crawler(depth=1, url_prefix="https://", visitor=visitor, content_gate=gate)
+    pages = [page.url async for page in crawler.run(root)]
+
+    assert sorted(pages) == sorted([root, "https://a.com:abc/x", f"{root}docs/p0"])
+
+
+@pytest.mark.asyncio
+async def test_crawler_counts_gated_pages():
+    root = "https://a.com/"
+    links = {root: [f"{root}files/{i}" for i in range(3)] + [f"{root}docs/p{i}" for i in range(3)]}
+    visitor = LatencyVisitor(links)
+    crawler = Crawler(depth=1, concurrency=2, visitor=visitor, content_gate=make_gate(Server()))
+
+    pages = [page.url async for page in crawler.run(root)]
+
+    assert len(pages) == 4
+    assert not [url for url in visitor.visited if "/files/" in url]
+    assert crawler.stats.gated == 3
+    assert crawler.stats.gated_bytes == 6000
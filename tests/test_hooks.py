@@ -0,0 +1,72 @@
+import json
+
+import pytest
+from smolcrawler.crawler import Crawler
+from smolcrawler.hooks import CrawlHooks, TraceRecorder
+
+from conftest import LatencyVisitor, star_site
+
+
+class CallRecorder(CrawlHooks):
+    def __init__(self):
+        self.calls = []
+
+    def on_fetch_start(self, url, depth, queued, start):
+        assert queued <= start
+        self.calls.append(("fetch_start", url))
+
+    def on_fetch_end(self, url, depth, start, end, ok):
+        assert start <= end
+        self.calls.append(("fetch_end", url))
+
+    def on_extract(self, url, start, end, links):
+        self.calls.append(("extract", url, links))
+
+    def on_dedup(self, url, start, end, duplicate):
+        self.calls.append(("dedup", url, duplicate))
+
+    def on_yield(self, url, depth, start, end):
+        self.calls.append(("yield", url))
+
+
+@pytest.mark.asyncio
+async def test_hooks_are_called_for_every_page():
+    hooks = CallRecorder()
+    crawler = Crawler(depth=1, url_prefix="https://example.com", visitor=LatencyVisitor(star_site(3)), hooks=hooks)
+
+    pages = [page.url async for page in crawler.run("https://example.com/")]
+
+    root = "https://example.com/"
+    assert hooks.calls[:5] == [
+        ("fetch_start", root),
+        ("fetch_end", root),
+        ("dedup", root, False),
+        ("yield", root),
+        ("extract", root, 3),
+    ]
+    for name in ("fetch_start", "fetch_end", "yield"):
+        assert [call[1] for call in hooks.calls if call[0] == name] == pages
+    # pages at the maximum depth are not scanned for links
+    assert [call[1] for call in hooks.calls if call[0] == "extract"] == [root]
+
+
+@pytest.mark.asyncio
+async def test_trace_recorder(tmp_path):
+    recorder = TraceRecorder()
+    crawler = Crawler(
+        depth=1, concurrency=3, url_prefix="https://example.com", visitor=LatencyVisitor(star_site(9)), hooks=recorder
+    )
+
+    pages = [page async for page in crawler.run("https://example.com/")]
+    recorder.finish()
+    path = tmp_path / "trace.json"
+    recorder.write_chrome_trace(str(path))
+
+    events = json.loads(path.read_text())["traceEvents"]
+    fetches = [event for event in events if event["ph"] == "X" and event["cat"] == "fetch"]
+    assert len(fetches) == len(pages) == 10
+    # concurrent fetches get their own lanes, reused once a fetch ends
+    assert {event["tid"] for event in fetches} == {1, 2, 3}
+    assert recorder.histograms["dedup"].count == 10
+    summary = recorder.summary()
+    assert "fetch" in summary and "consumer" in summary
@@ -0,0 +1,157 @@
+import pytest
+from smolcrawler.crawler import Crawler
+from smolcrawler.incremental import IncrementalCrawl, Manifest, ManifestEntry
+from smolcrawler.url_utils import TrapDetector
+
+from conftest import make_page
+
+ROOT = "https://example.com/"
+
+
+class EditableSite:
+    """A site of `links`, whose page content can be changed between crawls.
+
+    URLs without a version fail, URLs in `gone` answer 404, URLs in `redirects` end up at another URL.
+    """
+
+    def __init__(self, links: dict[str, list[str]]):
+        self.links = links
+        self.versions = {url: 1 for url in links}
+        self.gone: set[str] = set()
+        self.redirects: dict[str, str] = {}
+        self.visited: list[str] = []
+
+    async def visit_many(self, urls):
+        self.visited.extend(urls)
+        pages = []
+        for url in urls:
+            if url in self.gone:
+                page = make_page(url, "", "Not Found")
+                page.status_code = 404
+                pages.append(page)
+                continue
+            if url not in self.versions:
+                pages.append(None)
+                continue
+            html = "".join(f'<a href="{link}">x</a>' for link in self.links.get(url, []))
+            pages.append(make_page(self.redirects.get(url, url), html, f"{url} v{self.versions[url]}"))
+        return pages
+
+
+def tree_site() -> EditableSite:
+    # root -> a, b; a -> a1, a2; b -> b1
+    return EditableSite(
+        {
+            ROOT: [ROOT + "a", ROOT + "b"],
+            ROOT + "a": [ROOT + "a1", ROOT + "a2"],
+            ROOT + "b": [ROOT + "b1"],
+            ROOT + "a1": [],
+            ROOT + "a2": [],
+            ROOT + "b1": [],
+        }
+    )
+
+
+async def crawl(site: EditableSite, incremental: IncrementalCrawl, **kwargs) -> dict[str, str]:
+    site.visited.clear()
+    crawler = Crawler(depth=3, visitor=site, incremental=incremental, **kwargs)
+    return {page.webpage.url: page.status async for page in crawler.run_incremental(ROOT)}
+
+
+@pytest.mark.asyncio
+async def test_first_crawl_is_all_new(tmp_path):
+    incremental = IncrementalCrawl()
+    statuses = await crawl(tree_site(), incremental)
+
+    assert set(statuses.values()) == {"new"}
+    assert len(statuses) == 6
+    path = str(tmp_path / "manifest.jsonl.gz")
+    incremental.manifest.save(path)
+    loaded = Manifest.load(path)
+    assert sorted(loaded.get(ROOT + "a").links) == [ROOT + "a1", ROOT + "a2"]
+    assert len(loaded) == 6
+
+
+@pytest.mark.asyncio
+async def test_changed_new_and_deleted_pages():
+    site = tree_site()
+    first = IncrementalCrawl()
+    await crawl(site, first)
+
+    site.versions[ROOT + "b1"] = 2
+    site.links[ROOT + "b"].append(ROOT + "b2")
+    site.links[ROOT + "b2"] = []
+    site.versions[ROOT + "b2"] = 1
+    site.gone.add(ROOT + "a2")
+    del site.versions[ROOT + "a1"]
+    second = IncrementalCrawl(first.manifest, only_changed=True)
+    statuses = await crawl(site, second)
+
+    assert statuses == {ROOT + "b1": "changed", ROOT + "b2": "new"}
+    # a2 is gone, a1 only failed this time: it keeps its entry for the next run
+    assert second.deleted == [ROOT + "a2"]
+    assert second.manifest.get(ROOT + "a1") == first.manifest.get(ROOT + "a1")
+    assert ROOT + "a2" not in second.manifest
+    assert second.counts["unchanged"] == 3
+
+
+@pytest.mark.asyncio
+async def test_prune_unchanged_hubs():
+    site = tree_site()
+    first = IncrementalCrawl()
+    await crawl(site, first)
+
+    site.versions[ROOT + "b"] = 2
+    second = IncrementalCrawl(first.manifest, prune_unchanged=True)
+    statuses = await crawl(site, second)
+
+    # a is unchanged, so a1 and a2 are not fetched again; b changed, so b1 is
+    assert sorted(site.visited) == [ROOT, ROOT + "a", ROOT + "b", ROOT + "b1"]
+    assert statuses[ROOT + "b"] == "changed"
+    assert second.counts["carried_over"] == 2
+    # the pruned pages are kept, not reported deleted, and stay in the manifest for the next run
+    assert second.deleted == []
+    assert len(second.manifest) == 6
+
+
+@pytest.mark.asyncio
+async def test_redirected_pages_keep_their_status():
+    site = tree_site()
+    site.redirects[ROOT + "b1"] = ROOT + "b1/"
+    first = IncrementalCrawl()
+    assert (await crawl(site, first))[ROOT + "b1/"] == "new"
+
+    second = IncrementalCrawl(first.manifest, only_changed=True)
+    assert await crawl(site, second) == {}
+
+
+@pytest.mark.asyncio
+async def test_trapped_pages_are_not_deleted():
+    site = tree_site()
+    first = IncrementalCrawl()
+    await crawl(site, first)
+
+    # a1 and a2 share a pattern, only one of them is followed this time
+    second = IncrementalCrawl(first.manifest)
+    await crawl(site, second, trap_detector=TrapDetector(max_per_pattern=1))
+
+    assert len(site.visited) == 5
+    assert second.deleted == []
+    assert len(second.manifest) == 6
+
+
+@pytest.mark.asyncio
+async def test_run_incremental_needs_incremental():
+    with pytest.raises(ValueError):
+        async for _ in Crawler(visitor=tree_site()).run_incremental(ROOT):
+            pass
+
+
+def test_manifest_of_another_hash_algorithm_is_refused():
+    previous = Manifest()
+    previous.add(ManifestEntry(ROOT, "blake2b:1f", 0.0))
+    incremental = IncrementalCrawl(previous)
+    with pytest.raises(ValueError, match="hashed with blake2b"):
+        incremental.record(ROOT, "xxh3:2e")
+    # untagged fingerprints, e.g. md5 ones, still just compare
+    assert IncrementalCrawl(previous).record(ROOT, "9e107d9d372bb6826bd81d3542a419d6") == "changed"
@@ -0,0 +1,226 @@
+import asyncio
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+
+import httpx
+import pytest
+import pytest_asyncio
+from smolcrawler.content_detector import FastHashDetector
+from smolcrawler.crawler import Crawler, Seed
+from smolcrawler.politeness import HostScheduler, TokenBucket
+
+from conftest import LatencyVisitor
+
+
+@dataclass
+class Page:
+    url: str
+    html: str
+    content: str
+    status_code: int
+
+
+class StandInServer:
+    """A tiny HTTP server counting concurrent connections, shared by several hosts (ports)."""
+
+    def __init__(self, pages: int, delay: float = 0.05):
+        self.pages = pages
+        self.delay = delay
+        self.in_flight: dict[str, int] = {}
+        self.max_in_flight: dict[str, int] = {}
+        self.total_in_flight = 0
+        self.max_total_in_flight = 0
+        self.servers: list[asyncio.Server] = []
+        self.hosts: list[str] = []
+
+    async def start(self, hosts: int) -> None:
+        for _ in range(hosts):
+            server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+            self.servers.append(server)
+            self.hosts.append(f"127.0.0.1:{server.sockets[0].getsockname()[1]}")
+
+    async def stop(self) -> None:
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        host = "127.0.0.1:%d" % writer.get_extra_info("sockname")[1]
+        request = await reader.readuntil(b"\r\n\r\n")
+        path = request.split(b" ")[1].decode()
+
+        self.in_flight[host] = self.in_flight.get(host, 0) + 1
+        self.max_in_flight[host] = max(self.max_in_flight.get(host, 0), self.in_flight[host])
+        self.total_in_flight += 1
+        self.max_total_in_flight = max(self.max_total_in_flight, self.total_in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight[host] -= 1
+            self.total_in_flight -= 1
+
+        links = ""
+        if path in ("/", "/index"):
+            links = "".join(f'<a href="http://{h}/p{i}">p{i}</a>' for h in self.hosts for i in range(self.pages))
+        body = f"<html><body>{host}{path}{links}</body></html>".encode()
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+        await writer.drain()
+        writer.close()
+
+
+class HttpxVisitor:
+    def __init__(self):
+        self.client = httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=0))
+
+    async def visit_many(self, urls):
+        responses = await asyncio.gather(*(self.client.get(url) for url in urls))
+        return [Page(str(r.url), r.text, r.text, r.status_code) for r in responses]
+
+
+@pytest_asyncio.fixture
+async def server():
+    server = StandInServer(pages=6)
+    await server.start(hosts=2)
+    yield server
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_per_host_concurrency_cap_and_interleaving(server):
+    visitor = HttpxVisitor()
+    crawler = Crawler(
+        depth=1,
+        concurrency=8,
+        url_prefix="http://",
+        visitor=visitor,
+        politeness=HostScheduler(max_per_host=2),
+    )
+
+    pages = [page async for page in crawler.run(f"http://{server.hosts[0]}/")]
+    await visitor.client.aclose()
+
+    assert len(pages) == 1 + 2 * 6
+    assert all(count <= 2 for count in server.max_in_flight.values())
+    # idle slots of one host were used by the other one
+    assert server.max_total_in_flight == 4
+
+
+@pytest.mark.asyncio
+async def test_rate_limit(server):
+    visitor = HttpxVisitor()
+    crawler = Crawler(
+        depth=1,
+        concurrency=8,
+        url_prefix=f"http://{server.hosts[0]}",
+        visitor=visitor,
+        politeness=HostScheduler(max_per_host=8, rate=20, burst=1),
+    )
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    pages = [page async for page in crawler.run(f"http://{server.hosts[0]}/")]
+    elapsed = loop.time() - start
+    await visitor.client.aclose()
+
+    # 7 requests at 20/s, the first one is free
+    assert len(pages) == 7
+    assert elapsed >= 6 / 20
+
+
+@pytest.mark.asyncio
+async def test_run_many_shares_host_slots(server):
+    host = server.hosts[0]
+    visitor = HttpxVisitor()
+    politeness = HostScheduler(max_per_host=2)
+    crawler = Crawler(depth=1, concurrency=8, url_prefix=f"http://{host}", visitor=visitor, politeness=politeness)
+
+    # two seeds on the same host, each crawling its 7 pages
+    results = [item async for item in crawler.run_many([f"http://{host}/", Seed(f"http://{host}/index")])]
+    await visitor.client.aclose()
+
+    assert len(results) == 2 * 7
+    assert server.max_in_flight[host] == 2
+    assert politeness.hosts[host].in_flight == 0
+
+
+def test_backoff_on_throttling_status():
+    scheduler = HostScheduler(max_per_host=4, backoff=10)
+    url = "https://example.com/page"
+
+    scheduler.acquire(url)
+    scheduler.release(url, latency=0.1, ok=True, status_code=429)
+
+    state = scheduler.hosts["example.com"]
+    assert state.limit == 2
+    assert not scheduler.is_ready(url)
+    assert scheduler.is_ready("https://other.com/page")
+
+
+def test_concurrency_lowered_on_rising_latency():
+    scheduler = HostScheduler(max_per_host=4, slow_factor=2)
+    url = "https://example.com/page"
+
+    for latency in (0.1, 0.1, 2.0, 2.0):
+        scheduler.acquire(url)
+        scheduler.release(url, latency=latency, ok=True)
+
+    assert scheduler.hosts["example.com"].limit < 4
+
+
+def test_parked_urls_are_handed_out_round_robin():
+    scheduler = HostScheduler(max_per_host=1)
+    for host in ("a.com", "b.com"):
+        for i in range(2):
+            scheduler.park(f"https://{host}/{i}", 1)
+
+    assert [scheduler.pop_ready()[0] for _ in range(4)] == [
+        "https://a.com/0",
+        "https://b.com/0",
+        "https://a.com/1",
+        "https://b.com/1",
+    ]
+    assert scheduler.parked == 0
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, burst=2)
+    now = bucket.updated
+
+    bucket.take(now)
+    bucket.take(now)
+    assert bucket.time_until_ready(now) == pytest.approx(0.1)
+    assert bucket.time_until_ready(now + 0.11) == 0
+
+
+class SlowHashDetector(FastHashDetector):
+    def fingerprinter(self):
+        def fingerprint(content: str) -> str:
+            time.sleep(0.02)
+            return self.fingerprint(content)
+
+        return fingerprint
+
+
+@pytest.mark.asyncio
+async def test_host_slots_are_released_once_when_a_run_is_closed():
+    root = "https://example.com/"
+    visitor = LatencyVisitor({root: [f"{root}p{i}" for i in range(30)]}, {root: 0.0})
+    politeness = HostScheduler(max_per_host=8)
+    crawler = Crawler(
+        depth=1,
+        concurrency=8,
+        visitor=visitor,
+        politeness=politeness,
+        content_detector=SlowHashDetector(),
+        offload="thread",
+        offload_workers=1,
+    )
+
+    async with aclosing(crawler.run(root)) as pages:
+        async for page in pages:
+            if page.url != root:
+                break
+            await asyncio.sleep(0.05)  # fetches finish and wait for the worker pool meanwhile
+
+    assert politeness.hosts["example.com"].in_flight == 0
@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+import pytest
+from smolcrawler.crawler import Crawler
+from smolcrawler.retry import CircuitBreaker, RetryQueue
+
+from conftest import LatencyVisitor, star_site
+
+ROOT = "https://example.com/"
+
+
+class FlakyVisitor(LatencyVisitor):
+    """Raises on the first `failures[url]` visits of a URL, on every visit of a host in `down` before `up_at`."""
+
+    def __init__(self, links, failures=None, down=(), timeout=0.05, up_at=float("inf")):
+        super().__init__(links)
+        self.failures = dict(failures or {})
+        self.down = down
+        self.timeout = timeout
+        self.up_at = up_at
+        self.attempts: list[str] = []
+
+    async def visit_many(self, urls):
+        url = urls[0]
+        self.attempts.append(url)
+        if any(url.startswith(host) for host in self.down) and time.monotonic() < self.up_at:
+            await asyncio.sleep(self.timeout)
+            raise asyncio.TimeoutError(f"{url} timed out")
+        if self.failures.get(url, 0) > 0:
+            self.failures[url] -= 1
+            raise ConnectionError(f"{url} reset the connection")
+        return await super().visit_many(urls)
+
+
+def test_retry_queue_backs_off_and_gives_up():
+    retries = RetryQueue(max_attempts=3, backoff=10, budget=100)
+
+    assert retries.schedule("https://a.com/x", 1)
+    assert retries.pop_ready() is None
+    assert 9 < retries.next_wakeup() <= 10
+    retries.queue._heap[0] = (0.0, *retries.queue._heap[0][1:])
+    assert retries.pop_ready() == ("https://a.com/x", 1)
+    # the second retry waits twice as long, there is no third
+    assert retries.schedule("https://a.com/x", 1)
+    assert 19 < retries.next_wakeup() <= 20
+    assert not retries.schedule("https://a.com/x", 1)
+    assert (retries.retried, retries.given_up) == (2, 1)
+
+
+def test_retry_budget():
+    retries = RetryQueue(max_attempts=5, budget=2)
+
+    assert [retries.schedule(f"https://a.com/{i}", 1) for i in range(4)] == [True, True, False, False]
+    assert len(retries) == 2
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(failures=2, reset_after=0.05)
+    url = "https://down.com/a"
+
+    breaker.record(url, ok=False)
+    assert breaker.allow(url)
+    breaker.record(url, ok=False)
+    assert not breaker.allow(url) and not breaker.allow("https://down.com/b")
+    assert breaker.allow("https://up.com/a")
+    assert breaker.open_hosts() == ["down.com"]
+    # a late failure of a fetch started before the circuit opened changes nothing
+    breaker.record(url, ok=False)
+    assert breaker.trips == 1
+
+    time.sleep(0.06)
+    assert breaker.allow(url)  # the probe
+    assert not breaker.allow(url)
+    breaker.record(url, ok=False)
+    assert breaker.trips == 2
+    assert breaker.reopens_at(url) - time.monotonic() > 0.05  # open twice as long
+    breaker.hosts["down.com"].open_until = 0
+    assert breaker.allow(url)
+    breaker.record(url, ok=True)
+    assert breaker.open_hosts() == [] and breaker.allow(url)
+
+
+def test_circuit_breaker_gives_up_on_a_host():
+    breaker = CircuitBreaker(failures=1, reset_after=0.01, give_up_after=2)
+    url = "https://down.com/a"
+
+    breaker.record(url, ok=False)
+    assert not breaker.is_down(url)
+    time.sleep(0.02)
+    assert breaker.allow(url)
+    breaker.record(url, ok=False)
+    time.sleep(0.03)
+    assert breaker.is_down(url) and not breaker.allow(url)
+
+
+@pytest.mark.asyncio
+async def test_failed_pages_are_retried():
+    failures = {f"{ROOT}p0": 1, f"{ROOT}p1": 2, f"{ROOT}p2": 5}
+    visitor = FlakyVisitor(star_site(5), failures)
+    crawler = Crawler(depth=1, concurrency=3, visitor=visitor, retries=RetryQueue(max_attempts=3, backoff=0.01))
+
+    pages = [page.url async for page in crawler.run(ROOT)]
+
+    # p2 fails more often than it is tried
+    assert sorted(pages) == sorted([ROOT] + [f"{ROOT}p{i}" for i in range(5) if i != 2])
+    assert visitor.attempts.count(f"{ROOT}p2") == 3
+    assert (crawler.stats.retried, crawler.stats.failed) == (1 + 2 + 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_failures_do_not_end_the_crawl_without_retries():
+    visitor = FlakyVisitor(star_site(5), {f"{ROOT}p0": 1, f"{ROOT}p3": 1})
+    crawler = Crawler(depth=1, concurrency=2, visitor=visitor)
+
+    pages = [page.url async for page in crawler.run(ROOT)]
+
+    assert len(pages) == 4
+    assert crawler.stats.failed == 2
+
+
+def down_site() -> dict[str, list[str]]:
+    links = star_site(6)
+    links[ROOT] += [f"https://down.example.com/p{i}" for i in range(20)]
+    return links
+
+
+def breaker_crawler(visitor, max_attempts: int = 2, **breaker_kwargs) -> Crawler:
+    return Crawler(
+        depth=1,
+        concurrency=2,
+        url_prefix="https://",
+        visitor=visitor,
+        retries=RetryQueue(max_attempts=max_attempts, backoff=0.01),
+        circuit_breaker=CircuitBreaker(failures=3, reset_after=0.2, **breaker_kwargs),
+    )
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_stops_fetching_from_a_host_that_times_out():
+    visitor = FlakyVisitor(down_site(), down=("https://down.example.com/",))
+    crawler = breaker_crawler(visitor, give_up_after=2)
+
+    start = time.monotonic()
+    pages = [page.url async for page in crawler.run(ROOT)]
+
+    assert len(pages) == 7
+    down = [url for url in visitor.attempts if "down.example.com" in url]
+    # 3 failures open the circuit, a fetch may have been in flight meanwhile, then one probe after 0.2s
+    assert 4 <= len(down) <= 5
+    assert crawler.stats.short_circuited >= 15
+    # only fetches that failed were retried, the failed probe marked the host down
+    assert crawler.stats.retried <= 4
+    assert crawler.stats.failed == 20
+    assert crawler.circuit_breaker.is_down("https://down.example.com/")
+    assert time.monotonic() - start < 1
+
+
+@pytest.mark.asyncio
+async def test_held_urls_are_fetched_once_the_host_is_back():
+    visitor = FlakyVisitor(down_site(), down=("https://down.example.com/",), up_at=time.monotonic() + 0.15)
+    # a retry may be fetched, and fail, just before the circuit opens
+    crawler = breaker_crawler(visitor, max_attempts=3)
+
+    pages = [page.url async for page in crawler.run(ROOT)]
+
+    # URLs held while the circuit was open kept all their attempts
+    assert len(pages) == 27
+    assert crawler.stats.failed == 0
+    assert crawler.stats.short_circuited >= 15
+    assert crawler.circuit_breaker.open_hosts() == []
@@ -0,0 +1,76 @@
+import pytest
+from smolcrawler.crawler import Crawler
+from smolcrawler.frontier import PriorityFrontier
+from smolcrawler.scoring import DepthScorer, PathScorer, RegexScorer, default_scorer
+
+from conftest import make_page
+
+
+def test_path_scorer_prefers_pages_under_the_target():
+    scorer = PathScorer()
+    scorer.start("https://example.com/docs/guide/", "https://example.com")
+
+    under = scorer.score("https://example.com/docs/guide/install", 1, "")
+    sibling = scorer.score("https://example.com/docs/api", 1, "")
+    elsewhere = scorer.score("https://example.com/blog/2024/01/post", 1, "")
+    assert under > sibling > elsewhere
+
+
+def test_regex_scorer_boosts_url_and_anchor_text():
+    scorer = RegexScorer(url_boosts={r"/docs/": 3, r"/changelog": -5}, anchor_boosts={r"(?i)tutorial": 2})
+
+    assert scorer.score("https://example.com/docs/a", 1, "") == 3
+    assert scorer.score("https://example.com/docs/a", 1, "Tutorial: start here") == 5
+    assert scorer.score("https://example.com/changelog", 1, "") == -5
+
+
+def test_priority_frontier_pops_best_first_and_fifo_among_ties():
+    frontier = PriorityFrontier(DepthScorer())
+    frontier.push("https://example.com/deep", 3)
+    frontier.push("https://example.com/a", 1)
+    frontier.push("https://example.com/b", 1)
+    assert not frontier.push("https://example.com/a/", 0)  # still deduplicated
+
+    assert [frontier.pop()[0] for _ in range(len(frontier))] == [
+        "https://example.com/a",
+        "https://example.com/b",
+        "https://example.com/deep",
+    ]
+    assert not frontier
+
+
+def test_priority_frontier_max_size():
+    frontier = PriorityFrontier(DepthScorer(), max_size=2)
+    for i in range(5):
+        frontier.push(f"https://example.com/{i}", 0)
+
+    assert len(frontier) == 2
+    assert frontier.dropped == 3
+
+
+class NavSiteVisitor:
+    """A home page linking to changelog pages first, then to docs pages named by their anchor text."""
+
+    def __init__(self):
+        self.visited = []
+
+    async def visit_many(self, urls):
+        self.visited.extend(urls)
+        url = urls[0]
+        html = ""
+        if url == "https://example.com/":
+            html = "".join(f'<a href="/changelog/{i}">v{i}</a>' for i in range(10))
+            html += "".join(f'<a href="/p{i}">Tutorial {i}</a>' for i in range(3))
+        return [make_page(url, html)]
+
+
+@pytest.mark.asyncio
+async def test_limit_buys_the_best_scored_pages_first():
+    scorer = default_scorer(url_boosts={r"/changelog/": -5}, anchor_boosts={r"(?i)tutorial": 1})
+    visitor = NavSiteVisitor()
+    crawler = Crawler(depth=1, concurrency=1, limit=4, url_prefix="https://example.com", visitor=visitor, scorer=scorer)
+
+    pages = [page.url async for page in crawler.run("https://example.com/")]
+
+    assert pages[0] == "https://example.com/"
+    assert sorted(pages[1:]) == ["https://example.com/p0", "https://example.com/p1", "https://example.com/p2"]
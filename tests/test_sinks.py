@@ -0,0 +1,144 @@
+import asyncio
+import gzip
+import json
+import threading
+from pathlib import Path
+
+import pytest
+from localwebpy import Webpage
+from smolcrawler.crawler import Crawler
+from smolcrawler.sinks import JsonlSink, MarkdownTreeSink, Sink, markdown_path, open_sink
+
+from conftest import star_site
+
+
+def pages(n: int):
+    return [
+        Webpage(url=f"https://a.com/p{i}", title=f"Page {i}", html=f"<p>{i}</p>", content=f"content {i}")
+        for i in range(n)
+    ]
+
+
+def read_jsonl(path: Path, opener=open):
+    with opener(path, "rt") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.asyncio
+async def test_jsonl_sink(tmp_path):
+    path = tmp_path / "pages.jsonl"
+    async with JsonlSink(str(path), batch_size=3) as sink:
+        for page in pages(7):
+            await sink.write(page)
+
+    records = read_jsonl(path)
+    assert [record["url"] for record in records] == [f"https://a.com/p{i}" for i in range(7)]
+    assert records[0] == {"url": "https://a.com/p0", "title": "Page 0", "content": "content 0"}
+
+
+@pytest.mark.asyncio
+async def test_jsonl_sink_compressed(tmp_path):
+    async with open_sink(str(tmp_path / "pages.jsonl.gz"), include_html=True) as sink:
+        for page in pages(2):
+            await sink.write(page)
+    assert read_jsonl(tmp_path / "pages.jsonl.gz", gzip.open)[1]["html"] == "<p>1</p>"
+
+    zstandard = pytest.importorskip("zstandard")
+    async with open_sink(str(tmp_path / "pages.jsonl.zst")) as sink:
+        for page in pages(2):
+            await sink.write(page)
+    with open(tmp_path / "pages.jsonl.zst", "rb") as f:
+        lines = zstandard.ZstdDecompressor().stream_reader(f).read().decode().splitlines()
+    assert json.loads(lines[1])["url"] == "https://a.com/p1"
+
+
+def test_markdown_path():
+    assert markdown_path("https://a.com") == Path("a.com/index.md")
+    assert markdown_path("https://a.com/docs/") == Path("a.com/docs/index.md")
+    assert markdown_path("https://a.com/docs/intro.html") == Path("a.com/docs/intro.md")
+    assert markdown_path("https://a.com/../etc/pass%20wd") == Path("a.com/etc/pass_wd.md")
+    assert markdown_path("https://a.com/search?q=1") != markdown_path("https://a.com/search?q=2")
+
+
+@pytest.mark.asyncio
+async def test_markdown_tree_sink(tmp_path):
+    async with MarkdownTreeSink(str(tmp_path)) as sink:
+        await sink.write(Webpage(url="https://a.com/docs/", title="Docs: home", html="", content="# Docs"))
+
+    text = (tmp_path / "a.com" / "docs" / "index.md").read_text()
+    assert text == '---\nurl: "https://a.com/docs/"\ntitle: "Docs: home"\n---\n\n# Docs'
+
+
+@pytest.mark.asyncio
+async def test_parquet_sink(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "pages.parquet"
+    async with open_sink(str(path), batch_size=4) as sink:
+        for page in pages(10):
+            await sink.write(page)
+
+    table = pq.read_table(path)
+    assert table.column_names == ["url", "title", "content"]
+    assert table.column("content").to_pylist() == [f"content {i}" for i in range(10)]
+    assert pq.ParquetFile(path).num_row_groups == 3
+
+
+class SlowSink(Sink):
+    """Blocks the writer thread until released, recording the batches."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.release = threading.Event()
+        self.batches = []
+
+    def _write_batch(self, records):
+        self.release.wait()
+        self.batches.append([record["url"] for record in records])
+
+
+@pytest.mark.asyncio
+async def test_slow_sink_applies_backpressure():
+    sink = SlowSink(batch_size=1, max_pending=2)
+    for page in pages(2):
+        await sink.write(page)
+
+    # a third batch waits for the writer instead of piling up
+    third = asyncio.create_task(sink.write(pages(3)[2]))
+    await asyncio.sleep(0.05)
+    assert not third.done()
+
+    sink.release.set()
+    await third
+    await sink.close()
+    assert sink.batches == [[f"https://a.com/p{i}"] for i in range(3)]
+
+
+class SiteVisitor:
+    def __init__(self, links):
+        self.links = links
+
+    async def visit_many(self, urls):
+        pages = []
+        for url in urls:
+            html = "".join(f'<a href="{link}">x</a>' for link in self.links.get(url, []))
+            pages.append(Webpage(url=url, title=url, html=html, content=f"content of {url}"))
+        return pages
+
+
+@pytest.mark.asyncio
+async def test_run_to_with_drop_html(tmp_path):
+    crawler = Crawler(depth=1, concurrency=2, visitor=SiteVisitor(star_site(5)), drop_html=True)
+    path = tmp_path / "pages.jsonl"
+    seen = []
+
+    class Recording(JsonlSink):
+        async def write(self, webpage):
+            seen.append(webpage.html)
+            await super().write(webpage)
+
+    stats = await crawler.run_to("https://example.com/", Recording(str(path), include_html=True))
+
+    assert stats.fetched == 6
+    assert len(read_jsonl(path)) == 6
+    # links were still followed, but no page reached the sink with its html
+    assert seen == [None] * 6
@@ -0,0 +1,181 @@
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import pytest
+from smolcrawler.crawler import Crawler
+from smolcrawler.politeness import HostScheduler
+from smolcrawler.sitemap import SitemapSeeder, parse_lastmod
+
+from conftest import LatencyVisitor
+
+FIXTURES = Path(__file__).parent / "fixtures" / "sitemaps"
+
+
+def fixture_client(overrides: dict[str, str] | None = None, chunk_size: int = 64) -> httpx.AsyncClient:
+    """Serves the fixture files as https://example.com/<name>, in small chunks to exercise streaming."""
+    overrides = overrides or {}
+    requested = []
+
+    async def chunks(data: bytes):
+        for i in range(0, len(data), chunk_size):
+            yield data[i : i + chunk_size]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        name = request.url.path.lstrip("/")
+        requested.append(name)
+        if name in overrides:
+            return httpx.Response(200, text=overrides[name])
+        path = FIXTURES / name
+        if request.url.host != "example.com" or not path.is_file():
+            return httpx.Response(404)
+        return httpx.Response(200, content=chunks(path.read_bytes()))
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client.requested = requested
+    return client
+
+
+async def collect(seeder: SitemapSeeder, url: str = "https://example.com/"):
+    return [entry async for entry in seeder.entries(url)]
+
+
+@pytest.mark.asyncio
+async def test_entries_from_nested_and_gzipped_sitemaps():
+    client = fixture_client()
+    entries = await collect(SitemapSeeder(client=client))
+
+    urls = [entry.url for entry in entries]
+    assert urls == [
+        "https://example.com/",
+        "https://example.com/about",
+        "https://example.com/private/admin",
+        "https://other.com/elsewhere",
+    ] + [f"https://example.com/docs/page{i}" for i in range(6)]
+    # the index lists sitemap-pages.xml twice
+    assert client.requested.count("sitemap-pages.xml") == 1
+    assert entries[0].lastmod == datetime(2024, 6, 1, 10, tzinfo=timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_lastmod_older_than_since_is_skipped():
+    seeder = SitemapSeeder(since=datetime(2024, 4, 15), client=fixture_client())
+    urls = [entry.url for entry in await collect(seeder)]
+
+    # entries without lastmod are kept
+    assert urls == [
+        "https://example.com/",
+        "https://example.com/private/admin",
+        "https://other.com/elsewhere",
+        "https://example.com/docs/page4",
+        "https://example.com/docs/page5",
+    ]
+    assert seeder.skipped_unchanged == 5
+
+
+@pytest.mark.asyncio
+async def test_robots_rules():
+    seeder = SitemapSeeder(client=fixture_client())
+    await seeder.load_robots("https://example.com/")
+
+    assert seeder.allowed("https://example.com/docs/page1")
+    assert not seeder.allowed("https://example.com/private/admin")
+    assert seeder.allowed("https://unknown.org/private/")
+    assert seeder.crawl_delay("https://example.com/") == 2
+
+    blocked = SitemapSeeder(user_agent="otherbot", client=fixture_client())
+    await blocked.load_robots("https://example.com/")
+    assert not blocked.allowed("https://example.com/docs/page1")
+
+
+@pytest.mark.asyncio
+async def test_missing_sitemap_and_robots():
+    client = fixture_client()
+    seeder = SitemapSeeder(client=client)
+    entries = await collect(seeder, "https://nosuch.example/")
+
+    assert entries == []
+    assert seeder.allowed("https://nosuch.example/anything")
+    assert client.requested == ["robots.txt", "sitemap.xml"]
+
+
+def test_parse_lastmod():
+    assert parse_lastmod("2024-01-02") == datetime(2024, 1, 2, tzinfo=timezone.utc)
+    assert parse_lastmod("2024-01-02T03:04:05+02:00").utcoffset().total_seconds() == 7200
+    assert parse_lastmod("yesterday") is None
+    assert parse_lastmod(None) is None
+
+
+@pytest.mark.asyncio
+async def test_crawler_seeds_from_sitemaps():
+    robots = "User-agent: *\nDisallow: /private/\nSitemap: https://example.com/sitemap_index.xml\n"
+    visitor = LatencyVisitor({})
+    crawler = Crawler(
+        depth=0,
+        url_prefix="https://example.com",
+        visitor=visitor,
+        sitemaps=SitemapSeeder(client=fixture_client({"robots.txt": robots})),
+    )
+
+    pages = [page.url async for page in crawler.run("https://example.com/")]
+
+    # no link discovery needed: depth 0 still reaches every allowed sitemap URL of the site
+    assert sorted(pages) == sorted(
+        ["https://example.com/", "https://example.com/about"] + [f"https://example.com/docs/page{i}" for i in range(6)]
+    )
+    assert crawler.politeness is None
+
+
+@pytest.mark.asyncio
+async def test_crawler_does_not_follow_links_to_unchanged_sitemap_urls():
+    robots = "User-agent: *\nSitemap: https://example.com/sitemap_index.xml\n"
+    root = "https://example.com/"
+    # /about and docs/page0-3 have a lastmod older than `since`
+    visitor = LatencyVisitor({root: [root + "about", root + "docs/page0", root + "docs/page4", root + "new"]})
+    crawler = Crawler(
+        depth=1,
+        url_prefix="https://example.com",
+        visitor=visitor,
+        sitemaps=SitemapSeeder(since=datetime(2024, 4, 15), client=fixture_client({"robots.txt": robots})),
+    )
+
+    pages = [page.url async for page in crawler.run(root)]
+
+    assert sorted(pages) == sorted(
+        [root, root + "private/admin", root + "docs/page4", root + "docs/page5", root + "new"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_crawler_obeys_crawl_delay():
+    robots = "User-agent: *\nCrawl-delay: 1\nSitemap: https://example.com/sitemap-docs.xml.gz\n"
+    crawler = Crawler(
+        depth=0,
+        limit=2,
+        concurrency=4,
+        url_prefix="https://example.com",
+        visitor=LatencyVisitor({}),
+        sitemaps=SitemapSeeder(client=fixture_client({"robots.txt": robots})),
+    )
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    pages = [page async for page in crawler.run("https://example.com/")]
+
+    assert len(pages) == 2
+    assert loop.time() - start >= 0.9
+    # the scheduler spacing out the requests was for this run only
+    assert crawler.politeness is None
+
+    # a scheduler of the crawler's own gets the delay and stays
+    scheduler = HostScheduler(max_per_host=4)
+    crawler = Crawler(
+        depth=0,
+        limit=2,
+        politeness=scheduler,
+        visitor=LatencyVisitor({}),
+        sitemaps=SitemapSeeder(client=fixture_client({"robots.txt": robots})),
+    )
+    assert len([page async for page in crawler.run("https://example.com/")]) == 2
+    assert crawler.politeness is scheduler and scheduler.hosts["example.com"].bucket.rate == 1
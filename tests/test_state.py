@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+
+import pytest
+from smolcrawler.crawler import Crawler
+from smolcrawler.state import SQLiteStateStore
+
+
+@dataclass
+class Page:
+    url: str
+    html: str
+    content: str
+
+
+class StarVisitor:
+    """The root page links to `pages` leaf pages, the last one duplicating the root's content."""
+
+    def __init__(self, pages: int):
+        self.pages = pages
+        self.visited: list[str] = []
+
+    async def visit_many(self, urls):
+        self.visited.extend(urls)
+        result = []
+        for url in urls:
+            if url == "https://example.com/":
+                html = "".join(f'<a href="/p{i}">p{i}</a>' for i in range(self.pages))
+                result.append(Page(url, html, "root"))
+            else:
+                result.append(Page(url, "", "root" if url.endswith(f"/p{self.pages - 1}") else url))
+        return result
+
+
+def test_sqlite_state_store_roundtrip(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / "state.db"), batch_size=2)
+    store.add_queued("https://example.com/a", 0)
+    store.add_queued("https://example.com/b", 1)
+    store.add_queued("https://example.com/c", 1)
+    store.add_done("https://example.com/a", "https://example.com/a", "hash-a")
+    store.add_done("https://example.com/b")
+    store.close()
+
+    state = SQLiteStateStore(str(tmp_path / "state.db")).load()
+    assert state.visited == [("https://example.com/a", "https://example.com/a")]
+    assert state.fingerprints == ["hash-a"]
+    assert state.frontier == [("https://example.com/c", 1)]
+    assert state.done == ["https://example.com/a", "https://example.com/b"]
+
+
+@pytest.mark.asyncio
+async def test_crawl_resumes_from_saved_state(tmp_path):
+    path = str(tmp_path / "state.db")
+    visitor = StarVisitor(pages=10)
+
+    store = SQLiteStateStore(path)
+    crawler = Crawler(depth=1, concurrency=2, limit=4, url_prefix="https://example.com", visitor=visitor, state_store=store)
+    first = [page.url async for page in crawler.run("https://example.com/")]
+    store.close()
+    assert len(first) == 4
+
+    # a new process: nothing in memory, everything comes from the store
+    store = SQLiteStateStore(path)
+    crawler = Crawler(depth=1, concurrency=2, limit=-1, url_prefix="https://example.com", visitor=visitor, state_store=store)
+    second = [page.url async for page in crawler.run("https://example.com/")]
+    store.close()
+
+    assert not set(first) & set(second)
+    # the last page duplicates the root, which is known from the saved fingerprints
+    assert len(first) + len(second) == 10
+    assert len(visitor.visited) == len(set(visitor.visited)) == 11
@@ -0,0 +1,82 @@
+import pytest
+from smolcrawler.crawler import Crawler
+from smolcrawler.stats import CrawlStats, Histogram
+
+from conftest import LatencyVisitor, make_page, star_site
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    for value in [0.005] * 50 + [0.05] * 49 + [5.0]:
+        histogram.observe(value)
+
+    assert histogram.count == 100
+    assert histogram.quantile(0.5) == 0.01
+    assert histogram.quantile(0.99) == 0.1
+    assert histogram.quantile(1.0) == float("inf")
+    assert Histogram().quantile(0.5) is None
+
+
+def test_prometheus_text():
+    stats = CrawlStats()
+    stats.queued = 3
+    stats.add_page("https://example.com/", 0, "<html></html>", "hello")
+    stats.observe("fetch", 0.02)
+
+    text = stats.to_prometheus()
+    assert 'smolcrawler_pages_total{status="fetched"} 1' in text
+    assert 'smolcrawler_bytes_total{kind="content"} 5' in text
+    assert 'smolcrawler_pages_by_depth{depth="0"} 1' in text
+    assert 'smolcrawler_phase_seconds_bucket{phase="fetch",le="0.025"} 1' in text
+    assert 'smolcrawler_phase_seconds_bucket{phase="fetch",le="0.01"} 0' in text
+    assert 'smolcrawler_phase_seconds_count{phase="fetch"} 1' in text
+
+
+class DuplicateVisitor(LatencyVisitor):
+    """Serves the same content for p1 and p2, and nothing for p3."""
+
+    async def visit_many(self, urls):
+        pages = await super().visit_many(urls)
+        if urls[0] == "https://example.com/p3":
+            return [None]
+        if urls[0] in ("https://example.com/p1", "https://example.com/p2"):
+            return [make_page(urls[0], content="same content")]
+        return pages
+
+
+@pytest.mark.asyncio
+async def test_crawler_stats():
+    snapshots = []
+    crawler = Crawler(
+        depth=1,
+        url_prefix="https://example.com",
+        visitor=DuplicateVisitor(star_site(5)),
+        keep_pages=True,
+        stats_callback=snapshots.append,
+        stats_interval=0,
+    )
+
+    pages = [page async for page in crawler.run("https://example.com/")]
+
+    stats = crawler.stats
+    assert stats.fetched == len(pages) == 4
+    assert stats.queued == 6
+    assert stats.failed == 1 and stats.duplicates == 1 and stats.skipped == 2
+    assert stats.pages_by_depth == {0: 1, 1: 3}
+    assert stats.links_found == stats.links_queued == 5
+    assert stats.phases["fetch"].count == 6
+    assert stats.content_bytes == sum(size for _, size in stats.pages)
+    assert [url for url, _ in stats.pages] == [page.url for page in pages]
+
+    assert snapshots and snapshots[-1]["fetched"] == 4
+    assert snapshots[-1]["queue_size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_crawler_does_not_keep_pages_by_default():
+    crawler = Crawler(depth=1, url_prefix="https://example.com", visitor=LatencyVisitor(star_site(3)))
+
+    pages = [page async for page in crawler.run("https://example.com/")]
+
+    assert crawler.stats.pages is None
+    assert crawler.stats.fetched == len(pages) == 4
@@ -0,0 +1,125 @@
+import pytest
+from smolcrawler.crawler import Crawler
+from smolcrawler.tiered import TieredVisitor, escalation_reason, prefix_key
+
+from conftest import make_page
+
+ARTICLE = "word " * 100
+SHELL = '<html><body><div id="root"></div><script src="/app.js"></script></body></html>'
+CHALLENGE = "<html><head><title>Just a moment...</title></head><body>Checking your browser</body></html>"
+
+
+class FakeVisitor:
+    """Serves `pages[url] = (html, content)` and records what it was asked for."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.visited = []
+
+    async def visit_many(self, urls):
+        self.visited.extend(urls)
+        pages = []
+        for url in urls:
+            html, content = self.pages.get(url, (None, None))
+            pages.append(make_page(url, html, content) if html is not None else None)
+        return pages
+
+
+def test_escalation_reason():
+    assert escalation_reason(make_page("https://a.com/", "<p>x</p>", ARTICLE)) is None
+    assert escalation_reason(None) == "failed"
+    assert escalation_reason(make_page("https://a.com/", "<html></html>", "")) == "empty"
+    assert escalation_reason(make_page("https://a.com/", SHELL, "Loading")) == "js"
+    assert escalation_reason(make_page("https://a.com/", CHALLENGE, "Checking your browser")) == "challenge"
+    # an app shell that still rendered plenty of content server side is fine
+    assert escalation_reason(make_page("https://a.com/", SHELL, ARTICLE)) is None
+
+
+def test_prefix_key():
+    assert prefix_key("https://a.com/app/settings?x=1") == "a.com/app"
+    assert prefix_key("https://a.com") == "a.com/"
+
+
+@pytest.mark.asyncio
+async def test_escalates_and_remembers_the_prefix():
+    http = FakeVisitor(
+        {
+            "https://a.com/docs/1": ("<p>docs</p>", ARTICLE),
+            "https://a.com/app/1": (SHELL, "Loading"),
+            "https://a.com/app/2": (SHELL, "Loading"),
+        }
+    )
+    browser = FakeVisitor({url: ("<p>rendered</p>", ARTICLE) for url in ["https://a.com/app/1", "https://a.com/app/2"]})
+    visitor = TieredVisitor(http, browser)
+
+    first = await visitor.visit_many(["https://a.com/docs/1", "https://a.com/app/1"])
+    second = await visitor.visit_many(["https://a.com/app/2"])
+
+    assert [page.html for page in first + second] == ["<p>docs</p>", "<p>rendered</p>", "<p>rendered</p>"]
+    # /app/2 skipped the HTTP attempt
+    assert http.visited == ["https://a.com/docs/1", "https://a.com/app/1"]
+    assert visitor.stats() == {"http": 1, "browser": 2, "escalated": 1, "escalated_js": 1, "remembered": 1}
+
+
+@pytest.mark.asyncio
+async def test_dead_pages_are_not_remembered():
+    http = FakeVisitor({"https://a.com/docs/empty": ("<html></html>", "")})
+    browser = FakeVisitor({"https://a.com/docs/empty": ("<html></html>", "")})
+    visitor = TieredVisitor(http, browser)
+
+    pages = await visitor.visit_many(["https://a.com/docs/empty", "https://a.com/docs/404"])
+
+    assert pages[0].html == "<html></html>" and pages[1] is None
+    assert visitor.tier("https://a.com/docs/other") == "http"
+    assert visitor.stats() == {"escalated_empty": 1, "escalated_failed": 1}
+
+
+@pytest.mark.asyncio
+async def test_whole_host_goes_to_the_browser_after_enough_prefixes():
+    urls = [f"https://a.com/s{i}/page" for i in range(3)]
+    visitor = TieredVisitor(FakeVisitor({}), FakeVisitor({url: ("<p>x</p>", ARTICLE) for url in urls}), host_after=3)
+
+    await visitor.visit_many(urls[:2])
+    assert visitor.tier("https://a.com/elsewhere") == "http"
+    await visitor.visit_many(urls[2:])
+    assert visitor.tier("https://a.com/elsewhere") == "browser"
+    assert visitor.tier("https://b.com/elsewhere") == "http"
+
+
+@pytest.mark.asyncio
+async def test_crawler_with_tiered_visitor():
+    http = FakeVisitor(
+        {
+            "https://a.com/": ('<a href="/app/1">app</a><a href="/blog/1">blog</a>', ARTICLE),
+            "https://a.com/blog/1": ("<p>blog</p>", ARTICLE + "blog"),
+            "https://a.com/app/1": (CHALLENGE, "Checking your browser"),
+        }
+    )
+    browser = FakeVisitor({"https://a.com/app/1": ("<p>app</p>", ARTICLE + "app")})
+    visitor = TieredVisitor(http, browser)
+    crawler = Crawler(depth=1, visitor=visitor)
+
+    pages = {page.url: page.html async for page in crawler.run("https://a.com/")}
+
+    assert pages["https://a.com/app/1"] == "<p>app</p>"
+    assert browser.visited == ["https://a.com/app/1"]
+    assert crawler.tiered_visitor is visitor
+    assert visitor.stats()["http"] == 2
+
+
+def test_crawler_timeout_reaches_both_tiers(monkeypatch):
+    created = {}
+
+    def recording(tier):
+        def create(concurrency, timeout):
+            created[tier] = (concurrency, timeout)
+            return FakeVisitor({})
+
+        return create
+
+    monkeypatch.setattr("smolcrawler.tiered.HttpVisitor", recording("http"))
+    monkeypatch.setattr("smolcrawler.tiered.BrowserVisitor", recording("browser"))
+    crawler = Crawler(tiered=True, concurrency=2, timeout=5)
+    crawler.tiered_visitor.browser
+
+    assert created == {"http": (2, 5), "browser": (2, 5)}
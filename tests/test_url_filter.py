@@ -0,0 +1,73 @@
+import pickle
+import re
+
+from smolcrawler.url_filter import UrlFilter
+from smolcrawler.utils import is_valid_url
+
+
+def test_matches_is_valid_url():
+    urls = [
+        "https://example.com/page",
+        "https://example.com/page/",
+        "https://example.com/page.HTML",
+        "https://example.com/style.css",
+        "https://example.com/archive.tar.gz?download=1",
+        "https://example.com/v1.2/page",
+        "https://example.com/dir.d/page",
+        "https://example.com/img.jpg#top",
+        "https://example.com",
+        "HTTPS://example.com/upper",
+        "ftp://example.com/file",
+        "mailto:someone@example.com",
+        "https://other.com/page",
+        "https://example.com/blog/post?id=1",
+        "https://[::1/page",
+    ]
+    regex = re.compile(r"/(page|blog)")
+    url_filter = UrlFilter(regex)
+    for url in urls:
+        for prefix in (None, "https://example.com"):
+            assert url_filter.accepts(url, prefix) == is_valid_url(url, prefix, regex), (url, prefix)
+
+
+def test_unparseable_urls_are_rejected():
+    assert not UrlFilter().accepts("http://[::1/x")
+
+
+def test_query_without_path_is_not_taken_for_the_path():
+    url_filter = UrlFilter(max_path_depth=0)
+    assert url_filter.accepts("https://example.com?next=/foo.pdf")
+    assert url_filter.accepts("https://example.com#/a/b")
+    assert not UrlFilter().accepts("https://example.com/foo.pdf?next=/")
+
+
+def test_include_exclude_globs():
+    url_filter = UrlFilter(include=["/docs/*", "/guide"], exclude=["*/internal/*"])
+    assert url_filter.accepts("https://example.com/docs/intro")
+    assert url_filter.accepts("https://example.com/guide?x=1")
+    assert not url_filter.accepts("https://example.com/blog/post")
+    assert not url_filter.accepts("https://example.com/docs/internal/secret")
+
+
+def test_max_path_depth():
+    url_filter = UrlFilter(max_path_depth=2)
+    assert url_filter.accepts("https://example.com")
+    assert url_filter.accepts("https://example.com/a/b/")
+    assert not url_filter.accepts("https://example.com/a/b/c")
+
+
+def test_verdicts_are_cached():
+    url_filter = UrlFilter()
+    for _ in range(3):
+        assert url_filter.accepts("https://example.com/page")
+    info = url_filter.cache_info()
+    assert info["is_valid"].hits == 2 and info["is_valid"].misses == 1
+
+
+def test_pickle_rebuilds_caches():
+    url_filter = UrlFilter(r"/docs/", exclude=["/docs/old/*"], max_path_depth=3)
+    url_filter.accepts("https://example.com/docs/a")
+    copy = pickle.loads(pickle.dumps(url_filter))
+    assert copy.accepts("https://example.com/docs/a")
+    assert not copy.accepts("https://example.com/docs/old/a")
+    assert copy.cache_info()["is_valid"].currsize == 2
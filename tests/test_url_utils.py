@@ -1,4 +1,4 @@
-from smolcrawler.url_utils import get_url_variations, is_similar_url, normalize_url
+from smolcrawler.url_utils import TrapDetector, UrlCanonicalizer, get_url_variations, is_similar_url, normalize_url
 
 
 def test_normalize_url():
@@ -34,3 +34,39 @@ def test_is_similar_url():
     assert not is_similar_url("https://example.com/page1", "https://example.com/page2")
     assert not is_similar_url("https://example1.com/page", "https://example2.com/page")
     assert not is_similar_url("http://example.com/page", "https://example.com/page")
+
+
+def test_canonicalizer_keeps_significant_params():
+    canonicalize = UrlCanonicalizer().canonicalize
+
+    assert canonicalize("HTTPS://Example.com/docs/?utm_source=x&page=2&b=1#top") == "https://example.com/docs?b=1&page=2"
+    assert canonicalize("https://example.com/docs;jsessionid=F00?gclid=1&sid=2") == "https://example.com/docs"
+    assert canonicalize("https://example.com/docs?page=2") != canonicalize("https://example.com/docs?page=3")
+
+
+def test_canonicalizer_learns_params_that_do_not_change_content():
+    canonicalizer = UrlCanonicalizer(learn_after=2)
+    for i in range(3):
+        # `ref` never changes the page, `page` does
+        canonicalizer.observe(f"https://example.com/list?page={i}&ref=a", f"list-{i}")
+        canonicalizer.observe(f"https://example.com/list?page={i}&ref=b", f"list-{i}")
+        canonicalizer.observe(f"https://example.com/list?page={i}&ref=c", f"list-{i}")
+
+    assert canonicalizer.ignored == {"example.com": {"ref"}}
+    assert canonicalizer.canonicalize("https://example.com/list?ref=z&page=1") == "https://example.com/list?page=1"
+    assert canonicalizer.canonicalize("https://other.com/list?ref=z") == "https://other.com/list?ref=z"
+
+    # a new crawl learns from scratch
+    canonicalizer.start()
+    assert canonicalizer.canonicalize("https://example.com/list?ref=z") == "https://example.com/list?ref=z"
+
+
+def test_trap_detector():
+    traps = TrapDetector(max_repeats=2, max_per_pattern=3)
+
+    assert not traps.admit("https://example.com/a/b/a/b/a/b")
+    assert traps.admit("https://example.com/a/b/a/b")
+    days = [traps.admit(f"https://example.com/calendar/2024/05/{day}?view=day") for day in range(1, 10)]
+    assert days == [True] * 3 + [False] * 6
+    assert TrapDetector.pattern("https://example.com/s/8f14e45fceea167a5a36dedd4bea2543/page") == "example.com/s/*/page?"
+    assert traps.counts == {"repeated": 1, "fanout": 6}
@@ -16,11 +16,19 @@ def test_extract_urls_with_relative_paths():
 
     urls = extract_urls(html, base_url)
 
-    # Expected behavior:
+    # Expected behavior (RFC 3986, "docs" is a file of the root directory):
     # 1. /swift-protobuf -> https://example.com/swift-protobuf
-    # 2. swift-protobuf -> https://example.com/docs/swift-protobuf
-    # 3. ./swift-protobuf -> https://example.com/docs/swift-protobuf
+    # 2. swift-protobuf -> https://example.com/swift-protobuf
+    # 3. ./swift-protobuf -> https://example.com/swift-protobuf
     # 4. ../swift-protobuf -> https://example.com/swift-protobuf
+    expected = {
+        "https://example.com/swift-protobuf",
+    }
+
+    assert urls == expected, f"Expected {expected}, got {urls}"
+
+    # with a trailing slash, "docs" is a directory
+    urls = extract_urls(html, base_url + "/")
     expected = {
         "https://example.com/swift-protobuf",
         "https://example.com/docs/swift-protobuf",
@@ -29,6 +37,62 @@ def test_extract_urls_with_relative_paths():
     assert urls == expected, f"Expected {expected}, got {urls}"
 
 
+def test_extract_urls_html_variants():
+    base_url = "https://example.com/docs/guide/intro"
+    html = """
+    <html>
+        <head>
+            <base href="/api/v2/">
+            <link rel="stylesheet" href="style.css">
+            <link rel="next" href="page-2">
+        </head>
+        <body>
+            <A HREF=unquoted>Link 1</A>
+            <a class="x" href='single?a=1&amp;b=2'>Link 2</a>
+            <a href="../up">Link 3</a>
+            <!-- <a href="commented">Link 4</a> -->
+            <a href="#top">Top</a>
+            <a href="mailto:me@example.com">Mail</a>
+            <area shape="rect" href="//cdn.example.com/map">
+            <abbr href="not-a-link">x</abbr>
+        </body>
+    </html>
+    """
+
+    urls = extract_urls(html, base_url)
+
+    assert urls == {
+        "https://example.com/api/v2/page-2",
+        "https://example.com/api/v2/unquoted",
+        "https://example.com/api/v2/single?a=1&b=2",
+        "https://example.com/api/up",
+        "https://cdn.example.com/map",
+    }
+
+
+def test_extract_urls_takes_href_attributes_only():
+    html = """
+    <a title="x href=bad" href="/real">Real</a>
+    <a data-x='href="/worse"' class=y>No href</a>
+    <a title="a > b" HREF=/after-gt>After</a>
+    <link rel="next" title="href=/bad-link" href="/page-2">
+    <body><link rel="next" href="/in-body"></body>
+    """
+
+    assert extract_urls(html, "https://example.com/") == {
+        "https://example.com/real",
+        "https://example.com/after-gt",
+        "https://example.com/page-2",
+    }
+
+
+def test_extract_urls_max_urls():
+    html = "".join(f'<a href="/p{i}">p{i}</a>' for i in range(100))
+
+    assert len(extract_urls(html, "https://example.com", max_urls=10)) == 10
+    assert extract_urls("", "https://example.com") == set()
+
+
 def test_is_valid_url():
     # Test valid URLs
     assert is_valid_url("https://example.com/page")
@@ -78,3 +142,21 @@ def test_get_default_url_prefix():
     # Test case 4: URL with query parameters
     url4 = "https://example.com/path?query=value"
     assert get_default_url_prefix(url4) == "https://example.com"
+
+
+def test_extract_urls_anchor_texts():
+    html = """
+    <a href="/guide"><span>Getting &amp; started</span>
+      now</A >
+    <a href="/guide">later text</a>
+    <a class="icon" href="/icon"><img src="x.png"></a><a href="/icon">Icon</a>
+    <area href="/map">
+    """
+    anchor_texts = {}
+    urls = extract_urls(html, "https://example.com/", anchor_texts=anchor_texts)
+
+    assert set(anchor_texts) == urls
+    assert anchor_texts["https://example.com/guide"] == "Getting & started now"
+    # the first link with text wins
+    assert anchor_texts["https://example.com/icon"] == "Icon"
+    assert anchor_texts["https://example.com/map"] == ""
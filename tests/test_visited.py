@@ -0,0 +1,65 @@
+from functools import partial
+
+import pytest
+from smolcrawler.crawler import Crawler
+from smolcrawler.visited import FingerprintSet, ScalableBloomFilter, UrlSet, memory_bytes
+
+from conftest import LatencyVisitor, star_site
+
+
+def test_fingerprint_set_grows_and_keeps_urls():
+    urls = [f"https://example.com/page{i}" for i in range(10_000)]
+    visited = FingerprintSet(capacity=16)
+    for url in urls:
+        visited.add(url)
+    visited.add(urls[0])
+
+    assert len(visited) == len(urls)
+    assert all(url in visited for url in urls)
+    assert "https://example.com/other" not in visited
+    assert isinstance(visited, UrlSet)
+
+
+def test_fingerprint_set_is_smaller_than_set():
+    urls = [f"https://example.com/docs/section{i % 100}/page{i}" for i in range(50_000)]
+    visited, plain = FingerprintSet(), set()
+    for url in urls:
+        visited.add(url)
+        plain.add(url)
+
+    assert memory_bytes(visited) * 4 < memory_bytes(plain)
+
+
+def test_scalable_bloom_filter_false_positive_rate():
+    visited = ScalableBloomFilter(initial_capacity=1000, error_rate=0.01)
+    urls = [f"https://example.com/page{i}" for i in range(20_000)]
+    for url in urls:
+        visited.add(url)
+
+    # no false negatives, and it grew past the first filter
+    assert all(url in visited for url in urls)
+    assert len(visited.filters) > 1
+    # the rate bound is reached only asymptotically, and the str hash changes from run to run
+    false_positives = sum(f"https://example.com/missing{i}" in visited for i in range(20_000))
+    assert false_positives / 20_000 < 0.015
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("url_store", [FingerprintSet, partial(ScalableBloomFilter, error_rate=1e-6)])
+async def test_crawler_with_compact_url_store(url_store):
+    links = star_site(8)
+    links["https://example.com/p0"] = ["https://example.com/p1/", "https://example.com/deep"]
+
+    async def crawl(**kwargs):
+        crawler = Crawler(depth=2, concurrency=3, url_prefix="https://example.com", visitor=LatencyVisitor(links), **kwargs)
+        return [page.url async for page in crawler.run("https://example.com/")], crawler
+
+    plain, _ = await crawl()
+    compact, crawler = await crawl(url_store=url_store)
+
+    assert compact == plain
+    assert len(crawler.visited_urls) == len(plain)
+    assert all(url in crawler.visited_urls for url in plain)
+    usage = crawler.memory_usage()
+    assert set(usage) == {"visited_urls", "visited_url_variations", "frontier_seen"}
+    assert usage["frontier_seen"] > 0